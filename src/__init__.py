@@ -0,0 +1 @@
+"""ElectroShop data pipeline: validation and preprocessing."""
@@ -0,0 +1,274 @@
+"""
+Benchmarks for the ElectroShop validation and loading hot paths.
+
+Synthesizes ElectroShop-shaped data from configs/data_contract.yaml (null
+rates, dirty labels such as 'afterno0n' and duplicate Session_IDs as in the
+raw export), then times each stage at each size: loading, every validation
+check on its own, and every preprocessing stage of configs/preprocess.yaml
+on the synthesized frame. Every size runs in a fresh
+process, so the peak RSS recorded after each stage belongs to that size
+only. Results are appended to reports/benchmarks/history.csv and the last
+run is written to reports/benchmarks/latest.json.
+
+Run with: python -m src.bench --rows 10000 1000000
+Or with make: make bench [BENCH_ROWS="10000 1000000 10000000"]
+"""
+
+import argparse
+import json
+import logging
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.keys import count_duplicates
+from src.loader import cast_to_contract, iter_csv, load_csv, pq
+from src.preprocess import Pipeline
+from src.validate_schema import CHECKS, SchemaValidator
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Null rates of the raw training export (fraction of rows)
+NULL_RATES = {
+    'Age': 0.152, 'Payment_Method': 0.149, 'Referral_Source': 0.147,
+    'Price': 0.046, 'Session_ID': 0.020,
+}
+DEFAULT_NULL_RATE = 0.020
+
+# Share of non-null labels replaced by a dirty spelling
+DIRTY_RATES = {'Time_of_Day': 0.007, 'Payment_Method': 0.035, 'Referral_Source': 0.025}
+
+# Dirty spellings seen in the raw export
+DIRTY_LABELS = {
+    'Time_of_Day': ['afterno0n', 'eveninG', 'Morning', 'm0rning', 'aftErN00n', 'EVening'],
+    'Payment_Method': ['pay_pal', 'creDit', 'CASH ', 'BanK', 'bank_transfer', 'pay pal'],
+    'Referral_Source': ['direct ', 'S0cial_media', 'Search-Engine', 'ads ', 'EMail', 'SeaRch_engine'],
+}
+
+# Share of Session_IDs that repeat an earlier one
+DUPLICATE_RATE = 0.020
+
+# Rows per chunk for the streaming stage
+BENCH_CHUNKSIZE = 1_000_000
+
+
+def synthesize(n_rows: int, contract: Dict, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate an ElectroShop-shaped frame with raw-export dirt.
+
+    Args:
+        n_rows: Number of rows
+        contract: Loaded data contract
+        seed: Random seed
+
+    Returns:
+        DataFrame with the raw export's columns
+    """
+    rng = np.random.default_rng(seed)
+    specs = contract['columns']
+    n = n_rows
+
+    ids = np.arange(1, n + 1)
+    dupes = rng.random(n) < DUPLICATE_RATE
+    ids[dupes] = rng.integers(1, n + 1, int(dupes.sum()))
+    df = pd.DataFrame({'id': np.arange(1, n + 1)})
+    df['Age'] = rng.integers(18, 66, n).astype(float)
+    df['Gender'] = rng.integers(0, 2, n).astype(float)
+    df['Reviews_Read'] = rng.poisson(3, n).astype(float)
+    df['Price'] = np.round(rng.lognormal(6.1, 0.6, n), 3)
+    df['Discount'] = rng.integers(0, 91, n).astype(float)
+    df['Category'] = rng.integers(0, 5, n).astype(float)
+    df['Items_In_Cart'] = rng.poisson(3.5, n).astype(float)
+    for col in ('Time_of_Day', 'Device_Type', 'Payment_Method', 'Referral_Source'):
+        allowed = np.array(specs[col]['allowed'], dtype=object)
+        df[col] = allowed[rng.integers(0, len(allowed), n)]
+    df['Email_Interaction'] = rng.integers(0, 2, n).astype(float)
+    df['Socioeconomic_Status_Score'] = np.round(rng.gamma(2.2, 2.3, n), 2)
+    df['Engagement_Score'] = rng.uniform(0, 6.4, n)
+    df['AB_Bucket'] = rng.integers(0, 7, n).astype(float)
+    df['Price_Sine'] = np.sin(df['Price'].to_numpy())
+    df['PM_RS_Combo'] = df['Payment_Method'] + ':' + df['Referral_Source']
+    df['Session_ID'] = pd.Series(ids).map('S{:07d}'.format).astype(object)
+    df['Day'] = rng.integers(1, 101, n)
+    day = df['Day']
+    df['Campaign_Period'] = day.between(25, 50) | day.between(75, 90)
+    df['Purchase'] = rng.integers(0, 2, n)
+
+    for col, rate in DIRTY_RATES.items():
+        dirty = rng.random(n) < rate
+        labels = np.array(DIRTY_LABELS[col], dtype=object)
+        df.loc[dirty, col] = labels[rng.integers(0, len(labels), int(dirty.sum()))]
+
+    for col in df.columns:
+        if col in ('id', 'Day', 'Purchase'):
+            continue
+        mask = rng.random(n) < NULL_RATES.get(col, DEFAULT_NULL_RATE)
+        df[col] = df[col].astype(object) if df[col].dtype == bool else df[col]
+        df.loc[mask, col] = None if df[col].dtype == object else np.nan
+    return df
+
+
+def run_size(n_rows: int, contract_path: str, workers: int = 1,
+             seed: int = 0, preprocess_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Time every stage at one size (meant to run in a fresh process).
+
+    Validation checks are timed one per record ('check:<name>'), and so are
+    the preprocessing stages ('pipeline:<stage>', after 'pipeline_fit').
+
+    Args:
+        n_rows: Number of rows to synthesize
+        contract_path: Path to data_contract.yaml
+        workers: Processes for the per-column checks
+        seed: Random seed
+        preprocess_path: Path to preprocess.yaml (None skips the pipeline stages)
+
+    Returns:
+        One record per stage: stage, seconds, peak RSS after the stage
+    """
+    with open(contract_path, 'r') as f:
+        contract = yaml.safe_load(f)
+    records = []
+
+    def timed(stage: str, fn: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        out = fn()
+        seconds = time.perf_counter() - start
+        records.append({'stage': stage, 'seconds': round(seconds, 4),
+                        'peak_rss_mb': round(_peak_rss_mb(), 1)})
+        logger.info(f"{n_rows:>11,} rows  {stage:<24} {seconds:8.3f}s")
+        return out
+
+    raw = timed('synthesize', lambda: synthesize(n_rows, contract, seed))
+    with tempfile.TemporaryDirectory(prefix='bench_') as tmp:
+        csv_path = Path(tmp) / "sessions.csv"
+        timed('write_csv', lambda: raw.to_csv(csv_path, index=False))
+        del raw
+        timed('read_csv_untyped', lambda: pd.read_csv(csv_path))
+        df = timed('load_csv_typed', lambda: load_csv(csv_path, contract))
+        if pq is not None:
+            parquet_path = csv_path.with_suffix('.parquet')
+            timed('write_parquet', lambda: cast_to_contract(df.copy(), contract)
+                  .to_parquet(parquet_path, index=False))
+            timed('read_parquet', lambda: pd.read_parquet(parquet_path))
+
+        validator = SchemaValidator(contract_path, workers=workers)
+        timed('count_duplicates', lambda: count_duplicates(df, 'Session_ID', 'Day'))
+        timed('validate_primary_keys', lambda: validator.validate_primary_keys(df))
+        timed('plan_run', lambda: validator.plan.run(df, workers=workers))
+        timed('validate_all', lambda: SchemaValidator(contract_path, workers=workers)
+              .validate_all(df))
+        for check in CHECKS:
+            timed(f'check:{check}', lambda: SchemaValidator(
+                contract_path, workers=workers, checks=[check]).validate_all(df))
+        if preprocess_path is not None:
+            _time_pipeline(timed, df, preprocess_path, contract)
+        del df
+        timed('validate_chunks', lambda: SchemaValidator(contract_path, workers=workers)
+              .validate_chunks(iter_csv(csv_path, contract, BENCH_CHUNKSIZE)))
+
+    for record in records:
+        record.update(rows=n_rows, workers=workers)
+    return records
+
+
+def _time_pipeline(timed: Callable[[str, Callable[[], Any]], Any], df: pd.DataFrame,
+                   preprocess_path: str, contract: Dict):
+    """
+    Fit the configured pipeline on a frame, then time each stage's transform.
+
+    The label store is left out, so label stages time their rules rather
+    than store lookups. End-of-stream checks (e.g. key uniqueness) do not
+    run, as the synthesized keys repeat on purpose.
+
+    Args:
+        timed: run_size's timer
+        df: Typed frame (left unchanged)
+        preprocess_path: Path to preprocess.yaml
+        contract: Loaded data contract
+    """
+    with open(preprocess_path, 'r') as f:
+        config = yaml.safe_load(f) or {}
+    pipeline = Pipeline.from_config(config, contract)
+    timed('pipeline_fit', lambda: pipeline.fit([df.copy()]))
+    frame = df.copy()
+    try:
+        for stage in pipeline.stages:
+            frame = timed(f'pipeline:{stage.describe()}', lambda: stage.transform(frame))
+    finally:
+        pipeline.close()
+
+
+def save_history(records: List[Dict[str, Any]], out_dir: Path):
+    """Append records to history.csv and write them to latest.json."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    history = out_dir / "history.csv"
+    frame = pd.DataFrame(records)[
+        ['run_at', 'commit', 'rows', 'workers', 'stage', 'seconds', 'peak_rss_mb']
+    ]
+    frame.to_csv(history, mode='a', header=not history.exists(), index=False)
+    with open(out_dir / "latest.json", 'w') as f:
+        json.dump(records, f, indent=2)
+    logger.info(f"Benchmark history appended to {history}")
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (MB)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def _git_commit(root: Path) -> str:
+    """Short hash of the checked-out commit ('' outside a git checkout)."""
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+                             capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+    return out.stdout.strip()
+
+
+def main():
+    """Run the benchmarks and record them."""
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description="Benchmark ElectroShop validation hot paths")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000], help="Dataset sizes to benchmark (e.g. 10000 1000000 10000000 50000000)")
+    parser.add_argument("-c", "--contract", default=str(project_root / "configs" / "data_contract.yaml"), help="Path to data_contract.yaml")
+    parser.add_argument("--pipeline", default=str(project_root / "configs" / "preprocess.yaml"), help="Path to preprocess.yaml whose stages are timed one by one")
+    parser.add_argument("-o", "--out-dir", default=str(project_root / "reports" / "benchmarks"), help="Directory for history.csv and latest.json")
+    parser.add_argument("--workers", type=int, default=1, help="Processes for the per-column checks")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data")
+    args = parser.parse_args()
+
+    run_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    commit = _git_commit(project_root)
+    records = []
+    for n_rows in args.rows:
+        # A fresh interpreter per size keeps peak RSS from carrying over
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            records += pool.submit(run_size, n_rows, args.contract, args.workers,
+                                   args.seed, args.pipeline).result()
+    for record in records:
+        record.update(run_at=run_at, commit=commit)
+    save_history(records, Path(args.out_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Content-addressed cache for ElectroShop validation results.
+
+Entries are keyed by what they were computed from, never by file names or
+timestamps: a whole-file entry by the hash of the file's bytes plus the
+normalized contract, a column entry by the hash of the column's memory
+buffers (values, null mask, string offsets and bytes, category codes), its
+dtype and its contract spec. Hashing the buffers directly costs a few ms
+per column, far less than checking it. A run on unchanged data and contract
+is then a single lookup, and after a partial update only the columns whose
+values changed are recomputed.
+
+The cache is capped in size: reads refresh an entry's mtime, and writes
+evict the least recently used entries beyond the cap.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import yaml
+
+
+# Bump when the layout of cached stats or results changes
+CACHE_VERSION = 4
+
+# Read size when hashing files (bytes)
+HASH_BLOCK = 2**20
+
+# Default size cap of a cache directory (bytes)
+DEFAULT_CACHE_BYTES = 256 * 2**20
+
+
+class ResultCache:
+    """Pickled entries under a cache directory, one file per content hash."""
+
+    def __init__(self, cache_dir, max_bytes: int = DEFAULT_CACHE_BYTES):
+        """
+        Args:
+            cache_dir: Directory holding the entries (created on first write)
+            max_bytes: Size cap; least recently used entries are evicted beyond it
+        """
+        self.dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Total entry size, measured on the first write
+        self._size: Optional[int] = None
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the entry stored under a key, or None."""
+        path = self.dir / namespace / f"{key}.pkl"
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            # Reads count as use for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, namespace: str, key: str, value: Any):
+        """Store an entry (atomically, so readers never see half a file)."""
+        folder = self.dir / namespace
+        folder.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        path = folder / f"{key}.pkl"
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        elif path.exists():
+            self._size -= path.stat().st_size
+        os.replace(tmp, path)
+        self._size += path.stat().st_size
+        if self._size > self.max_bytes:
+            self.evict(keep=path)
+
+    def evict(self, keep: Optional[Path] = None):
+        """Delete least recently used entries until the cache fits max_bytes."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+        self._size = total
+
+    def _entries(self):
+        """(path, size, mtime) of every entry."""
+        for path in self.dir.glob('*/*.pkl'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+    def fetch(self, namespace: str, key: str, compute: Callable[[], Any]) -> Any:
+        """Return the cached entry, computing and storing it on a miss."""
+        value = self.get(namespace, key)
+        if value is None:
+            value = compute()
+            self.put(namespace, key, value)
+        return value
+
+
+def contract_digest(contract: Dict) -> str:
+    """Hash of a loaded contract, independent of key order and formatting."""
+    text = yaml.safe_dump(contract, sort_keys=True)
+    return digest(f"v{CACHE_VERSION}", text)
+
+
+def file_digest(path, contract: Dict) -> str:
+    """Hash of a file's bytes together with the contract it is checked against."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(block)
+    return digest(h.hexdigest(), contract_digest(contract))
+
+
+def column_digest(series: pd.Series, *parts) -> str:
+    """
+    Hash of a column's values and dtype, plus anything else it depends on.
+
+    The column's buffers are hashed as they are in memory (object columns,
+    which have no flat buffer, go through hash_pandas_object).
+
+    Args:
+        series: Column values (the index is ignored)
+        parts: Extra inputs (e.g. the column's contract spec)
+
+    Returns:
+        Hex digest
+    """
+    h = hashlib.blake2b(digest_size=20)
+    for buffer in _column_buffers(series):
+        h.update(buffer)
+    extra = [str(series.dtype), len(series)] + [
+        yaml.safe_dump(p, sort_keys=True) if isinstance(p, dict) else repr(p)
+        for p in parts
+    ]
+    return digest(h.hexdigest(), *extra)
+
+
+def _column_buffers(series: pd.Series):
+    """Byte buffers that together determine a column's values."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        yield repr(dtype.categories.tolist()).encode()
+        yield np.ascontiguousarray(series.cat.codes.to_numpy())
+        return
+    if isinstance(dtype, np.dtype) and dtype != object:
+        yield np.ascontiguousarray(series.to_numpy())
+        return
+    if isinstance(series.array, pd.api.extensions.ExtensionArray) and hasattr(dtype, 'numpy_dtype'):
+        # Masked (Int*, boolean, Float*): values with nulls zeroed, and the mask
+        yield np.ascontiguousarray(series.isna().to_numpy())
+        yield np.ascontiguousarray(series.to_numpy(dtype=dtype.numpy_dtype,
+                                                   na_value=dtype.numpy_dtype.type(0)))
+        return
+    if getattr(dtype, 'storage', None) == 'pyarrow' or isinstance(dtype, pd.ArrowDtype):
+        # Arrow-backed: validity, offsets and data buffers of each chunk, uncopied
+        arrow = series.array.__arrow_array__()
+        for chunk in getattr(arrow, 'chunks', [arrow]):
+            yield f"{chunk.offset}:{len(chunk)}".encode()
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    yield memoryview(buffer)
+        return
+    yield pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+
+def digest(*parts) -> str:
+    """Hex blake2b digest of a sequence of str/bytes parts."""
+    h = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode()
+        # Length prefix keeps ('ab', 'c') and ('a', 'bc') apart
+        h.update(len(data).to_bytes(8, 'little'))
+        h.update(data)
+    return h.hexdigest()
@@ -0,0 +1,246 @@
+"""
+Memory-mapped column store for the ElectroShop datasets.
+
+A CSV can have a column store next to it: a `<stem>.columns/` directory with
+one raw binary file per column and a manifest.yaml describing them. Each
+column file holds the column's buffers back to back (64-byte aligned):
+
+- numpy columns (float, plain int/bool): the values
+- nullable Int*/boolean columns: the values and a null mask
+- categoricals: the integer codes (categories are kept in the manifest)
+- strings: Arrow-style int64 offsets, UTF-8 bytes and a null mask
+
+ColumnStore maps a column file when the column is first asked for and wraps
+the buffers without copying them (strings need pyarrow for that; without it
+they are decoded). Pages are read lazily by the OS, so loading Session_ID and
+Day for a key check touches only those two files, and repeated loads by
+tests and notebooks share the page cache instead of re-parsing the CSV.
+Columns come back with the dtypes they were written with.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+try:
+    import pyarrow as pa
+except ImportError:  # Strings are decoded instead of mapped
+    pa = None
+
+
+# Bump when the file layout or manifest format changes
+STORE_VERSION = 1
+
+# Suffix of the store directory written next to a CSV
+STORE_SUFFIX = '.columns'
+
+MANIFEST = 'manifest.yaml'
+
+# Buffer alignment inside a column file (bytes)
+ALIGN = 64
+
+
+def store_path(path) -> Path:
+    """Path of the column store belonging to a CSV (or the store itself)."""
+    path = Path(path)
+    return path if path.suffix == STORE_SUFFIX else path.with_suffix(STORE_SUFFIX)
+
+
+def write_store(df: pd.DataFrame, path) -> Path:
+    """
+    Write a frame as a column store, replacing any previous one.
+
+    Args:
+        df: Frame to store (object columns must hold strings)
+        path: CSV path (the store goes next to it) or store path
+
+    Returns:
+        Path of the store directory
+    """
+    out = store_path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=out.parent, prefix=f".{out.name}."))
+    try:
+        columns = {}
+        for i, name in enumerate(df.columns):
+            kind, meta, buffers = _encode(df[name])
+            file = f"{i:03d}.col"
+            meta['buffers'] = _write_buffers(tmp / file, buffers)
+            meta['digest'] = _file_digest(tmp / file)
+            columns[str(name)] = {'kind': kind, 'file': file, **meta}
+        # The manifest goes last: a store without one is incomplete
+        with open(tmp / MANIFEST, 'w') as f:
+            yaml.safe_dump({'version': STORE_VERSION, 'rows': len(df), 'columns': columns},
+                           f, sort_keys=False)
+        if out.exists():
+            shutil.rmtree(out)
+        os.replace(tmp, out)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return out
+
+
+class ColumnStore:
+    """A column store opened for reading; columns are mapped on first use."""
+
+    def __init__(self, path):
+        """
+        Read the manifest (no column file is opened yet).
+
+        Args:
+            path: Store directory, or the CSV it belongs to
+        """
+        self.path = store_path(path)
+        with open(self.path / MANIFEST, 'r') as f:
+            manifest = yaml.safe_load(f)
+        if manifest.get('version') != STORE_VERSION:
+            raise ValueError(
+                f"{self.path} has store version {manifest.get('version')}, "
+                f"expected {STORE_VERSION}; rewrite it with python -m src.loader --format store"
+            )
+        self.rows: int = manifest['rows']
+        self.specs: Dict[str, Dict] = manifest['columns']
+        self._maps: Dict[str, np.ndarray] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.specs)
+
+    @property
+    def manifest(self) -> Path:
+        return self.path / MANIFEST
+
+    def __contains__(self, name) -> bool:
+        return name in self.specs
+
+    def column(self, name: str) -> pd.Series:
+        """One column, backed by the mapped file."""
+        spec = self.specs.get(name)
+        if spec is None:
+            raise KeyError(f"{self.path} has no column {name!r}")
+        buffers = {
+            key: self._map(spec['file'])[offset:offset + nbytes].view(dtype)
+            for key, (offset, nbytes, dtype) in spec['buffers'].items()
+        }
+        # Without an explicit dtype pandas would infer str for object strings
+        dtype = object if spec.get('dtype') == 'object' else None
+        return pd.Series(_decode(spec, buffers, self.rows), name=name, dtype=dtype, copy=False)
+
+    def read(self, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Columns as a DataFrame, without copying their buffers.
+
+        Args:
+            columns: Columns to read, in this order (None reads all)
+
+        Returns:
+            DataFrame with the stored dtypes
+        """
+        names = self.columns if columns is None else list(columns)
+        return pd.DataFrame({name: self.column(name) for name in names}, copy=False)
+
+    def _map(self, file: str) -> np.ndarray:
+        if file not in self._maps:
+            path = self.path / file
+            # Copy-on-write: frames can be modified in place (the touched pages
+            # become private) and the file never changes. Empty files cannot be
+            # mapped (all-empty columns of a 0-row store).
+            self._maps[file] = np.memmap(path, dtype=np.uint8, mode='c').view(np.ndarray) \
+                if path.stat().st_size else np.zeros(0, dtype=np.uint8)
+        return self._maps[file]
+
+
+def _encode(col: pd.Series) -> Tuple[str, Dict, Dict[str, np.ndarray]]:
+    """Kind, manifest entry and buffers of a column."""
+    dtype = col.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'category', {
+            'categories': dtype.categories.tolist(),
+            'ordered': bool(dtype.ordered),
+        }, {'codes': col.cat.codes.to_numpy()}
+    if isinstance(dtype, pd.StringDtype) or dtype == object:
+        return 'string', {'dtype': str(dtype)}, _encode_strings(col)
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        if not hasattr(dtype, 'numpy_dtype'):
+            raise TypeError(f"{col.name}: cannot store dtype {dtype}")
+        mask = col.isna().to_numpy()
+        values = col.to_numpy(dtype=dtype.numpy_dtype, na_value=dtype.numpy_dtype.type(0))
+        return 'masked', {'dtype': str(dtype)}, {'values': values, 'mask': mask}
+    return 'numpy', {}, {'values': col.to_numpy()}
+
+
+def _encode_strings(col: pd.Series) -> Dict[str, np.ndarray]:
+    mask = col.isna().to_numpy()
+    values = col.to_numpy(dtype=object)[~mask]
+    if not all(isinstance(v, str) for v in values):
+        raise TypeError(f"{col.name}: object columns must hold strings to be stored")
+    encoded = [v.encode('utf-8') for v in values]
+    lengths = np.zeros(len(col), dtype=np.int64)
+    lengths[~mask] = [len(b) for b in encoded]
+    offsets = np.zeros(len(col) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return {'offsets': offsets, 'data': data, 'mask': mask}
+
+
+def _decode(spec: Dict, buffers: Dict[str, np.ndarray], rows: int):
+    """Array over a column's mapped buffers."""
+    kind = spec['kind']
+    if kind == 'numpy':
+        return buffers['values']
+    if kind == 'masked':
+        array_type = pd.api.types.pandas_dtype(spec['dtype']).construct_array_type()
+        return array_type(buffers['values'], buffers['mask'], copy=False)
+    if kind == 'category':
+        dtype = pd.CategoricalDtype(spec['categories'], ordered=spec['ordered'])
+        return pd.Categorical.from_codes(buffers['codes'], dtype=dtype, validate=False)
+    if kind == 'string':
+        return _decode_strings(spec['dtype'], buffers, rows)
+    raise ValueError(f"Unknown column kind {kind!r}")
+
+
+def _decode_strings(dtype: str, buffers: Dict[str, np.ndarray], rows: int):
+    mask, offsets, data = buffers['mask'], buffers['offsets'], buffers['data']
+    if pa is not None and dtype != 'object':
+        nulls = int(mask.sum())
+        validity = pa.py_buffer(np.packbits(~mask, bitorder='little')) if nulls else None
+        array = pa.Array.from_buffers(
+            pa.large_string(), rows,
+            [validity, pa.py_buffer(offsets), pa.py_buffer(data)], null_count=nulls,
+        )
+        return pd.array(array, dtype=pd.api.types.pandas_dtype(dtype))
+    raw = data.tobytes()
+    values = np.array([
+        None if null else raw[start:end].decode('utf-8')
+        for null, start, end in zip(mask.tolist(), offsets[:-1].tolist(), offsets[1:].tolist())
+    ], dtype=object)
+    return values if dtype == 'object' else pd.array(values, dtype=pd.api.types.pandas_dtype(dtype))
+
+
+def _write_buffers(path: Path, buffers: Dict[str, np.ndarray]) -> Dict[str, list]:
+    """Write buffers back to back; returns {name: [offset, nbytes, dtype]}."""
+    layout = {}
+    with open(path, 'wb') as f:
+        for key, values in buffers.items():
+            values = np.ascontiguousarray(values)
+            f.write(b'\0' * (-f.tell() % ALIGN))
+            layout[key] = [f.tell(), values.nbytes, values.dtype.str]
+            f.write(values.tobytes())
+    return layout
+
+
+def _file_digest(path: Path) -> str:
+    """Content hash recorded in the manifest, so the manifest changes with the data."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(2**20), b''):
+            h.update(block)
+    return h.hexdigest()
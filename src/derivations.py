@@ -0,0 +1,183 @@
+"""
+Derived-column rules of the ElectroShop data contract.
+
+A contract column can declare how it is computed from another one:
+
+    Campaign_Period:
+      derived_from: "Day"
+      derivation_rule: "TRUE iff Day in [25..50] or [75..90]"
+
+The rule is a membership test of the source column in a union of closed
+integer intervals `[lo..hi]` and value sets `{a, b, c}`. DerivedRule parses
+it once and, when the source has a small non-negative integer range in the
+contract (Day: [1, 100]), compiles it to a lookup table indexed by the
+source value (101 entries for Day), so evaluating an integer chunk is a
+single gather. Values outside the table, and float sources, fall back to
+the interval comparisons.
+
+The validator counts rows whose flag disagrees with the rule; preprocessing
+rebuilds the column from the same compiled rule.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.loader import parse_bool
+
+
+# Largest source value a lookup table is built for (larger ranges compare intervals)
+MAX_TABLE = 2**16
+
+_RULE = re.compile(r'^\s*TRUE\s+iff\s+(\w+)\s+in\s+(.+?)\s*$', re.IGNORECASE)
+_INTERVAL = re.compile(r'^\[\s*(-?\d+)\s*\.\.\s*(-?\d+)\s*\]$')
+_VALUES = re.compile(r'^\{\s*(-?\d+(?:\s*,\s*-?\d+)*)\s*\}$')
+
+
+class DerivedRule:
+    """A boolean column defined as `source in (intervals | values)`."""
+
+    def __init__(self, column: str, source: str, intervals: Iterable[Tuple[int, int]] = (),
+                 values: Iterable[int] = (), domain: Optional[Tuple[int, int]] = None):
+        """
+        Compile a rule.
+
+        Args:
+            column: Derived (boolean) column
+            source: Column it is derived from
+            intervals: Closed (lo, hi) intervals of source values mapping to True
+            values: Single source values mapping to True
+            domain: Contract range of the source, [lo, hi]; a table is built
+                when it is non-negative and at most MAX_TABLE
+        """
+        self.column = column
+        self.source = source
+        self.intervals: List[Tuple[int, int]] = [(int(lo), int(hi)) for lo, hi in intervals]
+        self.values = np.array(sorted(set(int(v) for v in values)), dtype=np.float64)
+        self.table = None
+        if domain is not None and 0 <= domain[0] and domain[1] <= MAX_TABLE:
+            index = np.arange(int(domain[1]) + 1, dtype=np.float64)
+            self.table = self._member(index)
+
+    @classmethod
+    def from_spec(cls, column: str, spec: Dict,
+                  columns: Optional[Dict[str, Dict]] = None) -> 'DerivedRule':
+        """
+        Parse a contract column's derivation_rule.
+
+        Args:
+            column: Derived column name
+            spec: Its contract spec (derived_from and derivation_rule)
+            columns: The contract's `columns:` section (the source's range
+                sizes the lookup table)
+
+        Returns:
+            Compiled rule
+        """
+        text = spec['derivation_rule']
+        match = _RULE.match(text)
+        if match is None:
+            raise ValueError(f"{column}: cannot parse derivation_rule {text!r}; "
+                             f"expected 'TRUE iff <column> in [lo..hi] or {{a, b}} ...'")
+        source, body = match.groups()
+        if spec.get('derived_from', source) != source:
+            raise ValueError(f"{column}: derivation_rule reads {source} "
+                             f"but derived_from is {spec['derived_from']}")
+
+        intervals, values = [], []
+        for term in re.split(r'\s+or\s+', body, flags=re.IGNORECASE):
+            # "or Day in [..]" repeats the source; drop it
+            term = re.sub(rf'^{re.escape(source)}\s+in\s+', '', term.strip(), flags=re.IGNORECASE)
+            interval, listed = _INTERVAL.match(term), _VALUES.match(term)
+            if interval:
+                intervals.append((int(interval.group(1)), int(interval.group(2))))
+            elif listed:
+                values.extend(int(v) for v in listed.group(1).split(','))
+            else:
+                raise ValueError(f"{column}: cannot parse {term!r} in derivation_rule {text!r}")
+
+        source_spec = (columns or {}).get(source) or {}
+        domain = source_spec.get('range') if source_spec.get('dtype') == 'int' else None
+        return cls(column, source, intervals, values, domain)
+
+    def evaluate(self, source: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The derived flag of every row.
+
+        Args:
+            source: Source column values
+
+        Returns:
+            (flag, known): the flag, and where the source is a number (the
+            flag of rows with a null or non-numeric source is False)
+        """
+        if self.table is not None and pd.api.types.is_integer_dtype(source):
+            known = ~source.isna().to_numpy()
+            codes = source.to_numpy(dtype=np.int64, na_value=-1)
+            # One unsigned compare: negatives (and nulls) wrap past the table
+            inside = codes.view(np.uint64) < len(self.table)
+            if inside.all():
+                return self.table[codes], known
+            flag = np.zeros(len(codes), dtype=bool)
+            flag[inside] = self.table[codes[inside]]
+            rest = known & ~inside
+            flag[rest] = self._member(codes[rest].astype(np.float64))
+            return flag, known
+
+        if not pd.api.types.is_numeric_dtype(source) or pd.api.types.is_bool_dtype(source):
+            # Values that are not numbers are the dtype check's to report
+            source = pd.to_numeric(source, errors='coerce')
+        values = source.to_numpy(dtype='float64', na_value=np.nan)
+        known = ~np.isnan(values)
+        return self._member(values) & known, known
+
+    def mismatches(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Rows whose flag disagrees with the rule (both columns non-null).
+
+        Flags are parsed like `bool` contract columns ('FALSE', '0', ...);
+        a flag that is not a boolean at all is a mismatch.
+        """
+        expected, known = self.evaluate(df[self.source])
+        actual = df[self.column]
+        present = ~actual.isna().to_numpy()
+        parsed = parse_bool(actual)
+        unparsed = present & parsed.isna().to_numpy()
+        flags = parsed.to_numpy(dtype=bool, na_value=False)
+        return known & present & ((flags != expected) | unparsed)
+
+    def count_mismatches(self, df: pd.DataFrame) -> int:
+        """Number of rows whose flag disagrees with the rule."""
+        return int(np.count_nonzero(self.mismatches(df)))
+
+    def describe(self) -> str:
+        """The rule in contract syntax."""
+        terms = [f"[{lo}..{hi}]" for lo, hi in self.intervals]
+        if len(self.values):
+            terms.append('{' + ', '.join(str(int(v)) for v in self.values) + '}')
+        return f"TRUE iff {self.source} in {' or '.join(terms)}"
+
+    def _member(self, values: np.ndarray) -> np.ndarray:
+        flag = np.isin(values, self.values)
+        for lo, hi in self.intervals:
+            flag |= (values >= lo) & (values <= hi)
+        return flag
+
+
+def compile_derivations(columns: Dict[str, Dict]) -> Dict[str, DerivedRule]:
+    """
+    Compile every derivation_rule of a contract's `columns:` section.
+
+    Args:
+        columns: The contract's `columns:` section
+
+    Returns:
+        Dict mapping each derived column to its rule
+    """
+    return {
+        name: DerivedRule.from_spec(name, spec, columns)
+        for name, spec in columns.items()
+        if (spec or {}).get('derivation_rule')
+    }
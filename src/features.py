@@ -0,0 +1,43 @@
+"""
+Feature helpers shared by the ElectroShop preprocessing of train and test.
+
+PM_RS_Combo concatenates Payment_Method and Referral_Source
+("<Payment_Method>:<Referral_Source>"). It takes only a few dozen distinct
+values, so split_combo factorizes the column, splits each distinct combo
+once and broadcasts the parts back through the integer codes instead of
+splitting every row.
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+def split_combo(combo: pd.Series, n_parts: int, separator: str = ':') -> List[pd.Series]:
+    """
+    Split a concatenated label column into its parts.
+
+    Part i of a row equals `combo.str.split(separator, expand=True)[i]`:
+    null for a null combo or one with fewer than i + 1 parts.
+
+    Args:
+        combo: Concatenated labels (object, string or category)
+        n_parts: Number of leading parts to return
+        separator: Separator between parts
+
+    Returns:
+        One object Series per part, aligned with combo
+    """
+    if isinstance(combo.dtype, pd.CategoricalDtype):
+        codes, uniques = combo.cat.codes.to_numpy(), combo.cat.categories
+    else:
+        codes, uniques = pd.factorize(combo)
+
+    # One row per distinct combo plus a trailing all-NA row for code -1
+    tables = np.full((n_parts, len(uniques) + 1), pd.NA, dtype=object)
+    for j, value in enumerate(uniques.tolist()):
+        parts = str(value).split(separator)
+        for i, part in enumerate(parts[:n_parts]):
+            tables[i, j] = part
+    return [pd.Series(table[codes], index=combo.index, dtype=object) for table in tables]
@@ -0,0 +1,116 @@
+"""
+Incremental validation state for the ElectroShop dataset.
+
+Session data grows by appending new days. Instead of revalidating all of
+history on every run, IncrementalState keeps what a full run would compute
+from the rows seen so far: per-column stats for each Day (merged with
+merge_stats, so a day delivered in several batches is fine) and persistent
+Session_ID and id key indexes. Adding a batch costs work proportional to the
+batch; the summary is rebuilt from the merged state.
+"""
+
+import os
+import pickle
+import tempfile
+from functools import reduce
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from src.cache import contract_digest
+from src.keys import PersistentKeyIndex
+from src.validation_plan import PlanPool, ValidationPlan, merge_stats
+
+
+# Bump when the layout of the saved state changes
+STATE_VERSION = 4
+
+
+class IncrementalState:
+    """Validation state of every row added so far, saved in a directory."""
+
+    def __init__(self, state_dir, contract: Dict):
+        """
+        Open the state in a directory (empty state if there is none yet).
+
+        Args:
+            state_dir: Directory holding the state
+            contract: Loaded data contract; must match the one the state was built with
+        """
+        self.dir = Path(state_dir)
+        self.contract_digest = contract_digest(contract)
+        saved: Dict[str, Any] = {}
+        path = self.dir / "state.pkl"
+        if path.exists():
+            with open(path, 'rb') as f:
+                saved = pickle.load(f)
+            if saved.get('version') != STATE_VERSION \
+                    or saved.get('contract') != self.contract_digest:
+                raise ValueError(
+                    f"State in {self.dir} was built with another contract or "
+                    f"state version; delete it and run a full validation"
+                )
+
+        self.rows = saved.get('rows', 0)
+        self.day_stats: Dict[Any, Dict[str, Dict]] = saved.get('days', {})
+        self.has_id = saved.get('has_id', False)
+        self.sessions = PersistentKeyIndex(
+            self.dir / "sessions", 'Session_ID', 'Day', saved.get('sessions')
+        )
+        self.ids = PersistentKeyIndex(self.dir / "ids", 'id', None, saved.get('ids'))
+
+    def add(self, df: pd.DataFrame, plan: ValidationPlan, workers: int = 1,
+            pool: Optional[PlanPool] = None):
+        """
+        Validate a batch of new rows and merge it into the state.
+
+        Args:
+            df: New rows
+            plan: Compiled validation plan
+            workers: Processes to run the per-column checks on
+            pool: Process pool to reuse across days and batches
+        """
+        codes, days = pd.factorize(df['Day'])
+        labels = days.tolist()
+        if len(labels) == 1 and codes.min() == 0:
+            parts = [(labels[0], df)]
+        else:
+            parts = [(label, df[codes == i]) for i, label in enumerate(labels)]
+            if (codes < 0).any():
+                parts.append((None, df[codes < 0]))
+
+        for day, part in parts:
+            stats = plan.run(part, workers=workers, pool=pool)
+            if day in self.day_stats:
+                stats = merge_stats(self.day_stats[day], stats)
+            self.day_stats[day] = stats
+
+        self.sessions.add(df)
+        if 'id' in df.columns:
+            self.has_id = True
+            self.ids.add(df)
+        self.rows += len(df)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-column stats over all rows, as ValidationPlan.run would give."""
+        if not self.day_stats:
+            raise ValueError("No rows to validate")
+        return reduce(merge_stats, self.day_stats.values())
+
+    def save(self):
+        """Write the state (atomically: a failed run leaves the old state)."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        state = {
+            'version': STATE_VERSION,
+            'contract': self.contract_digest,
+            'rows': self.rows,
+            'days': self.day_stats,
+            'has_id': self.has_id,
+            'sessions': self.sessions.state(),
+            'ids': self.ids.state(),
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.dir / "state.pkl")
@@ -0,0 +1,727 @@
+"""
+Key uniqueness checks for the ElectroShop dataset.
+
+SpilledKeyIndex checks that a key (Session_ID) is unique globally and within
+each group (Day) under a fixed memory ceiling: non-null keys are hashed into
+buckets that are spilled to disk, and every bucket is checked on its own,
+since all copies of a key land in the same bucket. An in-memory Bloom filter
+marks the buckets that can contain a duplicate at all, so clean buckets are
+never read back.
+
+count_duplicates is the in-memory counterpart: (group, key) pairs are
+factorized into one int64 code and per-group duplicates come from bincounts
+instead of a groupby-apply per group.
+
+PersistentKeyIndex keeps the keys of every batch added so far on disk, as
+one hash-sorted segment per batch, so a new batch is checked against all
+history with a binary search per key instead of re-reading it.
+
+KeyCodec turns Session_IDs such as S0000003 (a constant prefix plus
+zero-padded digits) into integers by parsing the raw string bytes, with a
+dictionary for IDs that do not follow the format. count_duplicates then
+works on sorted integer arrays instead of hashing strings.
+
+KeySketch estimates the same duplicate counts approximately, in a few kB
+whatever the data size: a HyperLogLog per key estimates the number of
+distinct keys (and (group, key) pairs), and duplicates are rows minus
+distinct keys, with an error bound from the sketch's standard error.
+"""
+
+import pickle
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from statistics import NormalDist
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # KeyCodec parses through pandas string methods instead
+    pa = None
+
+
+# Default memory ceiling for the key index (bytes)
+DEFAULT_MEMORY_LIMIT = 256 * 2**20
+
+# Top-level hash buckets; oversized buckets are re-split when read back
+DEFAULT_BUCKETS = 64
+
+# Hash functions per key in the Bloom filter
+BLOOM_HASHES = 4
+
+# Buckets smaller than this are always read back whole (bytes)
+MIN_BUCKET_BYTES = 2**20
+
+# Registers of a HyperLogLog are 2**precision (relative error ~1.04 / 2**(precision/2))
+HLL_PRECISION = 14
+
+# Re-split depth limit (64**4 buckets is far beyond any realistic export)
+MAX_SPLIT_DEPTH = 4
+
+
+class BloomFilter:
+    """Bloom filter over 64-bit key hashes, one byte per slot."""
+
+    def __init__(self, n_slots: int, n_hashes: int = BLOOM_HASHES):
+        """
+        Args:
+            n_slots: Number of filter slots (bytes of memory)
+            n_hashes: Hash functions per key
+        """
+        self.slots = np.zeros(max(n_slots, 1), dtype=bool)
+        self.n_hashes = n_hashes
+
+    def add(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Insert key hashes.
+
+        Args:
+            hashes: uint64 key hashes
+
+        Returns:
+            Boolean mask of hashes that may have been inserted before
+            (no false negatives)
+        """
+        # Double hashing: slot_i = h1 + i * h2 derived from the two halves
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        n_slots = np.uint64(len(self.slots))
+        positions = [(h1 + np.uint64(i) * h2) % n_slots for i in range(self.n_hashes)]
+
+        seen = np.ones(len(hashes), dtype=bool)
+        for pos in positions:
+            seen &= self.slots[pos]
+        for pos in positions:
+            self.slots[pos] = True
+        return seen
+
+
+class SpilledKeyIndex:
+    """Bounded-memory uniqueness check of a key, globally and within groups."""
+
+    def __init__(self, key: str = 'Session_ID', group: Optional[str] = 'Day',
+                 memory_limit: int = DEFAULT_MEMORY_LIMIT,
+                 n_buckets: int = DEFAULT_BUCKETS,
+                 spill_dir: Optional[str] = None,
+                 use_bloom: bool = True):
+        """
+        Initialize an empty index.
+
+        Args:
+            key: Key column to check
+            group: Column to check within-group uniqueness on (None to skip)
+            memory_limit: Memory ceiling in bytes; half goes to the Bloom
+                filter, half bounds the size of a bucket read back at once
+            n_buckets: Number of hash buckets spilled to disk
+            spill_dir: Parent directory for bucket files (defaults to tmp)
+            use_bloom: Skip buckets the Bloom filter proves duplicate-free
+        """
+        self.key = key
+        self.group = group
+        self.memory_limit = memory_limit
+        self.n_buckets = n_buckets
+        self.bloom = BloomFilter(memory_limit // 2) if use_bloom else None
+        self.flagged = np.full(n_buckets, not use_bloom)
+        self.null_rows = 0
+        self.null_groups: Dict[Any, int] = {}
+        self._dir = Path(tempfile.mkdtemp(prefix='keys_', dir=spill_dir))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Remove the spilled bucket files."""
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def add(self, df: pd.DataFrame):
+        """
+        Add a chunk of rows to the index.
+
+        Args:
+            df: DataFrame with the key (and group) column
+        """
+        columns = [self.key] + ([self.group] if self.group else [])
+        frame = df[columns]
+
+        # Null keys all compare equal (as in Series.duplicated); count them aside
+        nulls = frame[self.key].isna().to_numpy()
+        if nulls.any():
+            self.null_rows += int(nulls.sum())
+            if self.group:
+                counts = frame.loc[nulls, self.group].value_counts()
+                # tolist gives plain Python labels, as count_duplicates does
+                for value, count in zip(counts.index.tolist(), counts.tolist()):
+                    self.null_groups[value] = self.null_groups.get(value, 0) + count
+            frame = frame[~nulls]
+
+        hashes = _hash_keys(frame[self.key], depth=0)
+        buckets = hashes % np.uint64(self.n_buckets)
+        if self.bloom is not None:
+            maybe_dupe = self.bloom.add(hashes) | pd.Series(hashes).duplicated().to_numpy()
+            self.flagged[np.unique(buckets[maybe_dupe]).astype(np.intp)] = True
+        self._spill(frame, buckets, 'b')
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Count duplicates across everything added so far.
+
+        Returns:
+            Dict with 'global_duplicates' (int) and 'group_duplicates'
+            (group value -> duplicate count, sorted, groups with none omitted)
+        """
+        global_dupes = max(self.null_rows - 1, 0)
+        group_dupes = {g: n - 1 for g, n in self.null_groups.items() if n > 1}
+
+        for bucket in np.flatnonzero(self.flagged):
+            path = self._dir / f"b{bucket}.pkl"
+            if not path.exists():
+                continue
+            for dupes, groups in self._check_bucket(path, depth=1):
+                global_dupes += dupes
+                for g, n in groups.items():
+                    group_dupes[g] = group_dupes.get(g, 0) + n
+
+        return {
+            'global_duplicates': global_dupes,
+            'group_duplicates': dict(sorted(group_dupes.items())),
+        }
+
+    def _spill(self, frame: pd.DataFrame, buckets: np.ndarray, prefix: str):
+        """Append each bucket's rows to its spill file."""
+        order = np.argsort(buckets, kind='stable')
+        splits = np.flatnonzero(np.diff(buckets[order])) + 1
+        for rows in np.split(order, splits):
+            if len(rows) == 0:
+                continue
+            path = self._dir / f"{prefix}{buckets[rows[0]]}.pkl"
+            with open(path, 'ab') as f:
+                pickle.dump(frame.iloc[rows], f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _check_bucket(self, path: Path, depth: int) -> Iterator:
+        """Yield (duplicates, group duplicates) for a bucket, re-splitting if too big."""
+        budget = max(self.memory_limit // 2, MIN_BUCKET_BYTES)
+        if path.stat().st_size > budget and depth <= MAX_SPLIT_DEPTH:
+            prefix = f"{path.stem}_"
+            for part in _read_frames(path):
+                hashes = _hash_keys(part[self.key], depth=depth)
+                self._spill(part, hashes % np.uint64(self.n_buckets), prefix)
+            path.unlink()
+            for sub in sorted(self._dir.glob(f"{prefix}*.pkl")):
+                if sub.stem[len(prefix):].isdigit():
+                    yield from self._check_bucket(sub, depth + 1)
+            return
+
+        frame = pd.concat(list(_read_frames(path)), ignore_index=True)
+        counts = count_duplicates(frame, self.key, self.group)
+        yield counts['global_duplicates'], counts['group_duplicates']
+
+
+class PersistentKeyIndex:
+    """Uniqueness of a key, globally and within groups, across batches and runs."""
+
+    def __init__(self, directory, key: str = 'Session_ID',
+                 group: Optional[str] = 'Day', state: Optional[Dict] = None):
+        """
+        Open an index, empty or as saved by state().
+
+        Args:
+            directory: Directory holding the key segments
+            key: Key column to check
+            group: Column to check within-group uniqueness on (None to skip)
+            state: Counters and segment list from a previous state() call
+        """
+        self.dir = Path(directory)
+        self.key = key
+        self.group = group
+        state = state or {}
+        self.segments = list(state.get('segments', []))
+        self.duplicates = state.get('duplicates', 0)
+        self.group_duplicates = dict(state.get('group_duplicates', {}))
+        self.null_rows = state.get('null_rows', 0)
+        self.null_groups = dict(state.get('null_groups', {}))
+
+    def state(self) -> Dict[str, Any]:
+        """Counters and segment list to persist (segments are already on disk)."""
+        return {
+            'segments': list(self.segments),
+            'duplicates': self.duplicates,
+            'group_duplicates': dict(self.group_duplicates),
+            'null_rows': self.null_rows,
+            'null_groups': dict(self.null_groups),
+        }
+
+    def add(self, df: pd.DataFrame):
+        """
+        Count the duplicates a batch adds and store its keys as a new segment.
+
+        A row is a duplicate if its key (or key and group) occurred in any
+        earlier row, in this batch or in a previous one.
+
+        Args:
+            df: DataFrame with the key (and group) column
+        """
+        frame = df[[self.key] + ([self.group] if self.group else [])]
+        nulls = frame[self.key].isna().to_numpy()
+        if nulls.any():
+            self.null_rows += int(nulls.sum())
+            if self.group:
+                counts = frame.loc[nulls, self.group].value_counts()
+                for value, count in zip(counts.index.tolist(), counts.tolist()):
+                    self.null_groups[value] = self.null_groups.get(value, 0) + count
+            frame = frame[~nulls]
+        if len(frame) == 0:
+            return
+
+        # Keys are matched by their canonical text (25 and 25.0 agree), so
+        # batches loaded with another numeric dtype still match the history
+        text = _key_text(frame[self.key])
+        keys = _utf8(text)
+        groups = _utf8(_key_text(frame[self.group])) if self.group else None
+        valid_groups = frame[self.group].notna().to_numpy() if self.group else None
+
+        # Duplicates within the batch itself
+        batch = count_duplicates(frame, self.key, self.group)
+        self.duplicates += batch['global_duplicates']
+        for g, n in batch['group_duplicates'].items():
+            self.group_duplicates[g] = self.group_duplicates.get(g, 0) + n
+
+        # First occurrences in the batch are duplicates if history has them
+        hashes = _hash_keys(text, depth=0)
+        first = ~text.duplicated().to_numpy()
+        if self.group:
+            first_pair = ~frame.duplicated(subset=[self.key, self.group]).to_numpy()
+            first_pair &= valid_groups
+        else:
+            first_pair = np.zeros(len(keys), dtype=bool)
+        seen, seen_pair = self._lookup(hashes, keys, groups, first | first_pair)
+        self.duplicates += int(np.count_nonzero(seen & first))
+        if self.group:
+            labels = frame[self.group].to_numpy()[seen_pair & first_pair]
+            for g in pd.Series(labels).tolist():
+                self.group_duplicates[g] = self.group_duplicates.get(g, 0) + 1
+
+        self._write_segment(hashes, keys, groups)
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Duplicate counts over every batch added so far.
+
+        Returns:
+            Dict with 'global_duplicates' (int) and 'group_duplicates'
+            (group value -> duplicate count, sorted, groups with none omitted)
+        """
+        group_dupes = dict(self.group_duplicates)
+        for g, n in self.null_groups.items():
+            if n > 1:
+                group_dupes[g] = group_dupes.get(g, 0) + n - 1
+        return {
+            'global_duplicates': self.duplicates + max(self.null_rows - 1, 0),
+            'group_duplicates': dict(sorted(group_dupes.items())),
+        }
+
+    def _lookup(self, hashes: np.ndarray, keys: np.ndarray,
+                groups: Optional[np.ndarray], query: np.ndarray):
+        """Flag queried rows whose key (and key and group) occur in a stored segment."""
+        seen = np.zeros(len(keys), dtype=bool)
+        seen_pair = np.zeros(len(keys), dtype=bool)
+        rows = np.flatnonzero(query)
+        for name in self.segments:
+            seg_hashes = np.load(self.dir / f"{name}_hash.npy", mmap_mode='r')
+            left = np.searchsorted(seg_hashes, hashes[rows], side='left')
+            right = np.searchsorted(seg_hashes, hashes[rows], side='right')
+            candidates = np.flatnonzero(right > left)
+            if len(candidates) == 0:
+                continue
+            # Hash matches are rare (duplicates or collisions); confirm on the keys
+            seg_keys = np.load(self.dir / f"{name}_key.npy", mmap_mode='r')
+            seg_groups = (
+                np.load(self.dir / f"{name}_group.npy", mmap_mode='r')
+                if groups is not None else None
+            )
+            for i in candidates:
+                row = rows[i]
+                span = slice(left[i], right[i])
+                match = seg_keys[span] == keys[row]
+                seen[row] |= bool(match.any())
+                if seg_groups is not None:
+                    seen_pair[row] |= bool((match & (seg_groups[span] == groups[row])).any())
+        return seen, seen_pair
+
+    def _write_segment(self, hashes: np.ndarray, keys: np.ndarray,
+                       groups: Optional[np.ndarray]):
+        """Store a batch's keys sorted by hash, for binary search by later batches."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        name = f"seg{len(self.segments):06d}"
+        order = np.argsort(hashes, kind='stable')
+        np.save(self.dir / f"{name}_hash.npy", hashes[order])
+        np.save(self.dir / f"{name}_key.npy", keys[order])
+        if groups is not None:
+            np.save(self.dir / f"{name}_group.npy", groups[order])
+        self.segments.append(name)
+
+
+class KeyCodec:
+    """Integer codes for keys made of a prefix and fixed-width digits."""
+
+    def __init__(self, prefix: str = 'S', digits: int = 7):
+        """
+        Initialize a codec with an empty fallback dictionary.
+
+        Args:
+            prefix: Constant prefix of conforming keys
+            digits: Number of (zero-padded) digits after the prefix
+        """
+        self.prefix = prefix
+        self.digits = digits
+        self.pattern = re.compile(f"{re.escape(prefix)}[0-9]{{{digits}}}")
+        # Conforming keys encode as their number; the others from here up
+        self.base = 10 ** digits
+        self.fallback: Dict[str, int] = {}
+        self._fallback_keys: List[str] = []
+
+    @classmethod
+    def from_spec(cls, spec: Optional[Dict]) -> 'KeyCodec':
+        """Codec described by a contract column's `codec:` entry (defaults if none)."""
+        return cls(**((spec or {}).get('codec') or {}))
+
+    def encode(self, keys: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encode keys.
+
+        Args:
+            keys: Key values (string, object or category)
+
+        Returns:
+            (uint64 codes, null mask); codes of null keys are 0
+        """
+        nulls = keys.isna().to_numpy()
+        codes, conforming = self._parse(keys, nulls)
+        rest = ~conforming & ~nulls
+        if rest.any():
+            uniques, inverse = np.unique(keys[rest].astype(str).to_numpy(), return_inverse=True)
+            table = np.array([self._fallback_code(k) for k in uniques.tolist()], dtype=np.uint64)
+            codes[rest] = table[inverse]
+        return codes, nulls
+
+    def column(self, keys: pd.Series) -> pd.Series:
+        """Encoded keys as a nullable UInt32 (UInt64 if needed) column."""
+        codes, nulls = self.encode(keys)
+        if not len(codes) or codes.max() < 2**32:
+            return pd.Series(pd.arrays.IntegerArray(codes.astype(np.uint32), nulls), index=keys.index)
+        return pd.Series(pd.arrays.IntegerArray(codes, nulls), index=keys.index)
+
+    def decode(self, codes: np.ndarray) -> List[str]:
+        """Original keys of codes produced by this codec."""
+        return [
+            f"{self.prefix}{code:0{self.digits}d}" if code < self.base
+            else self._fallback_keys[code - self.base]
+            for code in np.asarray(codes, dtype=np.uint64).tolist()
+        ]
+
+    def reset(self):
+        """Forget the fallback dictionary (fallback codes restart at base)."""
+        self.fallback = {}
+        self._fallback_keys = []
+
+    def _fallback_code(self, key: str) -> int:
+        code = self.fallback.get(key)
+        if code is None:
+            code = self.fallback[key] = self.base + len(self._fallback_keys)
+            self._fallback_keys.append(key)
+        return code
+
+    def _parse(self, keys: pd.Series, nulls: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Numbers of conforming keys, and which keys conform."""
+        n = len(keys)
+        codes = np.zeros(n, dtype=np.uint64)
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            # Parse the categories once and take through the codes
+            categories = pd.Series(keys.cat.categories)
+            cat_codes, cat_ok = self._parse(categories, np.zeros(len(categories), dtype=bool))
+            idx = keys.cat.codes.to_numpy()
+            valid = idx >= 0
+            codes[valid] = cat_codes[idx[valid]]
+            conforming = np.zeros(n, dtype=bool)
+            conforming[valid] = cat_ok[idx[valid]]
+            return codes, conforming
+
+        buffers = self._byte_matrix(keys, nulls)
+        if buffers is None:
+            text = keys.astype('string')
+            conforming = text.str.fullmatch(self.pattern.pattern).fillna(False).to_numpy(dtype=bool)
+            numbers = text[conforming].str.slice(len(self.prefix)).astype('int64')
+            codes[conforming] = numbers.to_numpy(dtype=np.uint64)
+            return codes, conforming
+
+        rows, matrix = buffers
+        head = len(self.prefix.encode())
+        ok = (matrix[:, :head] == np.frombuffer(self.prefix.encode(), dtype=np.uint8)).all(axis=1)
+        # ASCII digits only: '0'..'9' are the bytes 48..57 (uint8 wraps below 48)
+        body = matrix[:, head:] - np.uint8(48)
+        ok &= (body <= 9).all(axis=1)
+        values = np.zeros(len(rows), dtype=np.uint64)
+        for j in range(body.shape[1]):
+            values = values * np.uint64(10) + body[:, j]
+        conforming = np.zeros(n, dtype=bool)
+        conforming[rows[ok]] = True
+        codes[rows[ok]] = values[ok]
+        return codes, conforming
+
+    def _byte_matrix(self, keys: pd.Series, nulls: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Rows whose UTF-8 key has the conforming length, and their bytes (rows x width)."""
+        if pa is None:
+            return None
+        try:
+            arr = pa.array(keys.array if keys.dtype != object else keys.to_numpy(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return None
+        if isinstance(arr, pa.ChunkedArray):
+            arr = arr.combine_chunks()
+        if not pa.types.is_string(arr.type) and not pa.types.is_large_string(arr.type):
+            return None
+        width = len(self.prefix.encode()) + self.digits
+        offset_type = np.int64 if pa.types.is_large_string(arr.type) else np.int32
+        offsets = np.frombuffer(arr.buffers()[1], dtype=offset_type)[arr.offset:arr.offset + len(arr) + 1]
+        data = np.frombuffer(arr.buffers()[2], dtype=np.uint8) if arr.buffers()[2] is not None \
+            else np.zeros(0, dtype=np.uint8)
+        starts = offsets[:-1].astype(np.int64)
+        rows = np.flatnonzero((np.diff(offsets) == width) & ~nulls)
+        if 0 < len(rows) == len(arr):
+            # Every key has the right length: the bytes are one contiguous block
+            matrix = data[starts[0]:starts[0] + len(arr) * width].reshape(-1, width)
+        else:
+            matrix = data[starts[rows][:, None] + np.arange(width)]
+        return rows, matrix
+
+
+class HyperLogLog:
+    """Distinct-count sketch over 64-bit hashes."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        """
+        Args:
+            precision: log2 of the number of registers (4-18)
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be in [4, 18], got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        """Standard error of estimate(), relative to the true count."""
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def add(self, hashes: np.ndarray):
+        """Add uint64 hashes (equal hashes count once)."""
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # The sentinel bit caps the rank at 64 - p + 1 for an all-zero tail
+        tail = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        # Rank = leading zeros + 1; frexp's exponent is the bit length
+        rank = (65 - np.frexp(tail.astype(np.float64))[1]).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Fold another sketch of the same precision into this one."""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        """Estimated number of distinct hashes added."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Small counts: linear counting over the empty registers
+            return float(m * np.log(m / zeros))
+        return float(raw)
+
+
+class KeySketch:
+    """Approximate duplicate counts of a key, globally and within each group."""
+
+    def __init__(self, key: str = 'Session_ID', group: Optional[str] = 'Day',
+                 codec: Optional['KeyCodec'] = None, precision: int = HLL_PRECISION):
+        """
+        Args:
+            key: Key column
+            group: Group column (None to skip the within-group estimate)
+            codec: Encode the keys to integers with this codec (much faster
+                than hashing the strings)
+            precision: HyperLogLog precision of each sketch
+        """
+        self.key = key
+        self.group = group
+        self.codec = codec
+        self.keys = HyperLogLog(precision)
+        self.pairs = HyperLogLog(precision)
+        self.rows = 0
+        self.group_rows = 0
+
+    def add(self, df: pd.DataFrame):
+        """Add a chunk's keys (nulls compare equal, as in count_duplicates)."""
+        self.rows += len(df)
+        if self.codec is not None:
+            codes, nulls = self.codec.encode(df[self.key])
+            codes = codes.astype(np.uint64)
+            codes[nulls] = np.uint64(2**64 - 1)
+            hashes = _mix64(codes)
+        elif pd.api.types.is_integer_dtype(df[self.key]):
+            hashes = _mix64(df[self.key].to_numpy(dtype='int64', na_value=-1).view(np.uint64))
+        else:
+            hashes = _hash_keys(df[self.key], depth=0)
+        self.keys.add(hashes)
+        if self.group:
+            groups = df[self.group]
+            known = groups.notna().to_numpy()
+            values = groups.to_numpy(dtype='float64', na_value=0)[known].view(np.uint64)
+            self.group_rows += int(np.count_nonzero(known))
+            self.pairs.add(_mix64(hashes[known] ^ _mix64(values)))
+
+    def result(self, confidence: float = 0.95) -> Dict[str, Any]:
+        """
+        Estimated duplicate rows, as count_duplicates counts them exactly.
+
+        Args:
+            confidence: Two-sided confidence level of the bounds
+
+        Returns:
+            Dict with 'global_duplicates' and 'group_duplicates' (None
+            without a group), each an (estimate, low, high) tuple
+        """
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        result = {'global_duplicates': _duplicate_bounds(self.rows, self.keys, z),
+                  'group_duplicates': None}
+        if self.group:
+            result['group_duplicates'] = _duplicate_bounds(self.group_rows, self.pairs, z)
+        return result
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spreads integer codes over all 64 bits."""
+    x = values.astype(np.uint64)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _duplicate_bounds(rows: int, sketch: HyperLogLog, z: float) -> Tuple[int, int, int]:
+    """Rows minus estimated distinct keys, with bounds from the sketch's error."""
+    distinct = min(sketch.estimate(), rows)
+    margin = z * sketch.relative_error * distinct
+    low = max(0, int(np.floor(rows - distinct - margin)))
+    high = min(max(rows - 1, 0), int(np.ceil(rows - distinct + margin)))
+    return max(0, round(rows - distinct)), low, high
+
+
+def count_duplicates(df: pd.DataFrame, key: str = 'Session_ID',
+                     group: Optional[str] = 'Day',
+                     codec: Optional[KeyCodec] = None) -> Dict[str, Any]:
+    """
+    Count duplicate keys globally and within each group.
+    
+    Same semantics as Series.duplicated (nulls compare equal) and as
+    groupby(group)[key].apply(lambda x: x.duplicated().sum()), with rows
+    whose group is null left out of the per-group counts.
+
+    Args:
+        df: DataFrame with the key (and group) column
+        key: Key column
+        group: Group column (None to skip per-group counts)
+        codec: Encode the keys to integers with this codec instead of
+            factorizing the raw values
+
+    Returns:
+        Dict with 'global_duplicates' (int) and 'group_duplicates'
+        (group value -> duplicate count, sorted, groups with none omitted)
+    """
+    if codec is not None:
+        key_codes, nulls = codec.encode(df[key])
+        # Nulls compare equal to each other: give them one code past the rest
+        key_codes[nulls] = key_codes.max(initial=0) + 1
+        n_keys = int(key_codes.max(initial=0)) + 1
+        n_distinct = len(sorted_distinct(key_codes))
+    else:
+        key_codes, key_uniques = pd.factorize(df[key], use_na_sentinel=False)
+        n_keys = n_distinct = len(key_uniques)
+    result = {
+        'global_duplicates': len(key_codes) - n_distinct,
+        'group_duplicates': {},
+    }
+    if group is None:
+        return result
+
+    group_codes, group_uniques = pd.factorize(df[group], sort=True)
+    valid = group_codes >= 0
+    group_codes = group_codes[valid].astype(np.int64)
+    n_groups = len(group_uniques)
+    if n_groups * n_keys > np.iinfo(np.int64).max:
+        # Codec codes too wide to pair in int64: make them dense by sorting
+        # (no hashing), which bounds the pair codes by rows**2
+        key_uniques, key_codes = np.unique(key_codes, return_inverse=True)
+        n_keys = len(key_uniques)
+
+    # One int64 code per (group, key) pair; group is recovered by division
+    pairs = group_codes * n_keys + key_codes[valid].astype(np.int64)
+    distinct_pairs = sorted_distinct(pairs) if codec is not None else pd.unique(pairs)
+    dupes = (
+        np.bincount(group_codes, minlength=n_groups)
+        - np.bincount(distinct_pairs // n_keys, minlength=n_groups)
+    )
+    labels = pd.Index(group_uniques).tolist()
+    result['group_duplicates'] = {
+        labels[i]: int(dupes[i]) for i in np.flatnonzero(dupes)
+    }
+    return result
+
+
+def sorted_distinct(values: np.ndarray) -> np.ndarray:
+    """Distinct values of an integer array, by sorting (no hashing)."""
+    values = np.sort(values)
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:] = values[1:] != values[:-1]
+    return values[keep]
+
+
+def _key_text(values: pd.Series) -> pd.Series:
+    """Values as text, with whole numbers written as integers whatever their dtype."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        numbers = values.to_numpy(dtype='float64', na_value=np.nan)
+        whole = np.isfinite(numbers) & (numbers == np.floor(numbers))
+        if whole.all() and pd.api.types.is_integer_dtype(values):
+            return pd.Series(values.to_numpy(dtype='int64').astype(str), dtype=object)
+        text = values.astype(str).to_numpy(dtype=object)
+        text[whole] = numbers[whole].astype(np.int64).astype(str)
+        return pd.Series(text, dtype=object)
+    return pd.Series(values.astype(str).to_numpy(dtype=object), dtype=object)
+
+
+def _utf8(text: pd.Series) -> np.ndarray:
+    """Text as a fixed-width UTF-8 byte array (a quarter of numpy's UTF-32 str)."""
+    return text.str.encode('utf-8').to_numpy(dtype=np.bytes_)
+
+
+def _hash_keys(keys: pd.Series, depth: int) -> np.ndarray:
+    """Hash key values to uint64, with an independent hash per split depth."""
+    return pd.util.hash_pandas_object(
+        keys, index=False, hash_key=f"electroshop{depth:05d}"
+    ).to_numpy()
+
+
+def _read_frames(path: Path) -> Iterator[pd.DataFrame]:
+    """Read back the frames appended to a spill file."""
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
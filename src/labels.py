@@ -0,0 +1,250 @@
+"""
+Dictionary-encoded label canonicalization for the ElectroShop dataset.
+
+Label columns such as Payment_Method hold a handful of distinct dirty
+spellings repeated over millions of rows. LabelMap factorizes a column,
+resolves each distinct raw label once through its rule (regexes, say) and
+memoizes the result, then broadcasts the canonical labels back through the
+integer codes. Per row the cost is an array take; the rule only ever sees a
+label the first time it appears. Labels the rule cannot place are logged
+once as unmapped.
+
+LabelStore keeps the mappings rules have found in a small YAML file next to
+the data contract (configs/label_maps.yaml), tied to the contract version.
+Maps built from the store answer known labels by dictionary lookup; the
+rules are only a fallback for labels the store has not seen, and the
+hit/miss counts show when upstream starts sending new spellings.
+"""
+
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import yaml
+
+logger = logging.getLogger(__name__)
+
+
+# A rule resolves one raw label to (canonical label, whether the rule matched)
+Rule = Callable[[str], tuple]
+
+
+def pattern_rule(patterns: Dict[str, str], replace: Sequence[Sequence[str]] = (),
+                 default: Optional[str] = 'Unknown') -> Rule:
+    """
+    Rule mapping a label to the first canonical label whose regex matches.
+
+    The label is lowercased, stripped and rewritten by the `replace` regex
+    pairs before matching.
+
+    Args:
+        patterns: Canonical label -> regex, tried in order
+        replace: (regex, replacement) pairs applied before matching
+        default: Label for values no pattern matches
+
+    Returns:
+        Rule function
+    """
+    compiled = [(label, re.compile(p)) for label, p in patterns.items()]
+    rewrite = _rewriter(replace)
+
+    def rule(raw: str) -> tuple:
+        cleaned = rewrite(raw.lower().strip())
+        for label, pattern in compiled:
+            if pattern.search(cleaned):
+                return label, True
+        return default, False
+    return rule
+
+
+def allowed_rule(allowed: Sequence[str], replace: Sequence[Sequence[str]] = ()) -> Rule:
+    """
+    Rule keeping a label only if its normalized form is allowed.
+
+    Args:
+        allowed: Canonical labels
+        replace: (regex, replacement) pairs applied after stripping/lowercasing
+
+    Returns:
+        Rule function (labels that stay outside `allowed` map to None)
+    """
+    allowed = set(allowed)
+    rewrite = _rewriter(replace)
+
+    def rule(raw: str) -> tuple:
+        cleaned = rewrite(raw.strip().lower())
+        return (cleaned, True) if cleaned in allowed else (None, False)
+    return rule
+
+
+class LabelMap:
+    """Memoized raw label -> canonical label resolution for one column."""
+
+    def __init__(self, rule: Rule, name: str = '',
+                 known: Optional[Dict[str, Optional[str]]] = None):
+        """
+        Initialize a map.
+
+        Args:
+            rule: Resolves a raw label that is not known yet
+            name: Column name used in log messages
+            known: Mappings from a LabelStore, trusted without running the rule
+        """
+        self.rule = rule
+        self.name = name
+        self.known = known or {}
+        self.mapping: Dict[str, Optional[str]] = {}
+        self.learned: Dict[str, Optional[str]] = {}
+        self.unmapped: List[str] = []
+        # Rows answered by `known` / by the rule, and rows whose label changed
+        self.hits = 0
+        self.misses = 0
+        self.changed = 0
+
+    def fitted(self) -> Dict[str, Optional[str]]:
+        """Every mapping known or placed by the rule (unmapped labels excluded)."""
+        return {**self.known, **self.learned}
+
+    def reset_counts(self):
+        """Zero the row counters before a new stream."""
+        self.hits = self.misses = self.changed = 0
+
+    def lookup(self, labels: Sequence[str]) -> tuple:
+        """
+        Canonical labels of raw labels, resolving unknown ones through the rule.
+
+        Args:
+            labels: Distinct raw labels
+
+        Returns:
+            (canonical label for each raw label, whether it was known)
+        """
+        out, known = [], []
+        for raw in labels:
+            if raw in self.known:
+                out.append(self.known[raw])
+                known.append(True)
+                continue
+            if raw not in self.mapping:
+                label, matched = self.rule(raw)
+                self.mapping[raw] = label
+                if matched:
+                    self.learned[raw] = label
+                else:
+                    self.unmapped.append(raw)
+                    logger.warning(f"{self.name}: unmapped label {raw!r} -> {label!r}")
+            out.append(self.mapping[raw])
+            known.append(False)
+        return out, known
+
+    def apply(self, values: pd.Series) -> pd.Series:
+        """
+        Canonicalize a column.
+
+        Args:
+            values: Raw labels (object, string or category)
+
+        Returns:
+            Object Series of canonical labels; nulls stay null
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values)
+        raws = [str(u) for u in uniques.tolist()]
+        labels, known = self.lookup(raws)
+
+        # Row counts per distinct label turn label-level flags into row counters
+        counts = np.bincount(codes[codes >= 0], minlength=len(raws))
+        known = np.array(known, dtype=bool)
+        changed = np.array([c is not None and c != r for c, r in zip(labels, raws)], dtype=bool)
+        self.hits += int(counts[known].sum())
+        self.misses += int(counts[~known].sum())
+        self.changed += int(counts[changed].sum())
+
+        # Code -1 (null) takes the trailing NA
+        table = np.empty(len(raws) + 1, dtype=object)
+        table[:-1] = [pd.NA if label is None else label for label in labels]
+        table[-1] = pd.NA
+        return pd.Series(table[codes], index=values.index, dtype=object)
+
+
+class LabelStore:
+    """Versioned, file-backed raw label -> canonical label maps by column."""
+
+    def __init__(self, path, contract: Dict):
+        """
+        Load the store (empty if the file is missing or for another contract).
+
+        Args:
+            path: YAML file of the store
+            contract: Loaded data contract; its `version` must match the store's
+        """
+        self.path = Path(path)
+        self.contract_version = str(contract.get('version', ''))
+        self.version = 0
+        self.columns: Dict[str, Dict[str, Optional[str]]] = {}
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f:
+            saved = yaml.safe_load(f) or {}
+        if str(saved.get('contract_version', '')) != self.contract_version:
+            logger.warning(
+                f"Ignoring label store {self.path}: built for contract "
+                f"{saved.get('contract_version')!r}, not {self.contract_version!r}"
+            )
+            return
+        self.version = saved.get('version', 0)
+        self.columns = {col: dict(m or {}) for col, m in (saved.get('columns') or {}).items()}
+
+    def mapping(self, column: str) -> Dict[str, Optional[str]]:
+        """Known mappings of a column."""
+        return self.columns.setdefault(column, {})
+
+    def learn(self, column: str, learned: Dict[str, Optional[str]]) -> int:
+        """
+        Add mappings a rule has found.
+
+        Args:
+            column: Column name
+            learned: Raw label -> canonical label
+
+        Returns:
+            Number of labels that were new to the store
+        """
+        known = self.mapping(column)
+        new = {raw: label for raw, label in learned.items() if raw not in known}
+        known.update(new)
+        return len(new)
+
+    def save(self):
+        """Write the store as the next version (atomically)."""
+        self.version += 1
+        state = {
+            'version': self.version,
+            'contract_version': self.contract_version,
+            'columns': {col: dict(sorted(m.items())) for col, m in sorted(self.columns.items())},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write("# Raw label -> canonical label, maintained by "
+                    "python -m src.preprocess --update-labels\n")
+            yaml.safe_dump(state, f, sort_keys=False, allow_unicode=True)
+        os.replace(tmp, self.path)
+
+
+def _rewriter(replace: Sequence[Sequence[str]]) -> Callable[[str], str]:
+    """Function applying (regex, replacement) pairs in order."""
+    compiled = [(re.compile(pattern), repl) for pattern, repl in replace]
+
+    def rewrite(text: str) -> str:
+        for pattern, repl in compiled:
+            text = pattern.sub(repl, text)
+        return text
+    return rewrite
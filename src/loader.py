@@ -0,0 +1,505 @@
+"""
+Typed CSV loading for the ElectroShop dataset.
+
+Column dtypes come from the contract's `columns:` section: ints become
+nullable Int64 and are narrowed to the smallest Int8/Int16/Int32 that holds
+the contract bounds, `category` columns become categoricals over the
+`allowed` list, `bool` becomes the nullable boolean dtype and `string` the
+pandas string dtype. Only the text dtypes (string, category), which any
+value parses as, are given to read_csv; the other columns are parsed with
+inferred types and then cast one by one, and a column whose cast fails
+(Age=34.5, Day='x', Campaign_Period='maybe') keeps its inferred dtype.
+Values the contract does not expect are never dropped or coerced, so the
+validator still sees them: an int column with out-of-bounds values keeps
+Int64, a fractional one stays float64 (reported by the dtype check), and a
+category column with unknown labels keeps its inferred categories.
+
+A CSV can also have a columnar Parquet artifact next to it (same stem,
+.parquet), which keeps these dtypes and dictionary-encodes string and
+category columns. load_dataset/iter_dataset read the artifact instead of the
+CSV whenever it is at least as new, so consumers skip text parsing.
+ChunkWriter writes a CSV chunk by chunk and streams its artifact alongside.
+
+A current memory-mapped column store (<stem>.columns/, see src/colstore.py)
+is preferred over both: its columns are mapped rather than parsed or
+decoded, so reading a few columns of a large dataset costs only their pages.
+"""
+
+import argparse
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import yaml
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar artifacts are optional
+    pq = None
+
+from src.colstore import MANIFEST, ColumnStore, store_path, write_store
+
+logger = logging.getLogger(__name__)
+
+
+# Nullable int dtypes tried when narrowing, smallest first
+INT_DTYPES = ('Int8', 'Int16', 'Int32')
+
+# Suffix of the columnar artifact written next to a CSV
+COLUMNAR_SUFFIX = '.parquet'
+
+# Dtype of each contract dtype (ints are narrowed after casting)
+PARSE_DTYPES = {
+    'int': 'Int64',
+    'float': 'float64',
+    'string': 'string',
+    'category': 'category',
+    'bool': 'boolean',
+}
+
+# Dtypes read_csv parses directly (any value fits; the others are cast after parsing)
+TEXT_PARSE_DTYPES = ('string', 'category')
+
+# Spellings of `bool` values (compared stripped and lowercased), as pandas' boolean parse
+TRUE_STRINGS = ('true', '1', '1.0')
+FALSE_STRINGS = ('false', '0', '0.0')
+
+
+def int_bounds(spec: Dict) -> Optional[tuple]:
+    """
+    Smallest interval the contract allows for an int column.
+
+    Args:
+        spec: Column specification from contract
+
+    Returns:
+        (low, high), or None if the contract leaves either side open
+    """
+    if 'allowed' in spec:
+        return min(spec['allowed']), max(spec['allowed'])
+    low = high = None
+    if 'range' in spec:
+        low, high = spec['range']
+    if 'ge' in spec:
+        low = spec['ge']
+    if 'gt' in spec:
+        low = spec['gt'] + 1
+    if 'le' in spec:
+        high = spec['le']
+    if 'lt' in spec:
+        high = spec['lt'] - 1
+    if low is None or high is None:
+        return None
+    return low, high
+
+
+def int_dtype(spec: Dict) -> str:
+    """Smallest nullable int dtype holding every value the contract allows."""
+    bounds = int_bounds(spec)
+    if bounds is None:
+        return 'Int64'
+    for name in INT_DTYPES:
+        info = np.iinfo(name.lower())
+        if info.min <= bounds[0] and bounds[1] <= info.max:
+            return name
+    return 'Int64'
+
+
+def narrow_int(col: pd.Series, spec: Dict) -> pd.Series:
+    """
+    Cast an int column to int_dtype(spec) if every value fits.
+
+    Args:
+        col: Integer-valued column (nullable int or float)
+        spec: Column specification from contract
+
+    Returns:
+        The cast column, or col unchanged if a value is out of bounds
+    """
+    target = int_dtype(spec)
+    if str(col.dtype) == target or not _fits(col, target):
+        return col
+    return col.astype(target)
+
+
+def read_options(contract: Dict, columns: Optional[Iterable[str]] = None,
+                 engine: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build pd.read_csv keyword arguments from the contract.
+
+    Only string and category columns get their dtype here; cast_to_contract
+    casts the rest after parsing, column by column.
+
+    Args:
+        contract: Loaded data contract
+        columns: Columns to read (None reads all, contract or not)
+        engine: read_csv engine ('c', 'python' or 'pyarrow'; None for default)
+
+    Returns:
+        Keyword arguments for pd.read_csv
+    """
+    specs = contract.get('columns', {})
+    options: Dict[str, Any] = {
+        'dtype': {
+            name: PARSE_DTYPES[spec['dtype']]
+            for name, spec in specs.items()
+            if PARSE_DTYPES.get((spec or {}).get('dtype')) in TEXT_PARSE_DTYPES
+        },
+    }
+    if columns is not None:
+        options['usecols'] = list(columns)
+        options['dtype'] = {
+            name: dtype for name, dtype in options['dtype'].items()
+            if name in options['usecols']
+        }
+
+    # Extra null markers on top of pandas' defaults ('', 'NA', 'NaN', ...)
+    na_values = {
+        name: list(spec['na_values'])
+        for name, spec in specs.items() if spec and 'na_values' in spec
+    }
+    if na_values:
+        if engine == 'pyarrow':
+            # The pyarrow engine only takes one list for all columns
+            options['na_values'] = sorted({v for vals in na_values.values() for v in vals})
+        else:
+            options['na_values'] = na_values
+
+    if engine is not None:
+        options['engine'] = engine
+    return options
+
+
+def parse_bool(col: pd.Series) -> pd.Series:
+    """
+    A column as nullable booleans, the way `bool` contract columns are cast.
+
+    Args:
+        col: Column of bools, 0/1 numbers or strings such as 'TRUE' / 'false'
+
+    Returns:
+        boolean Series; nulls and values that are not booleans are NA
+    """
+    if pd.api.types.is_bool_dtype(col):
+        return col.astype('boolean')
+    codes, uniques = pd.factorize(col)
+    labels = pd.Index(np.asarray(uniques, dtype=object)).astype(str).str.strip().str.lower()
+    mapped = np.where(labels.isin(TRUE_STRINGS), 1, np.where(labels.isin(FALSE_STRINGS), 0, -1))
+    values = np.where(codes >= 0, mapped[np.maximum(codes, 0)] if len(mapped) else -1, -1)
+    return pd.Series(pd.arrays.BooleanArray(values == 1, values < 0), index=col.index, name=col.name)
+
+
+def apply_contract_dtypes(df: pd.DataFrame, contract: Dict) -> pd.DataFrame:
+    """
+    Narrow ints and fix category vocabularies of a frame read with read_options.
+
+    Args:
+        df: Frame parsed with read_options
+        contract: Loaded data contract
+
+    Returns:
+        The same frame, with narrowed columns replaced
+    """
+    for name, spec in contract.get('columns', {}).items():
+        if not spec or name not in df.columns:
+            continue
+        col = df[name]
+        if spec.get('dtype') == 'int' and str(col.dtype) == 'Int64':
+            df[name] = narrow_int(col, spec)
+        elif spec.get('dtype') == 'category' and 'allowed' in spec \
+                and isinstance(col.dtype, pd.CategoricalDtype):
+            if set(col.cat.categories) <= set(spec['allowed']):
+                df[name] = col.cat.set_categories(spec['allowed'])
+    return df
+
+
+def load_csv(path, contract: Dict, columns: Optional[Iterable[str]] = None,
+             engine: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read a CSV with dtypes pinned by the contract (where its values allow).
+
+    Args:
+        path: CSV file path
+        contract: Loaded data contract
+        columns: Columns to read (None reads all)
+        engine: read_csv engine (None for pandas' default)
+
+    Returns:
+        Typed DataFrame
+    """
+    df = pd.read_csv(Path(path), **read_options(contract, columns, engine))
+    return cast_to_contract(df, contract)
+
+
+def iter_csv(path, contract: Dict, chunksize: int,
+             columns: Optional[Iterable[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV in typed chunks (the pyarrow engine cannot stream).
+
+    Args:
+        path: CSV file path
+        contract: Loaded data contract
+        chunksize: Rows per chunk
+        columns: Columns to read (None reads all)
+
+    Yields:
+        Typed DataFrames of up to chunksize rows
+    """
+    reader = pd.read_csv(Path(path), chunksize=chunksize,
+                         **read_options(contract, columns))
+    with reader:
+        for chunk in reader:
+            yield cast_to_contract(chunk, contract)
+
+
+def cast_to_contract(df: pd.DataFrame, contract: Dict) -> pd.DataFrame:
+    """
+    Cast an in-memory frame to the dtypes load_csv would have given it.
+
+    Columns that cannot be cast losslessly (e.g. fractional values in an
+    int column) keep their dtype.
+
+    Args:
+        df: DataFrame with contract columns
+        contract: Loaded data contract
+
+    Returns:
+        The same frame, with cast columns replaced
+    """
+    for name, spec in contract.get('columns', {}).items():
+        dtype = PARSE_DTYPES.get((spec or {}).get('dtype'))
+        if dtype is None or name not in df.columns or str(df[name].dtype) == dtype:
+            continue
+        try:
+            if dtype == 'boolean':
+                parsed = parse_bool(df[name])
+                if (parsed.isna() & df[name].notna()).any():
+                    raise ValueError(f"{name} has values that are not booleans")
+                df[name] = parsed
+            else:
+                df[name] = df[name].astype(dtype)
+        except (TypeError, ValueError):
+            logger.warning(f"{name}: cannot cast to {dtype}, keeping {df[name].dtype}")
+    return apply_contract_dtypes(df, contract)
+
+
+def columnar_path(path) -> Path:
+    """Path of the columnar artifact belonging to a CSV."""
+    return Path(path).with_suffix(COLUMNAR_SUFFIX)
+
+
+def write_columnar(df: pd.DataFrame, path, contract: Dict) -> Path:
+    """
+    Write the columnar artifact of a CSV.
+
+    Args:
+        df: DataFrame with the CSV's contents
+        path: CSV path (the artifact goes next to it) or artifact path
+        contract: Loaded data contract
+
+    Returns:
+        Path of the written artifact
+    """
+    if pq is None:
+        raise ImportError("Writing columnar artifacts requires pyarrow")
+    out = columnar_path(path)
+    # Parquet dictionary-encodes every column by default
+    cast_to_contract(df.copy(), contract).to_parquet(out, index=False)
+    return out
+
+
+class ChunkWriter:
+    """Append chunks to a CSV and, with pyarrow, its columnar artifact."""
+
+    def __init__(self, path, contract: Dict, columnar: bool = True):
+        """
+        Open the outputs (nothing is created until the first chunk).
+
+        Args:
+            path: Output CSV path
+            contract: Loaded data contract (dtypes of the columnar artifact)
+            columnar: Also write the Parquet artifact next to the CSV
+        """
+        self.path = Path(path)
+        self.contract = contract
+        self.columnar = columnar and pq is not None
+        self.rows = 0
+        self.columns: Optional[List[str]] = None
+        self._parquet = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, df: pd.DataFrame):
+        """Append one chunk."""
+        if self.columns is None:
+            self.columns = list(df.columns)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(self.path, mode='w' if self.rows == 0 else 'a',
+                  header=self.rows == 0, index=False)
+        if self.columnar:
+            self._write_columnar(df)
+        self.rows += len(df)
+
+    def close(self):
+        """Finish the columnar artifact (after the CSV, so it is not stale)."""
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+    def _write_columnar(self, df: pd.DataFrame):
+        import pyarrow as pa
+
+        frame = cast_to_contract(df.copy(), self.contract)
+        if self._parquet is None:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            self._parquet = pq.ParquetWriter(columnar_path(self.path), table.schema)
+        else:
+            # Later chunks take the first chunk's schema
+            table = pa.Table.from_pandas(frame, schema=self._parquet.schema,
+                                         preserve_index=False)
+        self._parquet.write_table(table)
+
+
+def load_dataset(path, contract: Dict, columns: Optional[Iterable[str]] = None,
+                 engine: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read a dataset, from its column store or columnar artifact if current.
+
+    Args:
+        path: CSV, Parquet file or column store path
+        contract: Loaded data contract
+        columns: Columns to read (None reads all)
+        engine: read_csv engine, if the CSV has to be parsed
+
+    Returns:
+        Typed DataFrame
+    """
+    store = _store_source(path)
+    if store is not None:
+        logger.info(f"Reading column store {store}")
+        return apply_contract_dtypes(ColumnStore(store).read(columns), contract)
+    source = _columnar_source(path)
+    if source is None:
+        return load_csv(path, contract, columns, engine)
+    logger.info(f"Reading columnar artifact {source}")
+    df = pd.read_parquet(source, columns=list(columns) if columns is not None else None)
+    return apply_contract_dtypes(df, contract)
+
+
+def iter_dataset(path, contract: Dict, chunksize: int,
+                 columns: Optional[Iterable[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a dataset in typed chunks, from its column store or columnar
+    artifact if current.
+
+    Args:
+        path: CSV, Parquet file or column store path
+        contract: Loaded data contract
+        chunksize: Rows per chunk
+        columns: Columns to read (None reads all)
+
+    Yields:
+        Typed DataFrames of up to chunksize rows
+    """
+    store = _store_source(path)
+    if store is not None:
+        logger.info(f"Streaming column store {store}")
+        # Slices of the mapped columns: each chunk pages in only its rows
+        df = apply_contract_dtypes(ColumnStore(store).read(columns), contract)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+        return
+    source = _columnar_source(path)
+    if source is None:
+        yield from iter_csv(path, contract, chunksize, columns)
+        return
+    logger.info(f"Streaming columnar artifact {source}")
+    parquet = pq.ParquetFile(source)
+    columns = list(columns) if columns is not None else None
+    for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+        yield apply_contract_dtypes(batch.to_pandas(), contract)
+
+
+def dataset_columns(path) -> List[str]:
+    """Column names of a dataset, from its manifest, Parquet schema or CSV header."""
+    store = _store_source(path)
+    if store is not None:
+        return ColumnStore(store).columns
+    source = _columnar_source(path)
+    if source is not None:
+        return pq.read_schema(source).names
+    return list(pd.read_csv(Path(path), nrows=0).columns)
+
+
+def dataset_source(path) -> Path:
+    """The file load_dataset actually reads (a store's manifest) for a dataset path."""
+    store = _store_source(path)
+    if store is not None:
+        # The manifest records a digest of every column file
+        return store / MANIFEST
+    return _columnar_source(path) or Path(path)
+
+
+def _store_source(path) -> Optional[Path]:
+    """The column store to read for a dataset path, or None."""
+    path = Path(path)
+    store = store_path(path)
+    if not (store / MANIFEST).exists():
+        return None
+    if store != path and path.exists() \
+            and (store / MANIFEST).stat().st_mtime < path.stat().st_mtime:
+        logger.warning(f"Ignoring stale column store {store}")
+        return None
+    return store
+
+
+def _columnar_source(path) -> Optional[Path]:
+    """The Parquet file to read for a dataset path, or None to parse the CSV."""
+    path = Path(path)
+    if path.suffix == COLUMNAR_SUFFIX:
+        if pq is None:
+            raise ImportError(f"Reading {path} requires pyarrow")
+        return path
+    artifact = columnar_path(path)
+    if pq is None or not artifact.exists():
+        return None
+    if path.exists() and artifact.stat().st_mtime < path.stat().st_mtime:
+        logger.warning(f"Ignoring stale columnar artifact {artifact}")
+        return None
+    return artifact
+
+
+def _fits(col: pd.Series, dtype: str) -> bool:
+    """Whether every non-null value of an int column fits a narrower dtype."""
+    if col.isna().all():
+        return True
+    info = np.iinfo(dtype.lower())
+    return info.min <= col.min() and col.max() <= info.max
+
+
+def main():
+    """Write columnar artifacts or column stores for CSVs."""
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Write Parquet artifacts or column stores next to ElectroShop CSVs")
+    parser.add_argument("csv", nargs="+", help="CSV files to convert")
+    parser.add_argument("--format", choices=["parquet", "store"], default="parquet", help="parquet: <stem>.parquet (needs pyarrow); store: memory-mapped <stem>.columns/ directory")
+    parser.add_argument("-c", "--contract", default=str(Path(__file__).parent.parent / "configs" / "data_contract.yaml"), help="Path to data_contract.yaml")
+    args = parser.parse_args()
+
+    with open(args.contract, 'r') as f:
+        contract = yaml.safe_load(f)
+    for path in args.csv:
+        df = load_csv(path, contract)
+        out = write_store(df, path) if args.format == 'store' else write_columnar(df, path, contract)
+        logger.info(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Overlapped chunk I/O for the ElectroShop streaming commands.
+
+Streaming validation and preprocessing read a chunk, work on it, then write
+it, so the disk waits on the CPU and the other way round. prefetch reads and
+parses the next chunks on a background thread while the current one is
+processed; BackgroundWriter writes finished chunks on another. Both hand
+chunks over through bounded queues: a reader that gets `depth` chunks ahead,
+or a compute loop `depth` chunks ahead of the writer, blocks until the other
+side catches up, so memory stays at a few chunks.
+
+Parsing (pandas' C reader, pyarrow) and file writes release the GIL for much
+of their time, which is what the threads overlap. Chunks keep their order,
+and an exception on a background thread is raised in the caller.
+"""
+
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+
+# Chunks each queue holds (per direction) by default
+DEFAULT_DEPTH = 2
+
+# How often a blocked put re-checks whether the consumer went away (seconds)
+_POLL = 0.1
+
+_DONE = object()
+
+
+class _Failure:
+    """An exception raised on a background thread, to re-raise in the caller."""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def prefetch(chunks: Iterable[T], depth: int = DEFAULT_DEPTH) -> Iterator[T]:
+    """
+    Iterate over chunks produced ahead of time on a background thread.
+
+    The thread starts on the first next() and stays at most `depth` chunks
+    ahead. Closing the iterator early stops it (after the chunk it is
+    reading) and closes the source.
+
+    Args:
+        chunks: Source of chunks, e.g. iter_dataset(...)
+        depth: Chunks to read ahead (0 iterates in the caller's thread)
+
+    Yields:
+        The source's chunks, in order
+    """
+    if depth <= 0:
+        yield from chunks
+        return
+
+    source = iter(chunks)
+    ready: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in source:
+                if not put(chunk):
+                    return
+            put(_DONE)
+        except BaseException as exc:
+            put(_Failure(exc))
+        finally:
+            close = getattr(source, 'close', None)
+            if close is not None:
+                close()
+
+    reader = threading.Thread(target=produce, name='prefetch', daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = ready.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        reader.join()
+
+
+class BackgroundWriter:
+    """Call a write function on a background thread, in submission order."""
+
+    def __init__(self, write: Callable[[T], None], depth: int = DEFAULT_DEPTH):
+        """
+        Start the writer thread.
+
+        Args:
+            write: Called with each submitted chunk
+            depth: Chunks that may wait to be written before submit() blocks
+                (0 writes in the caller's thread)
+        """
+        self.write = write
+        self.depth = depth
+        self.error = None
+        self._pending: queue.Queue = queue.Queue(maxsize=max(depth, 1))
+        self._thread = None
+        if depth > 0:
+            self._thread = threading.Thread(target=self._drain, name='writer', daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # An exception already on its way out is not replaced by a write error
+        self.close(raise_error=exc_type is None)
+
+    def submit(self, chunk: T):
+        """Queue a chunk (blocks while `depth` chunks are waiting)."""
+        if self.error is not None:
+            raise self.error
+        if self._thread is None:
+            self.write(chunk)
+        else:
+            self._pending.put(chunk)
+
+    def close(self, raise_error: bool = True):
+        """Wait for the queued chunks to be written, then raise a write error."""
+        if self._thread is not None:
+            self._pending.put(_DONE)
+            self._thread.join()
+            self._thread = None
+        if raise_error and self.error is not None:
+            raise self.error
+
+    def _drain(self):
+        while True:
+            chunk = self._pending.get()
+            if chunk is _DONE:
+                return
+            # After a failure keep taking chunks so submit() never blocks for good
+            if self.error is None:
+                try:
+                    self.write(chunk)
+                except BaseException as exc:
+                    self.error = exc
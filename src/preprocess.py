@@ -1,175 +1,823 @@
-import pandas as pd
+"""
+Preprocessing pipeline for the ElectroShop dataset.
+
+The raw export is turned into the interim dataset by a sequence of named
+stages configured in configs/preprocess.yaml (campaign recompute, Session_ID
+filter, combo imputation, label cleaning and canonicalization, ...). Stages
+transform one chunk at a time and keep only running counters between
+chunks, so the pipeline streams exports far larger than memory; checks that
+need the whole dataset (Session_ID uniqueness) use bounded-memory indexes
+and run when the stream ends.
+
+Stages with data-dependent state (label maps, category vocabularies, median
+imputations) follow a fit/transform split: Pipeline.fit learns the state
+from the training export, save_state writes it to a small artifact, and
+load_state reuses it to transform the test set and later scoring batches
+without refitting. Stages marked `train_only` (dropping rows) are skipped
+when scoring, so every scored session gets a row.
+
+Run with: python -m src.preprocess [--config configs/preprocess.yaml]
+Or with make: make preprocess
+"""
+
+import argparse
+import logging
+import os
+import pickle
+import tempfile
 from pathlib import Path
-import numpy as np
-
-# Load raw data
-root = "/Users/vanheyden/Documents/ESSEC/FoundationML/kaggle-electroshop/"
-train_path = root + "data/raw/dsba-m-1-challenge-purchase-prediction/train_dataset_M1_with_id.csv"
-df = pd.read_csv(train_path)
-
-# Record before true count
-before_recompute = int(df['Campaign_Period'].sum())
-
-# recompute Campaign_Period per definition: Day in [25,50] or [75,90]
-df['Campaign_Period'] = df['Day'].between(25, 50) | df['Day'].between(75, 90)
-df['Campaign_Period'] = df['Campaign_Period'].astype(bool)
-
-# sanity check
-after_recompute = int(df['Campaign_Period'].sum())
-print("Before vs after", before_recompute, after_recompute)
-
-# Drop rows with null Session_ID (potentially impute surrogate Session_IDs later)
-before = len(df)
-df = df[df['Session_ID'].notna()].copy()
-df['Session_ID'] = df['Session_ID'].astype('string').str.strip()
-after = len(df)
-
-print(f"Dropped {before - after} rows with null Session_ID.")
-assert df['Session_ID'].notna().all()
-assert not df['Session_ID'].duplicated().any(), "Session_ID must be globally unique."
-
-
-## Impute Payment_Method and Referral_Source from PM_RS_Combo
-# Check null counts before
-pm_null_before = df['Payment_Method'].isna().sum()
-rs_null_before = df['Referral_Source'].isna().sum()
-
-print("Nulls before:")
-print("  Payment_Method:", pm_null_before)
-print("  Referral_Source:", rs_null_before)
-
-# Sample combo values (optional quick check)
-print("\nPM_RS_Combo sample:", df['PM_RS_Combo'].dropna().head().tolist())
-
-# Rows where we can fill
-pm_null_with_combo = df[df['Payment_Method'].isna() & df['PM_RS_Combo'].notna()]
-rs_null_with_combo = df[df['Referral_Source'].isna() & df['PM_RS_Combo'].notna()]
-
-print("\nFillable from PM_RS_Combo:")
-print("  Payment_Method:", len(pm_null_with_combo))
-print("  Referral_Source:", len(rs_null_with_combo))
-
-# Extract values from PM_RS_Combo
-df['PM_from_combo'] = df['PM_RS_Combo'].astype('string').str.split(':', expand=True)[0]
-df['RS_from_combo'] = df['PM_RS_Combo'].astype('string').str.split(':', expand=True)[1]
-
-# Fill missing
-df['Payment_Method'] = df['Payment_Method'].fillna(df['PM_from_combo'])
-df['Referral_Source'] = df['Referral_Source'].fillna(df['RS_from_combo'])
-
-# Check null counts after
-pm_null_after = df['Payment_Method'].isna().sum()
-rs_null_after = df['Referral_Source'].isna().sum()
-
-print("\nNulls after:")
-print("  Payment_Method:", pm_null_after)
-print("  Referral_Source:", rs_null_after)
-
-# Cleanup
-df = df.drop(columns=['PM_from_combo', 'RS_from_combo'])
-
-# Final distributions
-print("\nFinal value counts:\n")
-print("Payment_Method:")
-print(df['Payment_Method'].value_counts(dropna=False))
-
-print("\nReferral_Source:")
-print(df['Referral_Source'].value_counts(dropna=False))
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.cache import contract_digest
+from src.derivations import DerivedRule, compile_derivations
+from src.features import split_combo
+from src.keys import KeyCodec, SpilledKeyIndex
+from src.labels import LabelMap, LabelStore, allowed_rule, pattern_rule
+from src.loader import ChunkWriter, iter_dataset, narrow_int
+from src.overlap import DEFAULT_DEPTH, BackgroundWriter, prefetch
 
-# Clean Time_of_Day: case-insensitive standardization and fix '0'->'o'
-orig = df['Time_of_Day'].astype('string')
-normalized = orig.str.strip().str.lower().str.replace('0', 'o', regex=False)
-allowed = {'morning', 'afternoon', 'evening'}
-
-# how many values changed due to normalization (case/zeros)
-changed_mask = orig.notna() & (orig != normalized)
-n_changed = int(changed_mask.sum())
-
-
-# keep only allowed values, set others to <NA>
-normalized = normalized.where(normalized.isin(allowed))
-n_invalid_remaining = int(normalized.isna().sum())
-
-df['Time_of_Day'] = normalized
-
-print(f"Time_of_Day: standardized {n_changed} values; {n_invalid_remaining} rows set to NaN/unrecognized.")
-assert df['Time_of_Day'].dropna().isin(allowed).all()
-
-# Convert string categorical columns to category dtype for better memory efficiency
-categorical_string_cols = ['Time_of_Day', 'Device_Type']
-for col in categorical_string_cols:
-    if col in df.columns:
-        # Convert to category dtype (keeps NaN as NaN)
-        df[col] = df[col].astype('category')
-        print(f"{col}: converted to category dtype with {df[col].cat.categories.tolist()} categories")
-
-# Verify the change
-print(f"\nTime_of_Day dtype: {df['Time_of_Day'].dtype}")
-print(f"Device_Type dtype: {df['Device_Type'].dtype}")
-
-
-# Normalize Payment_Method typos (lowercase + regex) and map to canonical categories.
-
-# create cleaned lowercase token (remove punctuation/whitespace)
-pm = df['Payment_Method'].astype('string').str.lower().str.strip()
-pm_clean = pm.str.replace(r'[^a-z0-9]+', '', regex=True)
-
-# map common typo patterns to canonical labels
-conds = [
-    pm_clean.str.contains(r'pay.*pal', na=False),
-    pm_clean.str.contains(r'cre.*it|^cred', na=False),
-    pm_clean.str.contains(r'cas.*h|^cash', na=False),
-    pm_clean.str.contains(r'bank', na=False)
-]
-choices = ['PayPal', 'Credit', 'Cash', 'Bank']
-
-# Use 'Unknown' as default instead of np.nan to avoid dtype conflict
-df['Payment_Method_norm'] = np.select(conds, choices, default='Unknown')
-# Set 'Unknown' back to NaN where original was NaN
-df.loc[df['Payment_Method'].isna(), 'Payment_Method_norm'] = pd.NA
-
-# quick sanity check
-df['Payment_Method_norm'].value_counts(dropna=False)
-
-# replace Payment_Method with Payment_Method_norm
-df['Payment_Method'] = df['Payment_Method_norm']
-
-# drop Payment_Method_norm
-df = df.drop(columns=['Payment_Method_norm'])
-
-
-# Normalize Referral_Source: lowercase, strip whitespace, fix '0'->'o'
-rs = df['Referral_Source'].astype('string').str.lower().str.strip()
-rs_clean = rs.str.replace('0', 'o', regex=False).str.replace('-', '_', regex=False).str.replace(' ', '', regex=False)
-
-# Map to canonical labels
-conds = [
-    rs_clean.str.contains(r'social.*media', na=False),
-    rs_clean.str.contains(r'direct', na=False),
-    rs_clean.str.contains(r'search.*engine', na=False),
-    rs_clean.str.contains(r'^ads?$|^ad$', na=False),
-    rs_clean.str.contains(r'email', na=False)
-]
-choices = ['Social_media', 'Direct', 'Search_engine', 'Ads', 'Email']
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
 
-# Use 'Unknown' as default, then set back to NaN where original was NaN
-df['Referral_Source_norm'] = np.select(conds, choices, default='Unknown')
-df.loc[df['Referral_Source'].isna(), 'Referral_Source_norm'] = pd.NA
 
-# Replace original with normalized version
-df['Referral_Source'] = df['Referral_Source_norm']
-df = df.drop(columns=['Referral_Source_norm'])
+# Rows per chunk when the config does not set one
+DEFAULT_CHUNKSIZE = 100_000
+
+# Bump when the layout of the saved fitted state changes
+STATE_VERSION = 1
+
+
+class Stage:
+    """A named transform applied to every chunk of the stream."""
+
+    name = ''
+
+    def __init__(self):
+        self.stats: Dict[str, int] = {}
+        # Skipped when transforming data for scoring
+        self.train_only = False
+
+    def partial_fit(self, df: pd.DataFrame):
+        """Update the fitted state from one chunk of training data."""
+
+    def end_fit(self):
+        """Finalize the fitted state once every training chunk has been seen."""
+
+    def get_state(self) -> Dict[str, Any]:
+        """Fitted state, as set_state takes it."""
+        return {}
+
+    def set_state(self, state: Dict[str, Any]):
+        """Restore a fitted state."""
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Transform one chunk (may modify it in place)."""
+        raise NotImplementedError
+
+    def finish(self):
+        """Run end-of-stream checks once every chunk has been transformed."""
+
+    def reset(self):
+        """Forget per-run counters before a new stream."""
+        self.stats = {}
+
+    def close(self):
+        """Release resources held across chunks."""
+
+    def describe(self) -> str:
+        """Label used in logs."""
+        return self.name
+
+    def _count(self, key: str, n):
+        self.stats[key] = self.stats.get(key, 0) + int(n)
+
+
+class RecomputeCampaign(Stage):
+    """Rebuild a derived flag from its source (by default the contract's derivation_rule)."""
+
+    name = 'recompute_campaign'
+
+    def __init__(self, contract: Dict, column: str = 'Campaign_Period',
+                 intervals: Optional[List[List[int]]] = None, source: str = 'Day'):
+        super().__init__()
+        if intervals is None:
+            rule = compile_derivations(contract['columns']).get(column)
+            if rule is None:
+                raise ValueError(f"recompute_campaign: {column} has no derivation_rule "
+                                 f"in the contract; configure `intervals`")
+        else:
+            rule = DerivedRule(column, source, [tuple(interval) for interval in intervals])
+        self.rule = rule
+        self.column = column
+        self.source = rule.source
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        self._count('true_before', df[self.column].sum())
+        flag, known = self.rule.evaluate(df[self.source])
+        missing = ~known
+        if missing.any():
+            # Without a Day, keep the exported flag
+            out = pd.Series(flag, index=df.index, dtype='boolean')
+            out[missing] = df.loc[missing, self.column].astype('boolean')
+            self._count('kept_without_source', missing.sum())
+        else:
+            out = flag
+        df[self.column] = out
+        self._count('true_after', df[self.column].sum())
+        return df
+
+
+class DropNullKeys(Stage):
+    """Drop rows with a null key, optionally checking the rest are unique."""
 
-# Verify standardization
-print("Standardized Referral_Source values:")
-print(df['Referral_Source'].value_counts(dropna=False))
+    name = 'drop_null_keys'
 
-# Drop Price_Sine and PM_RS_Combo (can reintroduce later if needed)
-df = df.drop(columns=['PM_RS_Combo'])
+    def __init__(self, column: str = 'Session_ID', check_unique: bool = True):
+        super().__init__()
+        self.column = column
+        self.check_unique = check_unique
+        self.index: Optional[SpilledKeyIndex] = None
 
-# Save imputed dataset
-imputed_path = root + "data/interim/train_dataset_M1_interim.csv"
-df.to_csv(imputed_path, index=False)
-print(f"Saved imputed data: {df.shape[0]:,} rows, {df.shape[1]} columns")
-print(f"New features added: {df.shape[1] - 22} missing indicators")
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        keep = df[self.column].notna()
+        self._count('dropped', (~keep).sum())
+        df = df[keep].copy()
+        df[self.column] = df[self.column].astype('string').str.strip()
+        if self.check_unique:
+            if self.index is None:
+                self.index = SpilledKeyIndex(self.column, None)
+            self.index.add(df)
+        return df
+
+    def finish(self):
+        if self.index is None:
+            return
+        dupes = self.index.result()['global_duplicates']
+        if dupes:
+            raise ValueError(f"{self.column} must be globally unique ({dupes} duplicates)")
+
+    def reset(self):
+        super().reset()
+        self.close()
+
+    def close(self):
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+
+class ImputeFromCombo(Stage):
+    """Fill nulls in several columns from a column that concatenates them."""
+
+    name = 'impute_from_combo'
+
+    def __init__(self, targets: List[str], column: str = 'PM_RS_Combo',
+                 separator: str = ':'):
+        super().__init__()
+        self.targets = list(targets)
+        self.column = column
+        self.separator = separator
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        parts = split_combo(df[self.column], len(self.targets), self.separator)
+        for target, part in zip(self.targets, parts):
+            before = df[target].isna()
+            df[target] = df[target].astype(object).fillna(part)
+            self._count(f"{target}_filled", (before & df[target].notna()).sum())
+        return df
+
+    def describe(self) -> str:
+        return f"{self.name}({self.column})"
+
+
+class CleanLabels(Stage):
+    """Lowercase and rewrite labels; anything outside `allowed` becomes null."""
+
+    name = 'clean_labels'
+
+    def __init__(self, column: str, allowed: List[str],
+                 replace: Optional[List[List[str]]] = None,
+                 known: Optional[Dict[str, Optional[str]]] = None):
+        super().__init__()
+        self.column = column
+        self.labels = LabelMap(allowed_rule(allowed, replace or []), column, known)
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        out = self.labels.apply(df[self.column])
+        self._count('null', out.isna().sum())
+        df[self.column] = out
+        return df
+
+    def finish(self):
+        self.stats.update(_label_stats(self.labels), standardized=self.labels.changed)
+
+    def end_fit(self):
+        self.labels.known = self.labels.fitted()
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'labels': self.labels.fitted()}
+
+    def set_state(self, state: Dict[str, Any]):
+        self.labels.known = dict(state['labels'])
+
+    def reset(self):
+        super().reset()
+        self.labels.reset_counts()
+
+    def describe(self) -> str:
+        return f"{self.name}({self.column})"
+
+
+class Canonicalize(Stage):
+    """Map labels onto canonical ones by the first matching regex."""
+
+    name = 'canonicalize'
+
+    def __init__(self, column: str, patterns: Dict[str, str],
+                 replace: Optional[List[List[str]]] = None, default: str = 'Unknown',
+                 known: Optional[Dict[str, Optional[str]]] = None):
+        super().__init__()
+        self.column = column
+        self.default = default
+        # Each distinct raw label goes through the regexes once per run
+        self.labels = LabelMap(pattern_rule(patterns, replace or [], default), column, known)
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        out = self.labels.apply(df[self.column])
+        self._count('default', (out == self.default).sum())
+        df[self.column] = out
+        return df
+
+    def finish(self):
+        self.stats.update(_label_stats(self.labels))
+
+    def end_fit(self):
+        self.labels.known = self.labels.fitted()
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'labels': self.labels.fitted()}
+
+    def set_state(self, state: Dict[str, Any]):
+        self.labels.known = dict(state['labels'])
+
+    def reset(self):
+        super().reset()
+        self.labels.reset_counts()
+
+    def describe(self) -> str:
+        return f"{self.name}({self.column})"
+
+
+class ToCategory(Stage):
+    """Convert columns to the category dtype over a fitted vocabulary."""
+
+    name = 'to_category'
+
+    def __init__(self, columns: List[str]):
+        super().__init__()
+        self.columns = list(columns)
+        self.vocab: Dict[str, List] = {}
+        self._seen: Dict[str, set] = {}
+
+    def partial_fit(self, df: pd.DataFrame):
+        for col in self.columns:
+            if col in df.columns:
+                self._seen.setdefault(col, set()).update(df[col].dropna().unique().tolist())
+
+    def end_fit(self):
+        self.vocab = {col: sorted(seen) for col, seen in self._seen.items()}
+        self._seen = {}
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'vocab': self.vocab}
+
+    def set_state(self, state: Dict[str, Any]):
+        self.vocab = {col: list(v) for col, v in state['vocab'].items()}
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        for col in self.columns:
+            if col not in df.columns:
+                continue
+            if col not in self.vocab:
+                df[col] = df[col].astype('category')
+                continue
+            # Labels outside the training vocabulary become null
+            seen = df[col].isin(self.vocab[col])
+            self._count(f"{col}_unseen", (df[col].notna() & ~seen).sum())
+            df[col] = df[col].where(seen).astype(pd.CategoricalDtype(self.vocab[col]))
+        return df
+
+
+class Impute(Stage):
+    """Fill nulls with fitted medians or constants, optionally flagging them."""
+
+    name = 'impute'
+
+    def __init__(self, columns: Dict[str, Any], flags: Optional[List[str]] = None):
+        """
+        Args:
+            columns: Column -> 'median' (fitted on training data) or a constant
+            flags: Columns that get a 0/1 `<column>_missing` indicator
+        """
+        super().__init__()
+        self.columns = dict(columns)
+        self.flags = list(flags or [])
+        self.fill: Dict[str, Any] = {
+            col: value for col, value in self.columns.items() if value != 'median'
+        }
+        # Value counts per median column: exact medians in one streaming pass
+        self._counts: Dict[str, pd.Series] = {}
+
+    def partial_fit(self, df: pd.DataFrame):
+        for col, value in self.columns.items():
+            if value != 'median' or col not in df.columns:
+                continue
+            counts = df[col].value_counts()
+            previous = self._counts.get(col)
+            self._counts[col] = counts if previous is None else previous.add(counts, fill_value=0)
+
+    def end_fit(self):
+        for col, counts in self._counts.items():
+            self.fill[col] = _median_from_counts(counts)
+        self._counts = {}
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'fill': self.fill}
+
+    def set_state(self, state: Dict[str, Any]):
+        self.fill = dict(state['fill'])
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        for col in self.flags:
+            df[f"{col}_missing"] = df[col].isna().astype('int8')
+        for col in self.columns:
+            # Median columns pass through until fitted (or if never observed)
+            value = self.fill.get(col)
+            if value is None or col not in df.columns:
+                continue
+            if pd.api.types.is_integer_dtype(df[col]):
+                value = int(round(value))
+            self._count(f"{col}_filled", df[col].isna().sum())
+            df[col] = df[col].fillna(value)
+        return df
+
+
+class Compact(Stage):
+    """Shrink columns to the smallest dtypes the contract allows."""
+
+    name = 'compact'
+
+    def __init__(self, contract: Dict, key: Optional[str] = 'Session_ID',
+                 surrogate: Optional[str] = 'Session_Key'):
+        """
+        Args:
+            contract: Loaded data contract
+            key: String key column to give an integer surrogate (None to
+                skip), encoded with the codec of its contract spec
+            surrogate: Name of the surrogate column
+        """
+        super().__init__()
+        self.specs = contract.get('columns', {})
+        self.key = key
+        self.surrogate = surrogate
+        self.codec = KeyCodec.from_spec(self.specs.get(key)) if key else None
+        self._reset_run()
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        before = df.memory_usage(deep=True, index=False)
+        for name, spec in self.specs.items():
+            if not spec or name not in df.columns:
+                continue
+            col = df[name]
+            if spec.get('dtype') == 'int':
+                try:
+                    df[name] = narrow_int(col, spec)
+                except (TypeError, ValueError):
+                    logger.warning(f"{name}: not integer-valued, keeping {col.dtype}")
+            elif 'allowed' in spec and spec.get('dtype') in ('category', 'string') \
+                    and not isinstance(col.dtype, pd.CategoricalDtype):
+                df[name] = col.astype(self._vocabulary(name, spec, col))
+        if self.key and self.key in df.columns:
+            df[self.surrogate] = self.codec.column(df[self.key])
+
+        after = df.memory_usage(deep=True, index=False)
+        self._before = self._before.add(before, fill_value=0)
+        self._after = self._after.add(after, fill_value=0)
+        self._rows += len(df)
+        return df
+
+    def footprint(self) -> pd.DataFrame:
+        """
+        Memory of every column before and after compaction, over the last run.
+
+        Returns:
+            DataFrame with column, bytes_before, bytes_after and their
+            per-row values, plus a TOTAL row
+        """
+        frame = pd.concat({'bytes_before': self._before, 'bytes_after': self._after},
+                          axis=1).fillna(0).astype('int64')
+        frame.loc['TOTAL'] = frame.sum()
+        rows = max(self._rows, 1)
+        frame['bytes_per_row_before'] = (frame['bytes_before'] / rows).round(2)
+        frame['bytes_per_row_after'] = (frame['bytes_after'] / rows).round(2)
+        return frame.rename_axis('column').reset_index()
+
+    def reset(self):
+        super().reset()
+        self._reset_run()
+
+    def _reset_run(self):
+        self.vocab: Dict[str, List[str]] = {}
+        if self.codec is not None:
+            self.codec.reset()
+        self._before = pd.Series(dtype='int64')
+        self._after = pd.Series(dtype='int64')
+        self._rows = 0
+
+    def _vocabulary(self, name: str, spec: Dict, col: pd.Series) -> pd.CategoricalDtype:
+        """The contract's labels, plus any others seen so far (kept, not nulled)."""
+        vocab = self.vocab.setdefault(name, [str(v) for v in spec['allowed']])
+        known = set(vocab)
+        extra = [v for v in pd.unique(col.dropna()).tolist() if v not in known]
+        if extra:
+            self._count(f"{name}_outside_vocab", col.isin(extra).sum())
+            vocab.extend(extra)
+        return pd.CategoricalDtype(vocab)
+
+
+class DropColumns(Stage):
+    """Drop columns that are no longer needed."""
+
+    name = 'drop_columns'
+
+    def __init__(self, columns: List[str]):
+        super().__init__()
+        self.columns = list(columns)
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.drop(columns=[c for c in self.columns if c in df.columns])
+
+
+# Stage classes by config name
+STAGES = {
+    cls.name: cls
+    for cls in (RecomputeCampaign, DropNullKeys, ImputeFromCombo, CleanLabels,
+                Canonicalize, ToCategory, Impute, Compact, DropColumns)
+}
+
+# Stages that canonicalize labels through a LabelMap
+LABEL_STAGES = (CleanLabels, Canonicalize)
+
+
+def build_stage(config: Dict, contract: Dict, store: Optional[LabelStore] = None) -> Stage:
+    """
+    Build one stage from its config entry.
+
+    Args:
+        config: Entry of the config's `stages:` list (name plus parameters)
+        contract: Loaded data contract (supplies clean_labels' default `allowed`)
+        store: Label store whose mappings label stages trust over their rules
+
+    Returns:
+        Configured stage
+    """
+    params = dict(config)
+    name = params.pop('name', None)
+    train_only = params.pop('train_only', False)
+    if name not in STAGES:
+        raise ValueError(f"Unknown preprocessing stage {name!r}; expected one of {sorted(STAGES)}")
+    if name in ('compact', 'recompute_campaign'):
+        params['contract'] = contract
+    if name == 'clean_labels' and 'allowed' not in params:
+        params['allowed'] = contract['columns'][params['column']]['allowed']
+    if store is not None and STAGES[name] in LABEL_STAGES:
+        params['known'] = store.mapping(params['column'])
+    stage = STAGES[name](**params)
+    stage.train_only = train_only
+    return stage
+
+
+class Pipeline:
+    """Named stages applied in order to a stream of chunks."""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+        self.rows_in = 0
+        self.rows_out = 0
+
+    @classmethod
+    def from_config(cls, config: Dict, contract: Dict,
+                    store: Optional[LabelStore] = None) -> 'Pipeline':
+        """Build the pipeline described by a loaded preprocess.yaml."""
+        stages = config.get('stages') or []
+        return cls([build_stage(entry, contract, store) for entry in stages])
+
+    def fit(self, chunks: Iterable[pd.DataFrame]) -> 'Pipeline':
+        """
+        Fit every stage's state in one pass over training chunks.
+
+        Each stage fits on its input, i.e. the chunk as the stages before it
+        transform it, then transforms the chunk for the next stage with what
+        it has fitted so far.
+
+        Args:
+            chunks: Training DataFrames, in order
+
+        Returns:
+            The pipeline itself
+        """
+        try:
+            for chunk in chunks:
+                for stage in self.stages:
+                    stage.partial_fit(chunk)
+                    chunk = stage.transform(chunk)
+            for stage in self.stages:
+                stage.end_fit()
+        finally:
+            self.close()
+        self.reset()
+        return self
+
+    def transform(self, df: pd.DataFrame, train: bool = True) -> pd.DataFrame:
+        """
+        Run one chunk through every stage.
+
+        Args:
+            df: Chunk to transform
+            train: False to skip train_only stages (scoring data)
+
+        Returns:
+            Transformed chunk
+        """
+        self.rows_in += len(df)
+        for stage in self._active(train):
+            df = stage.transform(df)
+        self.rows_out += len(df)
+        return df
+
+    def run(self, chunks: Iterable[pd.DataFrame], train: bool = True) -> Iterator[pd.DataFrame]:
+        """
+        Transform a stream of chunks lazily.
+
+        End-of-stream checks run after the last chunk has been yielded, so a
+        failing check raises from the consuming loop.
+
+        Args:
+            chunks: DataFrames to transform, in order
+            train: False to skip train_only stages (scoring data)
+
+        Yields:
+            Transformed chunks
+        """
+        self.reset()
+        try:
+            for chunk in chunks:
+                yield self.transform(chunk, train)
+            for stage in self._active(train):
+                stage.finish()
+        finally:
+            self.close()
+
+    def reset(self):
+        """Forget row and stage counters before a new stream."""
+        self.rows_in = 0
+        self.rows_out = 0
+        for stage in self.stages:
+            stage.reset()
+
+    def close(self):
+        """Release every stage's resources."""
+        for stage in self.stages:
+            stage.close()
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """Counters of every stage that kept any, by stage label."""
+        return {stage.describe(): dict(stage.stats) for stage in self.stages if stage.stats}
+
+    def label_maps(self) -> List[LabelMap]:
+        """Label maps of the label stages, in stage order."""
+        return [stage.labels for stage in self.stages if isinstance(stage, LABEL_STAGES)]
+
+    def save_state(self, path, contract: Dict):
+        """
+        Write every stage's fitted state (atomically).
+
+        Args:
+            path: Artifact path
+            contract: Loaded data contract the pipeline was fitted under
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        state = {
+            'version': STATE_VERSION,
+            'contract': contract_digest(contract),
+            'stages': [(stage.describe(), stage.get_state()) for stage in self.stages],
+        }
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def load_state(self, path, contract: Dict) -> 'Pipeline':
+        """
+        Restore the fitted state written by save_state.
+
+        Args:
+            path: Artifact path
+            contract: Loaded data contract; must match the one fitted under
+
+        Returns:
+            The pipeline itself
+        """
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('version') != STATE_VERSION \
+                or state.get('contract') != contract_digest(contract):
+            raise ValueError(f"{path} was fitted under another contract or state version; refit")
+        labels = [label for label, _ in state['stages']]
+        if labels != [stage.describe() for stage in self.stages]:
+            raise ValueError(f"{path} was fitted with stages {labels}; refit")
+        for stage, (_, stage_state) in zip(self.stages, state['stages']):
+            stage.set_state(stage_state)
+        return self
+
+    def _active(self, train: bool) -> List[Stage]:
+        return [stage for stage in self.stages if train or not stage.train_only]
+
+
+def preprocess(chunks: Iterable[pd.DataFrame], pipeline: Pipeline,
+               writer: ChunkWriter, train: bool = True,
+               depth: int = DEFAULT_DEPTH) -> Dict[str, Dict[str, int]]:
+    """
+    Stream chunks through a pipeline into a writer.
+
+    With depth > 0 the next chunks are read on a background thread and
+    finished ones written on another while the pipeline transforms.
+
+    Args:
+        chunks: Raw chunks
+        pipeline: Configured (and fitted, if it has fitted stages) pipeline
+        writer: Output writer
+        train: False to skip train_only stages (scoring data)
+        depth: Chunks the reader and writer may run ahead or behind (0: in sequence)
+
+    Returns:
+        The pipeline's stage counters
+    """
+    with writer, BackgroundWriter(writer.write, depth) as background:
+        for chunk in pipeline.run(prefetch(chunks, depth), train):
+            background.submit(chunk)
+    return pipeline.report()
+
+
+def label_metrics(pipeline: Pipeline, store: Optional[LabelStore] = None) -> pd.DataFrame:
+    """
+    Hit/miss counters of every label map, one row per column.
+
+    Hits are rows answered by the label store, misses rows whose label had to
+    go through the stage's rules; new labels are distinct labels the rules
+    placed, unmapped ones those they could not.
+
+    Args:
+        pipeline: Pipeline that has run
+        store: Label store the pipeline was built with
+
+    Returns:
+        DataFrame with column, store_version, hits, misses, hit_rate,
+        new_labels and unmapped_labels
+    """
+    rows = []
+    for labels in pipeline.label_maps():
+        total = labels.hits + labels.misses
+        rows.append({
+            'column': labels.name,
+            'store_version': store.version if store is not None else None,
+            'hits': labels.hits,
+            'misses': labels.misses,
+            'hit_rate': round(labels.hits / total, 4) if total else None,
+            'new_labels': len(labels.learned),
+            'unmapped_labels': len(labels.unmapped),
+        })
+    return pd.DataFrame(rows, columns=['column', 'store_version', 'hits', 'misses',
+                                       'hit_rate', 'new_labels', 'unmapped_labels'])
+
+
+def _median_from_counts(counts: pd.Series) -> Optional[float]:
+    """Median of the values a value_counts Series describes (as Series.median)."""
+    counts = counts[counts > 0].sort_index()
+    if counts.empty:
+        return None
+    cumulative = counts.cumsum().to_numpy()
+    values = counts.index.to_numpy(dtype=float)
+    n = int(cumulative[-1])
+    lo = values[np.searchsorted(cumulative, (n - 1) // 2, side='right')]
+    hi = values[np.searchsorted(cumulative, n // 2, side='right')]
+    return float((lo + hi) / 2)
+
+
+def _label_stats(labels: LabelMap) -> Dict[str, int]:
+    """Stage counters of a label map."""
+    return {'store_hits': labels.hits, 'store_misses': labels.misses,
+            'unmapped_labels': len(labels.unmapped)}
+
+
+def main():
+    """Fit the configured pipeline on the training export and apply it."""
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description="Preprocess the ElectroShop raw exports")
+    parser.add_argument("--config", default=str(project_root / "configs" / "preprocess.yaml"), help="Path to preprocess.yaml")
+    parser.add_argument("-c", "--contract", default=str(project_root / "configs" / "data_contract.yaml"), help="Path to data_contract.yaml")
+    parser.add_argument("-i", "--input", help="Dataset to fit on, or with --from-state to transform (overrides the config)")
+    parser.add_argument("-o", "--output", help="Output CSV for --input (overrides the config)")
+    parser.add_argument("--state", help="Fitted state artifact (overrides the config)")
+    parser.add_argument("--from-state", action="store_true", help="Transform without refitting: load the fitted state and apply it to --input or the config's apply: datasets")
+    parser.add_argument("--chunksize", type=int, help="Rows per chunk (overrides the config)")
+    parser.add_argument("--no-columnar", action="store_true", help="Do not write Parquet artifacts next to the outputs")
+    parser.add_argument("--prefetch", type=int, default=DEFAULT_DEPTH, help="Chunks to read ahead and write behind on background threads (0: read, transform and write in sequence)")
+    parser.add_argument("-r", "--reports-dir", default=str(project_root / "reports"), help="Directory for label_map_metrics.csv and memory_footprint.csv")
+    parser.add_argument("--update-labels", action="store_true", help="Save labels the rules placed to the label store as a new version")
+    args = parser.parse_args()
+    if args.from_state and bool(args.input) != bool(args.output):
+        parser.error("--from-state takes --input and --output together")
+
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f) or {}
+    with open(args.contract, 'r') as f:
+        contract = yaml.safe_load(f)
+
+    chunksize = args.chunksize or config.get('chunksize', DEFAULT_CHUNKSIZE)
+    state_path = Path(args.state or project_root / config['state'])
+    store = LabelStore(project_root / config['label_store'], contract) \
+        if config.get('label_store') else None
+    pipeline = Pipeline.from_config(config, contract, store)
+
+    footprints = []
+
+    def run(input_path: Path, output_path: Path, train: bool) -> pd.DataFrame:
+        writer = ChunkWriter(output_path, contract, columnar=not args.no_columnar)
+        logger.info(f"Preprocessing {input_path} in chunks of {chunksize:,} rows")
+        report = preprocess(iter_dataset(input_path, contract, chunksize), pipeline, writer,
+                            train, depth=args.prefetch)
+        for stage, stats in report.items():
+            logger.info(f"{stage}: " + ", ".join(f"{k}={v:,}" for k, v in stats.items()))
+        logger.info(f"Saved {output_path}: {writer.rows:,} of {pipeline.rows_in:,} rows, "
+                    f"{len(writer.columns or [])} columns")
+        for stage in pipeline.stages:
+            if isinstance(stage, Compact):
+                footprint = stage.footprint()
+                footprint.insert(0, 'dataset', input_path.name)
+                footprints.append(footprint)
+                total = footprint.iloc[-1]
+                logger.info(f"Memory per row: {total['bytes_per_row_before']:,.1f} -> "
+                            f"{total['bytes_per_row_after']:,.1f} bytes")
+        metrics = label_metrics(pipeline, store)
+        metrics.insert(0, 'dataset', input_path.name)
+        return metrics
+
+    targets = [(Path(args.input), Path(args.output))] if args.input and args.output else [
+        (project_root / entry['input'], project_root / entry['output'])
+        for entry in config.get('apply') or []
+    ]
+    metrics = []
+    if args.from_state:
+        pipeline.load_state(state_path, contract)
+        logger.info(f"Loaded fitted state {state_path}")
+    else:
+        train_input = Path(args.input or project_root / config['input'])
+        train_output = Path(args.output or project_root / config['output'])
+        logger.info(f"Fitting on {train_input}")
+        pipeline.fit(prefetch(iter_dataset(train_input, contract, chunksize), args.prefetch))
+        pipeline.save_state(state_path, contract)
+        logger.info(f"Saved fitted state {state_path}")
+        metrics.append(run(train_input, train_output, train=True))
+        if args.input:
+            targets = []
+    for input_path, output_path in targets:
+        metrics.append(run(input_path, output_path, train=False))
+
+    reports_dir = Path(args.reports_dir)
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    metrics_path = reports_dir / "label_map_metrics.csv"
+    pd.concat(metrics, ignore_index=True).to_csv(metrics_path, index=False)
+    logger.info(f"Saved label map metrics: {metrics_path}")
+    if footprints:
+        footprint_path = reports_dir / "memory_footprint.csv"
+        pd.concat(footprints, ignore_index=True).to_csv(footprint_path, index=False)
+        logger.info(f"Saved memory footprint: {footprint_path}")
+
+    if args.update_labels and store is not None:
+        new = sum(store.learn(labels.name, labels.learned) for labels in pipeline.label_maps())
+        if new:
+            store.save()
+            logger.info(f"Label store {store.path}: {new} new labels, now version {store.version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,657 @@
+"""
+Column profiles of the ElectroShop datasets, built from mergeable sketches.
+
+A Profile summarizes every column of a dataset in one streaming pass:
+
+- rows, nulls and (numeric columns) infs
+- distinct values: HyperLogLog (src.keys)
+- numeric columns: count, mean, variance, skewness and kurtosis from
+  central moments, min/max, and quantiles from a KLL sketch (a stack of
+  compactors; level h holds items standing for 2**h rows each)
+- categorical columns and columns with allowed values: heavy hitters from a
+  Count-Min sketch plus its top-k candidate values (Payment_Method,
+  Referral_Source, ...); key columns get distinct counts only
+
+Every part merges exactly (moments, counters, HLL registers, Count-Min
+tables) or with the sketch's usual error (KLL), so profiles built per chunk
+or per Day add up to the profile of the whole file. Profiles are saved as
+small versioned gzipped pickles (tens of kB whatever the data size), merged
+with `merge`, and compared with diff_profiles, which reports null, moment,
+quantile and distinct-count changes per column, the KS distance between
+quantile sketches and the largest share change among heavy hitters.
+
+Usage:
+    python -m src.profiling profile --data train.csv --tag raw [--by Day]
+    python -m src.profiling merge reports/profiles/raw.Day -o reports/profiles/all.profile
+    python -m src.profiling diff reports/profiles/raw.profile reports/profiles/interim.profile
+"""
+
+import argparse
+import copy
+import gzip
+import logging
+import os
+import pickle
+import tempfile
+from functools import reduce
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.keys import HyperLogLog
+from src.loader import iter_dataset
+from src.overlap import DEFAULT_DEPTH, prefetch
+
+logger = logging.getLogger(__name__)
+
+
+# Bump when the layout of saved profiles changes
+PROFILE_VERSION = 1
+
+# Suffix of saved profiles
+PROFILE_SUFFIX = '.profile'
+
+# Rows per chunk of the profiling pass
+PROFILE_CHUNKSIZE = 100_000
+
+# KLL capacity of the top compactor (rank error well under 1% at 400)
+QUANTILE_K = 400
+
+# Count-Min table size (overestimates by <= e/width of the rows, w.p. 1 - e**-depth)
+CM_WIDTH = 2048
+CM_DEPTH = 4
+
+# Heavy-hitter candidates kept per column
+TOP_K = 20
+
+# HyperLogLog precision of the distinct counts (4 kB, ~1.6% error)
+DISTINCT_PRECISION = 12
+
+# Quantiles reported in summaries and diffs
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Contract dtypes profiled as numbers
+NUMERIC_DTYPES = ('int', 'float')
+
+# Odd multipliers of the Count-Min rows (multiply-shift hashing)
+_CM_MULTIPLIERS = np.array([
+    0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+    0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9,
+], dtype=np.uint64)
+
+
+class QuantileSketch:
+    """KLL quantile sketch of a stream of floats."""
+
+    def __init__(self, k: int = QUANTILE_K):
+        """
+        Args:
+            k: Capacity of the top compactor; lower levels get 2/3 of the one above
+        """
+        self.k = k
+        self.n = 0
+        self.levels: List[np.ndarray] = []
+        # Which half of a sorted level is promoted next (alternates per level)
+        self._parity: List[int] = []
+
+    def add(self, values: np.ndarray):
+        """Add values (nulls and infs must be removed by the caller)."""
+        if len(values):
+            self.n += len(values)
+            self._append(0, np.asarray(values, dtype=np.float64))
+            self._compress()
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Fold another sketch into this one."""
+        for level, items in enumerate(other.levels):
+            self._append(level, items)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """Estimated quantiles (NaN when empty)."""
+        values, cum = self._weighted()
+        if len(values) == 0:
+            return np.full(len(qs), np.nan)
+        pos = np.searchsorted(cum, np.asarray(qs) * cum[-1], side='left')
+        return values[np.minimum(pos, len(values) - 1)]
+
+    def cdf(self, x: np.ndarray) -> np.ndarray:
+        """Estimated fraction of values <= x."""
+        values, cum = self._weighted()
+        if len(values) == 0:
+            return np.zeros(len(x))
+        pos = np.searchsorted(values, x, side='right')
+        return np.where(pos > 0, cum[np.maximum(pos - 1, 0)], 0) / cum[-1]
+
+    def items(self) -> np.ndarray:
+        """All retained items (each a representative of 2**level values)."""
+        return np.concatenate(self.levels) if self.levels else np.zeros(0)
+
+    def _weighted(self):
+        """Retained items sorted, with their cumulative weights."""
+        if not self.levels:
+            return np.zeros(0), np.zeros(0)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        values = self.items()
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def _append(self, level: int, items: np.ndarray):
+        while len(self.levels) <= level:
+            self.levels.append(np.zeros(0))
+            self._parity.append(0)
+        self.levels[level] = np.concatenate([self.levels[level], items])
+
+    def _capacity(self, level: int) -> int:
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - level))))
+
+    def _compress(self):
+        """Compact every level over its capacity (promoting half its items)."""
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self.levels)):
+                items = self.levels[level]
+                if len(items) <= self._capacity(level):
+                    continue
+                items = np.sort(items)
+                # An odd item out stays at this level
+                keep, items = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = items[self._parity[level]::2]
+                self._parity[level] ^= 1
+                self.levels[level] = keep
+                self._append(level + 1, promoted)
+                compacted = True
+
+
+class FrequencySketch:
+    """Count-Min sketch with its top-k candidate values (heavy hitters)."""
+
+    def __init__(self, width: int = CM_WIDTH, depth: int = CM_DEPTH, top: int = TOP_K):
+        """
+        Args:
+            width: Counters per row (a power of two)
+            depth: Rows (independent hashes), at most 8
+            top: Candidate values kept
+        """
+        if width & (width - 1) or not 1 <= depth <= len(_CM_MULTIPLIERS):
+            raise ValueError(f"Count-Min width must be a power of two and depth in [1, 8], "
+                             f"got {width} and {depth}")
+        self.top = top
+        self.n = 0
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.candidates: Dict[str, int] = {}
+
+    def add(self, values: pd.Series):
+        """Count non-null values (compared as strings)."""
+        counts = values.value_counts(dropna=True)
+        if len(counts) == 0:
+            return
+        labels = counts.index.astype(str)
+        if labels.has_duplicates:
+            counts = counts.groupby(labels).sum()
+            labels = counts.index
+        labels = labels.to_numpy(dtype=object)
+        self.n += int(counts.sum())
+        cells, counts = self._cells(labels), counts.to_numpy(dtype=np.int64)
+        for row in range(len(self.table)):
+            np.add.at(self.table[row], cells[row], counts)
+        self._prune(labels)
+
+    def merge(self, other: 'FrequencySketch') -> 'FrequencySketch':
+        """Fold another sketch of the same shape into this one."""
+        self.table += other.table
+        self.n += other.n
+        self._prune(np.array(list(other.candidates), dtype=object))
+        return self
+
+    def estimate(self, labels: np.ndarray) -> np.ndarray:
+        """Estimated counts of values (never below the true count)."""
+        if len(labels) == 0:
+            return np.zeros(0, dtype=np.int64)
+        cells = self._cells(np.asarray(labels, dtype=object))
+        return self.table[np.arange(len(self.table))[:, None], cells].min(axis=0)
+
+    def heavy_hitters(self, n: Optional[int] = None) -> Dict[str, int]:
+        """The most frequent values and their estimated counts, descending."""
+        ranked = sorted(self.candidates.items(), key=lambda item: (-item[1], item[0]))
+        return dict(ranked[:n or self.top])
+
+    def _cells(self, labels: np.ndarray) -> np.ndarray:
+        hashes = pd.util.hash_array(labels)
+        shift = np.uint64(64 - int(np.log2(self.table.shape[1])))
+        multipliers = _CM_MULTIPLIERS[:len(self.table), None]
+        return ((hashes[None, :] * multipliers) >> shift).astype(np.intp)
+
+    def _prune(self, labels: np.ndarray):
+        """Re-estimate the candidates and new labels; keep the top ones."""
+        labels = np.union1d(np.array(list(self.candidates), dtype=object), labels) \
+            if self.candidates else labels
+        estimates = self.estimate(labels)
+        best = np.argsort(-estimates, kind='stable')[:self.top]
+        self.candidates = {str(labels[i]): int(estimates[i]) for i in best}
+
+
+class ColumnProfile:
+    """Sketches of one column."""
+
+    def __init__(self, name: str, numeric: bool, frequencies: bool, key: bool = False):
+        """
+        Args:
+            name: Column name
+            numeric: Profile values as numbers (moments and quantiles)
+            frequencies: Keep heavy hitters
+            key: Key column (distinct count only, besides nulls)
+        """
+        self.name = name
+        self.key = key
+        self.numeric = numeric and not key
+        self.rows = 0
+        self.nulls = 0
+        self.infs = 0
+        self.distinct = HyperLogLog(DISTINCT_PRECISION)
+        # count, mean and central moment sums M2, M3, M4 of the finite values
+        self.moments = np.zeros(5)
+        self.min = np.inf
+        self.max = -np.inf
+        self.quantiles = QuantileSketch() if self.numeric else None
+        self.frequencies = FrequencySketch() if frequencies and not key else None
+
+    @property
+    def kind(self) -> str:
+        return 'key' if self.key else 'numeric' if self.numeric else 'categorical'
+
+    def add(self, col: pd.Series):
+        """Add a chunk of the column."""
+        self.rows += len(col)
+        if self.numeric:
+            if not pd.api.types.is_numeric_dtype(col) or pd.api.types.is_bool_dtype(col):
+                # Unparseable values count as nulls
+                col = pd.to_numeric(col, errors='coerce')
+            values = col.to_numpy(dtype='float64', na_value=np.nan)
+            values = values[~np.isnan(values)]
+            self.nulls += len(col) - len(values)
+            # +0.0 so -0.0 and 0.0 hash alike
+            self.distinct.add(pd.util.hash_array(values + 0.0))
+            finite = values[np.isfinite(values)]
+            self.infs += len(values) - len(finite)
+            if len(finite):
+                self.moments = _combine_moments(self.moments, _moments(finite))
+                self.min = min(self.min, float(finite.min()))
+                self.max = max(self.max, float(finite.max()))
+                self.quantiles.add(finite)
+        else:
+            present = col.dropna()
+            self.nulls += len(col) - len(present)
+            self.distinct.add(pd.util.hash_array(pd.Index(present.unique()).astype(str).to_numpy(dtype=object)))
+        if self.frequencies is not None:
+            self.frequencies.add(col)
+
+    def merge(self, other: 'ColumnProfile') -> 'ColumnProfile':
+        """Fold another profile of the same column into this one."""
+        if other.kind != self.kind:
+            raise ValueError(f"Cannot merge {other.kind} and {self.kind} profiles of {self.name}")
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.infs += other.infs
+        self.distinct.merge(other.distinct)
+        self.moments = _combine_moments(self.moments, other.moments)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        if self.frequencies is not None and other.frequencies is not None:
+            self.frequencies.merge(other.frequencies)
+        elif other.frequencies is not None:
+            self.frequencies = copy.deepcopy(other.frequencies)
+        return self
+
+    def summary(self, quantiles: Sequence[float] = QUANTILES) -> Dict[str, Any]:
+        """Flat summary of the column (one row of Profile.summary)."""
+        n, mean, m2, m3, m4 = self.moments
+        row: Dict[str, Any] = {
+            'column': self.name,
+            'kind': self.kind,
+            'rows': self.rows,
+            'nulls': self.nulls,
+            'null_pct': round(100 * self.nulls / self.rows, 2) if self.rows else 0.0,
+            'distinct': round(self.distinct.estimate()),
+        }
+        if self.numeric:
+            row.update({
+                'infs': self.infs,
+                'mean': mean if n else np.nan,
+                'std': np.sqrt(m2 / (n - 1)) if n > 1 else np.nan,
+                'skew': np.sqrt(n) * m3 / m2 ** 1.5 if m2 > 0 else np.nan,
+                'kurtosis': n * m4 / (m2 * m2) - 3 if m2 > 0 else np.nan,
+                'min': self.min if n else np.nan,
+                'max': self.max if n else np.nan,
+            })
+            row.update({_quantile_name(q): v for q, v in zip(quantiles, self.quantiles.quantiles(quantiles))})
+        if self.frequencies is not None:
+            row['top_values'] = '; '.join(f"{value}: {count:,}"
+                                          for value, count in self.frequencies.heavy_hitters(5).items())
+        return row
+
+
+class Profile:
+    """Column profiles of a dataset (or part of one)."""
+
+    def __init__(self, contract: Dict):
+        """
+        Args:
+            contract: Loaded data contract (decides how each column is profiled)
+        """
+        self.specs: Dict[str, Dict] = contract.get('columns', {})
+        constraints = contract.get('constraints', {}) or {}
+        self.keys = set(constraints.get('primary_keys', [])) | {'id'}
+        self.rows = 0
+        self.columns: Dict[str, ColumnProfile] = {}
+
+    def add(self, df: pd.DataFrame):
+        """Add a chunk of rows."""
+        self.rows += len(df)
+        for name in df.columns:
+            if name not in self.columns:
+                self.columns[name] = self._new_column(name, df[name])
+            self.columns[name].add(df[name])
+
+    def merge(self, other: 'Profile') -> 'Profile':
+        """Fold another profile (other chunks, days or files) into this one."""
+        self.rows += other.rows
+        for name, column in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(column)
+            else:
+                self.columns[name] = copy.deepcopy(column)
+        return self
+
+    def summary(self) -> pd.DataFrame:
+        """One row per column: nulls, distinct count, moments, quantiles, top values."""
+        return pd.DataFrame([column.summary() for column in self.columns.values()])
+
+    def save(self, path) -> Path:
+        """Write the profile (gzipped, atomically)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+            pickle.dump({'version': PROFILE_VERSION, 'profile': self}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path) -> 'Profile':
+        """Read a saved profile."""
+        with gzip.open(path, 'rb') as f:
+            saved = pickle.load(f)
+        if saved.get('version') != PROFILE_VERSION:
+            raise ValueError(f"{path} has profile version {saved.get('version')}, "
+                             f"expected {PROFILE_VERSION}; profile the data again")
+        return saved['profile']
+
+    def _new_column(self, name: str, col: pd.Series) -> ColumnProfile:
+        spec = self.specs.get(name)
+        if spec is not None:
+            spec = spec or {}
+            numeric = spec.get('dtype') in NUMERIC_DTYPES
+            frequencies = not numeric or 'allowed' in spec
+        else:
+            numeric = pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col)
+            frequencies = not numeric
+        return ColumnProfile(name, numeric, frequencies, key=name in self.keys)
+
+
+def profile_file(path, contract: Dict, by: Optional[str] = None,
+                 columns: Optional[Iterable[str]] = None,
+                 chunksize: int = PROFILE_CHUNKSIZE, depth: int = DEFAULT_DEPTH):
+    """
+    Profile a dataset in one streaming pass.
+
+    Args:
+        path: Dataset path (CSV, or with a Parquet artifact / column store)
+        contract: Loaded data contract
+        by: Also profile each value of this column separately (e.g. 'Day')
+        columns: Columns to profile (None: all)
+        chunksize: Rows per chunk
+        depth: Chunks to read ahead on a background thread
+
+    Returns:
+        The Profile, or with `by` a dict mapping each value (None for
+        nulls) to its Profile; merging them gives the whole file's
+    """
+    whole = Profile(contract)
+    groups: Dict[Any, Profile] = {}
+    for chunk in prefetch(iter_dataset(path, contract, chunksize, columns), depth):
+        if by is None:
+            whole.add(chunk)
+            continue
+        for value, part in chunk.groupby(by, dropna=False, sort=False):
+            value = None if pd.isna(value) else value
+            if value not in groups:
+                groups[value] = Profile(contract)
+            groups[value].add(part)
+    if by is None:
+        return whole
+    # Nulls last
+    return dict(sorted(groups.items(), key=lambda item: (item[0] is None, item[0] or 0)))
+
+
+def merge_profiles(profiles: Iterable[Profile]) -> Profile:
+    """Merge profiles into a new one (the inputs are left unchanged)."""
+    profiles = list(profiles)
+    if not profiles:
+        raise ValueError("No profiles to merge")
+    return reduce(Profile.merge, profiles[1:], copy.deepcopy(profiles[0]))
+
+
+def save_group_profiles(profiles: Dict[Any, Profile], directory, by: str) -> List[Path]:
+    """Write one profile per group value as <directory>/<by>=<value>.profile."""
+    directory = Path(directory)
+    return [profile.save(directory / f"{by}={value}{PROFILE_SUFFIX}")
+            for value, profile in profiles.items()]
+
+
+def load_profiles(paths: Iterable) -> List[Profile]:
+    """Load profiles from files and directories of .profile files."""
+    profiles = []
+    for path in map(Path, paths):
+        files = sorted(path.glob(f"*{PROFILE_SUFFIX}")) if path.is_dir() else [path]
+        if not files:
+            raise ValueError(f"No {PROFILE_SUFFIX} files in {path}")
+        profiles += [Profile.load(f) for f in files]
+    return profiles
+
+
+def diff_profiles(base: Profile, other: Profile,
+                  quantiles: Sequence[float] = QUANTILES) -> pd.DataFrame:
+    """
+    Compare two profiles column by column.
+
+    Args:
+        base: Reference profile (e.g. training data, or an earlier day)
+        other: Profile compared to it
+        quantiles: Quantiles to compare
+
+    Returns:
+        One row per column with the base and other values of null %,
+        distinct count, mean, std and quantiles, plus `ks` (max distance
+        between the quantile sketches' CDFs, numeric columns) and
+        `top_shift` (largest change in the share of a heavy hitter, in
+        percentage points), sorted by the largest of the KS distance (in
+        percent), the top share shift and the null % change
+    """
+    rows = []
+    for name in list(base.columns) + [c for c in other.columns if c not in base.columns]:
+        a, b = base.columns.get(name), other.columns.get(name)
+        sa = a.summary(quantiles) if a is not None else {}
+        sb = b.summary(quantiles) if b is not None else {}
+        row: Dict[str, Any] = {'column': name, 'kind': (a or b).kind,
+                               'status': 'removed' if b is None else 'added' if a is None else ''}
+        metrics = ['null_pct', 'distinct', 'mean', 'std'] + [_quantile_name(q) for q in quantiles]
+        for metric in metrics:
+            if metric in sa or metric in sb:
+                row[f"{metric}_base"] = sa.get(metric, np.nan)
+                row[f"{metric}_other"] = sb.get(metric, np.nan)
+        if a is not None and b is not None:
+            if a.numeric and b.numeric:
+                row['ks'] = _ks_distance(a.quantiles, b.quantiles)
+            if a.frequencies is not None and b.frequencies is not None:
+                row['top_shift'] = _top_shift(a.frequencies, b.frequencies)
+        rows.append(row)
+    diff = pd.DataFrame(rows)
+    for col in ('ks', 'top_shift'):
+        if col not in diff.columns:
+            diff[col] = np.nan
+    nulls = (diff['null_pct_other'] - diff['null_pct_base']).abs()
+    change = np.fmax(np.fmax(diff['ks'] * 100, diff['top_shift']), nulls)
+    return diff.iloc[np.argsort(-change.fillna(-1).to_numpy(), kind='stable')].reset_index(drop=True)
+
+
+def print_profile(summary: pd.DataFrame):
+    """Print a profile summary."""
+    print("\n" + "=" * 80)
+    print("COLUMN PROFILES")
+    print("=" * 80)
+    for row in summary.to_dict('records'):
+        line = f"  {row['column']} ({row['kind']}): {row['nulls']:,} nulls ({row['null_pct']:.2f}%), ~{row['distinct']:,} distinct"
+        if row['kind'] == 'numeric' and not pd.isna(row.get('mean')):
+            line += (f", mean {row['mean']:.4g} ± {row['std']:.4g}, "
+                     f"[{row['min']:.4g} | {row['p05']:.4g} {row['p50']:.4g} {row['p95']:.4g} | {row['max']:.4g}]")
+        print(line)
+        if isinstance(row.get('top_values'), str) and row['top_values']:
+            print(f"      top: {row['top_values']}")
+
+
+def print_diff(diff: pd.DataFrame, limit: int = 20):
+    """Print the columns that changed most between two profiles."""
+    print("\n" + "=" * 80)
+    print("PROFILE DIFF (largest changes first)")
+    print("=" * 80)
+    for row in diff.head(limit).to_dict('records'):
+        if row['status']:
+            print(f"  {row['column']}: {row['status']}")
+            continue
+        parts = [f"nulls {row['null_pct_base']:.2f}% → {row['null_pct_other']:.2f}%"]
+        if not pd.isna(row.get('ks')):
+            parts.append(f"KS {row['ks']:.3f}, median {row['p50_base']:.4g} → {row['p50_other']:.4g}")
+        if not pd.isna(row.get('top_shift')):
+            parts.append(f"top value share shift {row['top_shift']:.2f} pp")
+        print(f"  {row['column']}: " + ", ".join(parts))
+
+
+def _moments(values: np.ndarray) -> np.ndarray:
+    """count, mean and central moment sums of a chunk."""
+    mean = values.mean()
+    d = values - mean
+    d2 = d * d
+    return np.array([len(values), mean, d2.sum(), (d2 * d).sum(), (d2 * d2).sum()])
+
+
+def _combine_moments(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Moments of the union of two disjoint sets of values (Pébay's formulas)."""
+    na, ma, m2a, m3a, m4a = a
+    nb, mb, m2b, m3b, m4b = b
+    if na == 0:
+        return b.copy()
+    if nb == 0:
+        return a.copy()
+    n = na + nb
+    delta = mb - ma
+    mean = ma + delta * nb / n
+    m2 = m2a + m2b + delta ** 2 * na * nb / n
+    m3 = (m3a + m3b + delta ** 3 * na * nb * (na - nb) / n ** 2
+          + 3 * delta * (na * m2b - nb * m2a) / n)
+    m4 = (m4a + m4b + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+          + 6 * delta ** 2 * (na * na * m2b + nb * nb * m2a) / n ** 2
+          + 4 * delta * (na * m3b - nb * m3a) / n)
+    return np.array([n, mean, m2, m3, m4])
+
+
+def _ks_distance(a: QuantileSketch, b: QuantileSketch) -> float:
+    """Largest gap between two sketched CDFs (evaluated at their items)."""
+    if a.n == 0 or b.n == 0:
+        return np.nan
+    points = np.union1d(a.items(), b.items())
+    return float(np.abs(a.cdf(points) - b.cdf(points)).max())
+
+
+def _top_shift(a: FrequencySketch, b: FrequencySketch) -> float:
+    """Largest change in share (percentage points) of either side's heavy hitters."""
+    if a.n == 0 or b.n == 0:
+        return np.nan
+    labels = np.array(sorted(set(a.candidates) | set(b.candidates)), dtype=object)
+    shares_a = a.estimate(labels) / a.n
+    shares_b = b.estimate(labels) / b.n
+    return float(100 * np.abs(shares_a - shares_b).max())
+
+
+def _quantile_name(q: float) -> str:
+    return f"p{round(q * 100):02d}"
+
+
+def main():
+    """Profile datasets, merge saved profiles, or diff two of them."""
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Column profiles of ElectroShop datasets from mergeable sketches")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    profile = commands.add_parser("profile", help="Profile a dataset in one pass")
+    profile.add_argument("-d", "--data", required=True, help="Path to dataset CSV")
+    profile.add_argument("-c", "--contract", default=str(Path(__file__).parent.parent / "configs" / "data_contract.yaml"), help="Path to data_contract.yaml")
+    profile.add_argument("-r", "--reports-dir", default=str(Path(__file__).parent.parent / "reports"), help="Directory for the summary CSV and saved profiles")
+    profile.add_argument("-t", "--tag", default=None, help="Optional tag for report files (e.g., raw, interim)")
+    profile.add_argument("--by", default=None, help="Also save one profile per value of this column (e.g. Day)")
+    profile.add_argument("--chunksize", type=int, default=PROFILE_CHUNKSIZE, help="Rows per chunk")
+
+    merge = commands.add_parser("merge", help="Merge saved profiles (files or directories)")
+    merge.add_argument("profiles", nargs="+", help="Profile files or directories of them")
+    merge.add_argument("-o", "--out", required=True, help="Merged profile path")
+
+    diff = commands.add_parser("diff", help="Compare two saved profiles")
+    diff.add_argument("base", help="Reference profile (file or directory of them)")
+    diff.add_argument("other", help="Profile compared to it (file or directory of them)")
+    diff.add_argument("-o", "--out", default=None, help="Also save the diff as CSV")
+    args = parser.parse_args()
+
+    if args.command == "profile":
+        with open(args.contract, 'r') as f:
+            contract = yaml.safe_load(f)
+        reports_dir = Path(args.reports_dir)
+        name = args.tag or Path(args.data).stem
+        result = profile_file(args.data, contract, by=args.by, chunksize=args.chunksize)
+        if args.by is not None:
+            directory = reports_dir / "profiles" / f"{name}.{args.by}"
+            save_group_profiles(result, directory, args.by)
+            logger.info(f"Saved {len(result)} per-{args.by} profiles to {directory}")
+            result = merge_profiles(result.values())
+        out = result.save(reports_dir / "profiles" / f"{name}{PROFILE_SUFFIX}")
+        logger.info(f"Profile saved to {out}")
+        summary = result.summary()
+        print_profile(summary)
+        summary_path = reports_dir / f"profile__{name}.csv"
+        summary.to_csv(summary_path, index=False)
+        logger.info(f"Profile summary saved to {summary_path}")
+    elif args.command == "merge":
+        merged = merge_profiles(load_profiles(args.profiles))
+        logger.info(f"Merged profile of {merged.rows:,} rows saved to {merged.save(args.out)}")
+        print_profile(merged.summary())
+    else:
+        base, other = (merge_profiles(load_profiles([p])) for p in (args.base, args.other))
+        result = diff_profiles(base, other)
+        print_diff(result)
+        if args.out:
+            Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+            result.to_csv(args.out, index=False)
+            logger.info(f"Profile diff saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Row-level quarantine for the ElectroShop datasets.
+
+SchemaValidator reports aggregate counts ("Age has N values outside range").
+RowChecks turns the same contract rules into one bit each and computes, per
+row, a uint64 mask of the rules the row fails: null where nulls are not
+allowed, each bound, allowed values, regex/max_length, infs in float columns, derived flags
+disagreeing with their derivation_rule, and Session_ID /
+id values already seen earlier in the dataset (the first occurrence of a key
+stays clean). Quarantine splits each chunk on that mask as it streams by:
+rows with a zero mask go to the clean output, the others to the quarantine
+output with the mask in a `failed_checks` column. Downstream training reads
+the clean file as is.
+
+Bit i of `failed_checks` is rule i of RowChecks.legend(), which is also
+saved next to the outputs.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.keys import KeyCodec, sorted_distinct
+from src.loader import ChunkWriter
+from src.validation_plan import NUMERIC_DTYPES, compile_plan
+
+logger = logging.getLogger(__name__)
+
+
+# Name of the bitmask column added to quarantined rows
+MASK_COLUMN = 'failed_checks'
+
+# Bits of a key code in a packed (group, key) code of duplicate_in_day;
+# the group's number takes the bits above
+KEY_BITS = 32
+
+# Validator check (see validate_schema.CHECKS) each row rule belongs to
+RULE_CHECKS = {
+    'nulls': 'nulls',
+    'range': 'ranges',
+    'ge': 'ranges',
+    'gt': 'ranges',
+    'le': 'ranges',
+    'lt': 'ranges',
+    'regex': 'patterns',
+    'max_length': 'patterns',
+    'allowed': 'allowed',
+    'derived': 'derived',
+    'inf': 'finite',
+    'duplicate': 'keys',
+    'duplicate_in_day': 'keys',
+}
+
+
+class RowChecks:
+    """Contract rules compiled to one bit each, evaluated per row."""
+
+    def __init__(self, contract: Dict, checks: Optional[Iterable[str]] = None,
+                 key: str = 'Session_ID', group: str = 'Day', id_column: str = 'id'):
+        """
+        Compile the contract's rules.
+
+        Args:
+            contract: Loaded data contract
+            checks: Validator checks whose rules to include (None: all)
+            key: Key column that must be unique, globally and within a group
+            group: Group column of the within-group key check
+            id_column: Row id column that must be unique (if present)
+        """
+        specs = contract.get('columns', {})
+        self.plan = compile_plan(contract)
+        self.key = key
+        self.group = group
+        self.id_column = id_column
+        self.codec = KeyCodec.from_spec(specs.get(key))
+        checks = None if checks is None else set(checks)
+
+        self.rules: List[Tuple[str, str]] = []
+        for name, spec in specs.items():
+            spec = spec or {}
+            kernel = self.plan.kernel(name)
+            rules = ([] if kernel.allow_null else ['nulls']) \
+                + [bound for bound, _ in kernel.bounds] \
+                + (['allowed'] if kernel.allowed is not None else []) \
+                + kernel.patterns \
+                + (['derived'] if name in self.plan.derivations else []) \
+                + (['inf'] if spec.get('dtype') == 'float' else [])
+            self.rules += [(rule, name) for rule in rules]
+        self.rules += [('duplicate', key), ('duplicate_in_day', key), ('duplicate', id_column)]
+        if checks is not None:
+            self.rules = [r for r in self.rules if RULE_CHECKS[r[0]] in checks]
+        if len(self.rules) > 64:
+            raise ValueError(f"{len(self.rules)} row rules do not fit a 64-bit mask")
+        self.bits = {rule: np.uint64(1) << np.uint64(i) for i, rule in enumerate(self.rules)}
+        self.reset()
+
+    def reset(self):
+        """Forget the keys seen so far (before checking another dataset)."""
+        self._seen: Dict[str, np.ndarray] = {}
+        # Number of each group value, in order of first appearance
+        self._groups: Dict[Any, int] = {}
+        self.codec.reset()
+
+    def legend(self) -> pd.DataFrame:
+        """Bit number, check, rule and column of every rule."""
+        return pd.DataFrame([
+            {'bit': i, 'check': RULE_CHECKS[rule], 'rule': rule, 'column': column}
+            for i, (rule, column) in enumerate(self.rules)
+        ])
+
+    def masks(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Failure bitmask of every row of a chunk.
+
+        Chunks must come in dataset order: key rules remember the keys of
+        earlier chunks.
+
+        Args:
+            df: Chunk of the dataset
+
+        Returns:
+            uint64 array, 0 for rows that pass every rule
+        """
+        mask = np.zeros(len(df), dtype=np.uint64)
+        columns = {column for _, column in self.rules}
+        for name in columns & set(self.plan.kernels) & set(df.columns):
+            kernel = self.plan.kernel(name)
+            numeric = kernel.spec.get('dtype') in NUMERIC_DTYPES
+            for rule, failed in kernel.row_failures(df[name], numeric=numeric).items():
+                if (rule, name) in self.bits:
+                    mask[failed] |= self.bits[(rule, name)]
+        for (rule, column), bit in self.bits.items():
+            if rule.startswith('duplicate') and column in df.columns:
+                mask[self._repeated(df, rule, column)] |= bit
+            elif rule == 'derived' and column in df.columns:
+                derivation = self.plan.derivations[column]
+                if derivation.source in df.columns:
+                    mask[derivation.mismatches(df)] |= bit
+        return mask
+
+    def _repeated(self, df: pd.DataFrame, rule: str, column: str) -> np.ndarray:
+        """Rows whose (group and) key appeared in an earlier row."""
+        if column == self.key:
+            codes, nulls = self.codec.encode(df[column])
+        else:
+            codes, nulls = _integer_codes(df[column])
+        if rule == 'duplicate_in_day':
+            if self.group not in df.columns:
+                return np.zeros(len(df), dtype=bool)
+            groups, group_nulls = self._group_numbers(df[self.group])
+            nulls = nulls | group_nulls
+            if codes[~nulls].max(initial=0) >> np.uint64(KEY_BITS) \
+                    or len(self._groups) > 2**(64 - KEY_BITS):
+                raise ValueError(f"{column} codes or {self.group} values do not fit the "
+                                 f"{KEY_BITS}-bit packing of {rule}")
+            codes = (groups << np.uint64(KEY_BITS)) | codes
+        repeated = np.zeros(len(df), dtype=bool)
+        valid = np.flatnonzero(~nulls)
+        values = codes[valid]
+
+        # Repeats within the chunk: all but the first of each run of equal codes
+        order = np.argsort(values, kind='stable')
+        ordered = values[order]
+        later = np.zeros(len(values), dtype=bool)
+        later[order[1:]] = ordered[1:] == ordered[:-1]
+        # Repeats of keys from earlier chunks
+        seen = self._seen.get(rule + column, np.zeros(0, dtype=np.uint64))
+        pos = np.searchsorted(seen, values)
+        earlier = (pos < len(seen)) & (seen[np.minimum(pos, len(seen) - 1)] == values) \
+            if len(seen) else np.zeros(len(values), dtype=bool)
+        repeated[valid] = later | earlier
+
+        # Merge the new keys into the sorted history without re-sorting it
+        new = sorted_distinct(values[~earlier])
+        self._seen[rule + column] = np.insert(seen, np.searchsorted(seen, new), new)
+        return repeated
+
+    def _group_numbers(self, groups: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """Stable uint64 number of each row's group (equal values, equal numbers), and nulls."""
+        codes, uniques = pd.factorize(groups)
+        numbers = np.array([self._groups.setdefault(value, len(self._groups))
+                            for value in uniques.tolist()], dtype=np.uint64)
+        nulls = codes < 0
+        if not len(numbers):
+            return np.zeros(len(codes), dtype=np.uint64), nulls
+        return numbers[np.where(nulls, 0, codes)], nulls
+
+
+def _integer_codes(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    uint64 codes of an integer key column, whatever dtype it loaded as.
+
+    Values that are not whole numbers ('x', 2.5) count as nulls, so they
+    never match a key.
+
+    Returns:
+        (codes, null mask); codes of nulls are 0
+    """
+    if pd.api.types.is_integer_dtype(values.dtype):
+        nulls = values.isna().to_numpy()
+        return values.to_numpy(dtype='int64', na_value=0).view(np.uint64), nulls
+    numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    nulls = ~np.isfinite(numbers) | (numbers != np.floor(numbers))
+    codes = np.where(nulls, 0, numbers).astype(np.int64).view(np.uint64)
+    return codes, nulls
+
+
+class Quarantine:
+    """Split chunks into clean and quarantined rows as they stream by."""
+
+    def __init__(self, checks: RowChecks, clean_path, quarantine_path,
+                 contract: Dict, columnar: bool = False):
+        """
+        Open the outputs (written as chunks arrive).
+
+        Args:
+            checks: Compiled row rules
+            clean_path: CSV for rows that pass every rule
+            quarantine_path: CSV for the others, with their failed_checks mask
+            contract: Loaded data contract (dtypes of columnar artifacts)
+            columnar: Also write Parquet artifacts next to the CSVs
+        """
+        self.checks = checks
+        self.clean = ChunkWriter(clean_path, contract, columnar)
+        self.quarantine = ChunkWriter(quarantine_path, contract, columnar)
+        self.rule_counts = np.zeros(len(checks.rules), dtype=np.int64)
+        self._empty: Optional[pd.DataFrame] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def split(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Write one chunk's rows to the clean and quarantine outputs.
+
+        Args:
+            df: Chunk of the dataset (chunks must come in dataset order)
+
+        Returns:
+            (clean rows, quarantined rows with their failed_checks column)
+        """
+        mask = self.checks.masks(df)
+        failed = mask != 0
+        clean = df[~failed]
+        quarantined = df[failed].assign(**{MASK_COLUMN: mask[failed]})
+        for writer, rows in ((self.clean, clean), (self.quarantine, quarantined)):
+            if len(rows):
+                writer.write(rows)
+        for i in range(len(self.rule_counts)):
+            self.rule_counts[i] += np.count_nonzero(mask & (np.uint64(1) << np.uint64(i)))
+        if self._empty is None:
+            self._empty = quarantined.iloc[:0]
+        return clean, quarantined
+
+    def tap(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Split chunks while passing them on unchanged (e.g. to validation)."""
+        for chunk in chunks:
+            self.split(chunk)
+            yield chunk
+
+    def close(self):
+        """Finish the outputs; one that got no rows is written with its header only."""
+        for writer, empty in ((self.clean, self._empty), (self.quarantine, self._empty)):
+            if writer.rows == 0 and empty is not None:
+                header = empty if writer is self.quarantine else empty.drop(columns=MASK_COLUMN)
+                writer.path.parent.mkdir(parents=True, exist_ok=True)
+                header.to_csv(writer.path, index=False)
+            writer.close()
+
+    def report(self) -> pd.DataFrame:
+        """The rule legend with the number of quarantined rows failing each rule."""
+        legend = self.checks.legend()
+        legend['rows'] = self.rule_counts
+        return legend
+
+    @property
+    def rows(self) -> Dict[str, int]:
+        return {'clean': self.clean.rows, 'quarantined': self.quarantine.rows}
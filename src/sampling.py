@@ -0,0 +1,166 @@
+"""
+Row sampling for fast, approximate validation of the ElectroShop datasets.
+
+Reservoir keeps a uniform random sample of a stream of chunks without
+knowing its length: every row gets a random priority and the sample is the
+`size` rows with the smallest priorities seen so far (bottom-k sampling,
+equivalent to a classic reservoir but vectorized per chunk and independent
+of chunk size). With `stratify` one such reservoir is kept per value of a
+column (Day), so every day is represented however skewed the days are.
+
+Sampled rows carry weights (rows in their stratum / rows sampled from it),
+so rates estimated from a stratified sample stay unbiased. wilson_interval
+turns a weighted violation count into a confidence interval for the rate.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Sampled rows by default
+DEFAULT_SAMPLE_SIZE = 10_000
+
+# Confidence level of the reported intervals by default
+DEFAULT_CONFIDENCE = 0.95
+
+# Violation rate a sampled run may leave unresolved: a rule whose interval
+# includes zero is only rerun exactly if its upper bound exceeds this
+DEFAULT_TOLERANCE = 0.01
+
+
+class Reservoir:
+    """Uniform (or per-stratum uniform) random sample of a stream of chunks."""
+
+    def __init__(self, size: int = DEFAULT_SAMPLE_SIZE, stratify: Optional[str] = None,
+                 strata: Optional[int] = None, seed: int = 0):
+        """
+        Args:
+            size: Rows to sample in total
+            stratify: Column whose values are sampled separately (None: one reservoir)
+            strata: Number of distinct values of `stratify` (nulls count as
+                one); each gets an equal share of `size`
+            seed: Seed of the row priorities (same seed, same sample)
+        """
+        if stratify is not None and not strata:
+            raise ValueError(f"Stratifying by {stratify} needs its number of values")
+        self.size = size
+        self.stratify = stratify
+        self.per_stratum = math.ceil(size / strata) if stratify is not None else size
+        self.rng = np.random.default_rng(seed)
+        self.rows = 0
+        self.population: Dict = {}
+        self._sample: Optional[pd.DataFrame] = None
+        self._priority = np.zeros(0)
+        self._row = np.zeros(0, dtype=np.int64)
+
+    def add(self, chunk: pd.DataFrame):
+        """Offer the rows of the next chunk to the sample."""
+        priority = self.rng.random(len(chunk))
+        row = np.arange(self.rows, self.rows + len(chunk), dtype=np.int64)
+        self.rows += len(chunk)
+        if self.stratify is not None:
+            counts = chunk[self.stratify].value_counts(dropna=False)
+            for value, count in zip(counts.index.tolist(), counts.tolist()):
+                value = _stratum(value)
+                self.population[value] = self.population.get(value, 0) + count
+
+        if self._sample is None:
+            pool, pool_priority, pool_row = chunk, priority, row
+        else:
+            pool = pd.concat([self._sample, chunk], ignore_index=True)
+            pool_priority = np.concatenate([self._priority, priority])
+            pool_row = np.concatenate([self._row, row])
+        keep = self._bottom_k(pool, pool_priority)
+        self._sample = pool.iloc[keep].reset_index(drop=True)
+        self._priority = pool_priority[keep]
+        self._row = pool_row[keep]
+
+    def sample(self) -> pd.DataFrame:
+        """The sampled rows, in the order they were read."""
+        if self._sample is None:
+            raise ValueError("No rows to sample")
+        order = np.argsort(self._row, kind='stable')
+        return self._sample.iloc[order].reset_index(drop=True)
+
+    def weights(self) -> np.ndarray:
+        """Rows each sampled row stands for, aligned with sample()."""
+        sample = self.sample()
+        if self.stratify is None:
+            return np.full(len(sample), self.rows / len(sample))
+        strata = [_stratum(value) for value in sample[self.stratify].tolist()]
+        sampled: Dict = {}
+        for value in strata:
+            sampled[value] = sampled.get(value, 0) + 1
+        return np.array([self.population[value] / sampled[value] for value in strata])
+
+    def _bottom_k(self, pool: pd.DataFrame, priority: np.ndarray) -> np.ndarray:
+        """Positions of the lowest-priority rows (per stratum), in pool order."""
+        if self.stratify is None:
+            if len(priority) <= self.size:
+                return np.arange(len(priority))
+            return np.sort(np.argpartition(priority, self.size)[:self.size])
+        codes, _ = pd.factorize(pool[self.stratify], use_na_sentinel=False)
+        # Sort by stratum, then priority; keep the first per_stratum of each
+        order = np.lexsort((priority, codes))
+        ordered = codes[order]
+        starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+        rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        return np.sort(order[rank < self.per_stratum])
+
+
+def wilson_interval(failures: float, rows: float,
+                    confidence: float = DEFAULT_CONFIDENCE) -> Tuple[float, float]:
+    """
+    Wilson score interval of a rate.
+
+    Unlike the normal approximation it stays inside [0, 1] and is sensible
+    for rates near zero; with no failures the lower bound is exactly 0.
+
+    Args:
+        failures: Rows that failed (may be a weighted, effective count)
+        rows: Rows checked (may be an effective sample size)
+        confidence: Two-sided confidence level
+
+    Returns:
+        (low, high) bounds of the rate
+    """
+    if rows <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = failures / rows
+    denom = 1 + z * z / rows
+    centre = (p + z * z / (2 * rows)) / denom
+    margin = z * math.sqrt(p * (1 - p) / rows + z * z / (4 * rows * rows)) / denom
+    return (0.0 if failures == 0 else max(0.0, centre - margin)), min(1.0, centre + margin)
+
+
+def weighted_rate(failed: np.ndarray, weights: np.ndarray,
+                  confidence: float = DEFAULT_CONFIDENCE) -> Tuple[float, float, float]:
+    """
+    Estimated population rate of a per-row failure mask, with its interval.
+
+    The interval is the Wilson interval at the weights' effective sample
+    size (Kish), which is the sample size itself for equal weights.
+
+    Args:
+        failed: Boolean mask over the sampled rows
+        weights: Rows each sampled row stands for
+        confidence: Two-sided confidence level
+
+    Returns:
+        (rate, low, high)
+    """
+    total = weights.sum()
+    rate = float(weights[failed].sum() / total) if total else 0.0
+    n_eff = float(total * total / np.square(weights).sum()) if total else 0.0
+    low, high = wilson_interval(rate * n_eff, n_eff, confidence)
+    return rate, low, high
+
+
+def _stratum(value):
+    """Stratum label of a value (all nulls share one)."""
+    return None if pd.isna(value) else value
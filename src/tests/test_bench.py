@@ -0,0 +1,61 @@
+"""
+PyTest suite for the benchmark data synthesizer.
+Run with: pytest src/tests/test_bench.py -v
+"""
+
+import pytest
+import yaml
+from pathlib import Path
+
+from src.bench import DIRTY_LABELS, run_size, synthesize
+from src.validate_schema import CHECKS, SchemaValidator
+
+
+CONTRACT_PATH = Path(__file__).parent.parent.parent / "configs" / "data_contract.yaml"
+PREPROCESS_PATH = CONTRACT_PATH.parent / "preprocess.yaml"
+
+
+@pytest.fixture(scope="module")
+def synthetic_df():
+    """Synthetic export of 20k rows."""
+    with open(CONTRACT_PATH, 'r') as f:
+        contract = yaml.safe_load(f)
+    return synthesize(20_000, contract, seed=1)
+
+
+class TestSynthesize:
+    """Test synthetic data looks like the raw export."""
+    
+    def test_raw_columns_and_dirt(self, synthetic_df):
+        """Test contract columns exist and dirty labels and nulls occur."""
+        assert len(synthetic_df) == 20_000
+        assert 'PM_RS_Combo' in synthetic_df.columns
+        assert 0.12 < synthetic_df['Age'].isna().mean() < 0.18
+        for col, labels in DIRTY_LABELS.items():
+            assert synthetic_df[col].isin(labels).any()
+    
+    def test_validator_flags_same_checks_as_raw(self, synthetic_df):
+        """Test the validator fails the checks the raw export fails."""
+        validator = SchemaValidator(str(CONTRACT_PATH))
+        validator.validate_all(synthetic_df)
+        checks = {(v['check'], v['column']) for v in validator.violations}
+        assert ('primary_key_global', 'Session_ID') in checks
+        assert ('null_constraint', 'Session_ID') in checks
+        assert ('categorical_allowed', 'Time_of_Day') in checks
+        assert ('range', 'Age') not in checks
+
+
+class TestRunSize:
+    """Test the benchmark breaks validation and preprocessing down."""
+
+    def test_one_record_per_check_and_stage(self):
+        """Test every check and every pipeline stage gets its own timing."""
+        records = run_size(2_000, str(CONTRACT_PATH), preprocess_path=str(PREPROCESS_PATH))
+        stages = [r['stage'] for r in records]
+        for check in CHECKS:
+            assert f'check:{check}' in stages
+        with open(PREPROCESS_PATH, 'r') as f:
+            configured = yaml.safe_load(f)['stages']
+        assert sum(s.startswith('pipeline:') for s in stages) == len(configured)
+        assert 'pipeline:canonicalize(Payment_Method)' in stages
+        assert all(r['seconds'] >= 0 and r['rows'] == 2_000 for r in records)
@@ -0,0 +1,93 @@
+"""
+PyTest suite for the validation result cache.
+Run with: pytest src/tests/test_cache.py -v
+"""
+
+import os
+
+import pytest
+import pandas as pd
+import numpy as np
+from pathlib import Path
+
+from src import validate_schema
+from src.cache import ResultCache, column_digest
+from src.validate_schema import SchemaValidator
+
+
+CONTRACT_PATH = Path(__file__).parent.parent.parent / "configs" / "data_contract.yaml"
+
+
+@pytest.fixture
+def dirty_df():
+    """Small frame with a few violations."""
+    return pd.DataFrame({
+        'Session_ID': ['S1', 'S2', 'S2', None],
+        'Day': [1, 2, 2, 101],
+        'Age': [10.0, np.nan, 30.0, 40.0],
+        'Time_of_Day': ['morning', 'm0rning', None, 'evening'],
+    })
+
+
+class TestResultCache:
+    """Test cached results match fresh ones."""
+
+    def test_file_hit_skips_loading(self, dirty_df, tmp_path, monkeypatch):
+        """Test an unchanged file returns cached results and violations."""
+        csv_path = tmp_path / "sessions.csv"
+        dirty_df.to_csv(csv_path, index=False)
+        cache = ResultCache(tmp_path / "cache")
+
+        first = SchemaValidator(str(CONTRACT_PATH), cache=cache)
+        expected = first.validate_file(csv_path)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("cached file was read again")
+        monkeypatch.setattr(validate_schema, 'load_dataset', fail)
+        second = SchemaValidator(str(CONTRACT_PATH), cache=cache)
+        assert second.validate_file(csv_path) == expected
+        assert second.violations == first.violations
+
+    def test_only_changed_columns_rerun(self, dirty_df, tmp_path):
+        """Test a partial update recomputes just the changed column."""
+        cache = ResultCache(tmp_path / "cache")
+        SchemaValidator(str(CONTRACT_PATH), cache=cache).validate_all(dirty_df)
+
+        updated = dirty_df.assign(Age=[20.0, 21.0, 22.0, 99.0])
+        validator = SchemaValidator(str(CONTRACT_PATH), cache=cache)
+        cache.hits = cache.misses = 0
+        results = validator.validate_all(updated)
+
+        assert cache.misses == 1
+        uncached = SchemaValidator(str(CONTRACT_PATH))
+        assert results == uncached.validate_all(updated)
+        assert validator.violations == uncached.violations
+
+    def test_column_digest_depends_on_spec(self, dirty_df):
+        """Test the same values under a different spec get a new key."""
+        col = dirty_df['Age']
+        assert column_digest(col, {'ge': 0}) != column_digest(col, {'ge': 1})
+        assert column_digest(col, {'ge': 0}) == column_digest(col.copy(), {'ge': 0})
+
+    def test_column_digest_sees_value_changes(self):
+        """Test buffer hashing tells apart values, nulls and string splits."""
+        assert column_digest(pd.Series(['ab', 'c'])) != column_digest(pd.Series(['a', 'bc']))
+        assert (column_digest(pd.Series([1, 0], dtype='Int64'))
+                != column_digest(pd.Series([1, None], dtype='Int64')))
+        assert (column_digest(pd.Series(['x', 'y'], dtype='category'))
+                != column_digest(pd.Series(['y', 'x'], dtype='category')))
+
+    def test_size_cap_evicts_least_recently_used(self, tmp_path):
+        """Test writes beyond max_bytes drop the entries read least recently."""
+        cache = ResultCache(tmp_path / "cache", max_bytes=2500)
+        payload = b'x' * 1000
+        cache.put('columns', 'old', payload)
+        cache.put('columns', 'used', payload)
+        os.utime(tmp_path / "cache" / "columns" / "old.pkl", (0, 0))
+        os.utime(tmp_path / "cache" / "columns" / "used.pkl", (0, 0))
+        assert cache.get('columns', 'used') == payload
+        cache.put('columns', 'new', payload)
+
+        assert cache.get('columns', 'old') is None
+        assert cache.get('columns', 'used') == payload
+        assert cache.get('columns', 'new') == payload
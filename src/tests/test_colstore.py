@@ -0,0 +1,67 @@
+"""
+PyTest suite for the memory-mapped column store.
+Run with: pytest src/tests/test_colstore.py -v
+"""
+
+import numpy as np
+import pytest
+import pandas as pd
+
+from src import colstore
+from src.colstore import ColumnStore, write_store
+
+
+@pytest.fixture
+def frame():
+    """One column of every stored kind, each with a null."""
+    return pd.DataFrame({
+        'Day': pd.array([1, None, 100], dtype='Int8'),
+        'Price': [9.5, np.nan, 120.0],
+        'Campaign_Period': pd.array([True, None, False], dtype='boolean'),
+        'Time_of_Day': pd.Categorical(['morning', None, 'evening'],
+                                      categories=['morning', 'afternoon', 'evening']),
+        'Session_ID': pd.array(['S0000001', None, 'S0000003'], dtype='string'),
+        'PM_RS_Combo': pd.Series(['Cash:Ads', None, 'PayPal:Direct'], dtype=object),
+        'id': np.array([1, 2, 3], dtype=np.int64),
+    })
+
+
+class TestColumnStore:
+    """Test writing and mapping column stores."""
+
+    def test_round_trip_keeps_dtypes(self, frame, tmp_path):
+        """Test every column comes back with its values and dtype."""
+        write_store(frame, tmp_path / "sessions.csv")
+        store = ColumnStore(tmp_path / "sessions.csv")
+        assert store.columns == list(frame.columns)
+        pd.testing.assert_frame_equal(store.read(), frame)
+
+    def test_strings_without_pyarrow(self, frame, tmp_path, monkeypatch):
+        """Test strings are decoded when pyarrow cannot wrap the buffers."""
+        write_store(frame, tmp_path / "sessions.csv")
+        monkeypatch.setattr(colstore, 'pa', None)
+        pd.testing.assert_frame_equal(ColumnStore(tmp_path / "sessions.csv").read(), frame)
+
+    def test_columns_are_mapped_lazily(self, frame, tmp_path):
+        """Test only requested columns are opened, without copying them."""
+        store = ColumnStore(write_store(frame, tmp_path / "sessions.csv"))
+        day = store.read(['Day'])['Day']
+
+        assert list(store._maps) == [store.specs['Day']['file']]
+        assert np.shares_memory(day.array._data, store._maps[store.specs['Day']['file']])
+
+    def test_changes_stay_in_memory(self, frame, tmp_path):
+        """Test modifying a loaded frame leaves the store unchanged."""
+        path = write_store(frame, tmp_path / "sessions.csv")
+        df = ColumnStore(path).read()
+        df.loc[0, 'Day'] = 50
+        df['Price'] = df['Price'].fillna(0)
+
+        assert df.loc[0, 'Day'] == 50
+        pd.testing.assert_frame_equal(ColumnStore(path).read(), frame)
+
+    def test_non_string_objects_are_rejected(self, tmp_path):
+        """Test object columns of mixed values are not silently stringified."""
+        with pytest.raises(TypeError, match="strings"):
+            write_store(pd.DataFrame({'x': pd.Series(['a', 1], dtype=object)}), tmp_path / "x.csv")
+        assert not list(tmp_path.iterdir())
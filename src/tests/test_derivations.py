@@ -0,0 +1,117 @@
+"""
+PyTest suite for derived-column rules.
+Run with: pytest src/tests/test_derivations.py -v
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+import yaml
+from pathlib import Path
+
+from src.derivations import DerivedRule, compile_derivations
+from src.validate_schema import SchemaValidator
+
+
+CONTRACT_PATH = Path(__file__).parent.parent.parent / "configs" / "data_contract.yaml"
+
+
+@pytest.fixture(scope="module")
+def contract():
+    with open(CONTRACT_PATH, 'r') as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture
+def campaign(contract):
+    return compile_derivations(contract['columns'])['Campaign_Period']
+
+
+def between_rule(day: pd.Series) -> np.ndarray:
+    return (day.between(25, 50) | day.between(75, 90)).to_numpy(dtype=bool, na_value=False)
+
+
+class TestDerivedRule:
+    """Test parsing and evaluating derivation rules."""
+
+    def test_contract_rule_compiles_to_table(self, campaign):
+        """Test Campaign_Period becomes a 101-entry table over Day."""
+        assert campaign.source == 'Day'
+        assert campaign.intervals == [(25, 50), (75, 90)]
+        assert len(campaign.table) == 101
+        assert campaign.describe() == "TRUE iff Day in [25..50] or [75..90]"
+
+    @pytest.mark.parametrize("dtype", ['int64', 'Int16', 'float64'])
+    def test_matches_interval_comparisons(self, campaign, dtype):
+        """Test table and fallback paths agree with between(), nulls and strays included."""
+        day = pd.Series([1, 24, 25, 50, 51, 75, 90, 91, 100, -3, 250], dtype='int64')
+        if dtype != 'int64':
+            day = pd.concat([day, pd.Series([None])]).astype(dtype)
+        flag, known = campaign.evaluate(day)
+        np.testing.assert_array_equal(flag, between_rule(day))
+        np.testing.assert_array_equal(known, day.notna().to_numpy())
+
+    def test_value_sets(self):
+        """Test `{a, b}` sets and a repeated source name parse."""
+        rule = DerivedRule.from_spec('Flag', {
+            'derived_from': 'Day', 'derivation_rule': "TRUE iff Day in {3, 5} or Day in [7..8]",
+        }, {'Day': {'dtype': 'int', 'range': [1, 10]}})
+        flag, _ = rule.evaluate(pd.Series(range(1, 11)))
+        assert np.flatnonzero(flag).tolist() == [2, 4, 6, 7]
+
+    @pytest.mark.parametrize("text", [
+        "Day between 25 and 50",
+        "TRUE iff Day in [25..50] and [75..90]",
+        "TRUE iff Hour in [1..2]",
+    ])
+    def test_bad_rules_are_rejected(self, text):
+        """Test unparseable rules and a source other than derived_from fail."""
+        with pytest.raises(ValueError):
+            DerivedRule.from_spec('Flag', {'derived_from': 'Day', 'derivation_rule': text})
+
+
+class TestDerivedCheck:
+    """Test the validator's derived-column check."""
+
+    @pytest.fixture
+    def df(self):
+        day = pd.Series([1, 30, 40, 80, 95, None, 60], dtype='Int8')
+        flag = pd.array([False, True, False, True, True, True, None], dtype='boolean')
+        return pd.DataFrame({'Day': day, 'Campaign_Period': flag})
+
+    def test_counts_mismatches(self, df):
+        """Test rows disagreeing with the rule are counted and recorded."""
+        validator = SchemaValidator(str(CONTRACT_PATH), checks=['derived'])
+        results = validator.validate_all(df)
+
+        assert list(results['columns']) == ['Campaign_Period']
+        assert not results['columns']['Campaign_Period']['passed']
+        # Day 40 flagged False, Day 95 flagged True; null Day/flag are not judged
+        assert validator.violations == [{
+            'check': 'derived', 'column': 'Campaign_Period',
+            'expected': "TRUE iff Day in [25..50] or [75..90]", 'violations': 2,
+        }]
+
+    def test_chunked_matches_whole(self, df):
+        """Test per-chunk mismatch counts merge to the whole-frame count."""
+        whole = SchemaValidator(str(CONTRACT_PATH), checks=['derived'])
+        whole.validate_all(df)
+        chunked = SchemaValidator(str(CONTRACT_PATH), checks=['derived'])
+        chunked.validate_chunks(df.iloc[i:i + 3] for i in range(0, len(df), 3))
+        assert chunked.violations == whole.violations
+
+    def test_missing_source_is_not_checked(self, df):
+        """Test a frame without Day reports the rule as unchecked, not failed."""
+        validator = SchemaValidator(str(CONTRACT_PATH), checks=['derived'])
+        results = validator.validate_all(df[['Campaign_Period']])
+        assert results['columns']['Campaign_Period']['passed']
+        assert 'not checked' in results['columns']['Campaign_Period']['issues'][0]
+
+    def test_string_flags_are_parsed(self, campaign):
+        """Test 'FALSE' / '0' flags read untyped are booleans and junk flags mismatch."""
+        df = pd.DataFrame({
+            'Day': [1, 30, 1, 30, 1, 'x'],
+            'Campaign_Period': ['FALSE', 'TRUE', '0', 'maybe', None, 'TRUE'],
+        }, dtype=object)
+        # 'maybe' cannot be a flag; a null flag or non-numeric Day is not judged
+        assert campaign.mismatches(df).tolist() == [False, False, False, True, False, False]
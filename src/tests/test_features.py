@@ -0,0 +1,35 @@
+"""
+PyTest suite for the shared feature helpers.
+Run with: pytest src/tests/test_features.py -v
+"""
+
+import pytest
+import pandas as pd
+
+from src.features import split_combo
+
+
+@pytest.fixture
+def combos():
+    """Combos with repeats, nulls and malformed values."""
+    return pd.Series(['PayPal:Direct', 'Cash:Ads', None, 'PayPal:Direct',
+                      'Bank', 'Credit:Email:x', ':Ads'])
+
+
+class TestSplitCombo:
+    """Test the factorized combo split."""
+
+    @pytest.mark.parametrize("dtype", [object, 'string', 'category'])
+    def test_matches_str_split(self, combos, dtype):
+        """Test each part equals str.split(expand=True) for every dtype."""
+        values = combos.astype(dtype)
+        expected = combos.astype('string').str.split(':', expand=True)
+
+        for i, part in enumerate(split_combo(values, 2)):
+            assert part.isna().tolist() == expected[i].isna().tolist()
+            assert part.dropna().tolist() == expected[i].dropna().tolist()
+
+    def test_all_null_chunk(self):
+        """Test a chunk without any combo gives all-null parts."""
+        parts = split_combo(pd.Series([None, None], dtype=object), 2)
+        assert [p.isna().all() for p in parts] == [True, True]
@@ -0,0 +1,60 @@
+"""
+PyTest suite for incremental validation of appended days.
+Run with: pytest src/tests/test_incremental.py -v
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from pathlib import Path
+
+from src.incremental import IncrementalState
+from src.validate_schema import SchemaValidator
+
+
+CONTRACT_PATH = Path(__file__).parent.parent.parent / "configs" / "data_contract.yaml"
+
+
+@pytest.fixture
+def sessions_df():
+    """Three days of sessions with duplicates inside and across days."""
+    return pd.DataFrame({
+        'id': [1, 2, 3, 4, 5, 6, 7],
+        'Session_ID': ['S1', 'S2', 'S2', 'S3', 'S1', None, None],
+        'Day': [1, 1, 1, 2, 3, 3, 3],
+        'Age': [10.0, np.nan, 30.0, 40.0, 70.0, 20.0, np.nan],
+        'Time_of_Day': ['morning', 'm0rning', None, 'evening', 'Evening', None, 'morning'],
+    })
+
+
+class TestIncrementalState:
+    """Test day-by-day validation matches a full run."""
+
+    def test_days_match_full_run(self, sessions_df, tmp_path):
+        """Test appending one day per run gives the full run's report."""
+        full = SchemaValidator(str(CONTRACT_PATH))
+        expected = full.validate_all(sessions_df)
+
+        for day in (1, 2, 3):
+            validator = SchemaValidator(str(CONTRACT_PATH))
+            state = IncrementalState(tmp_path, validator.contract)
+            results = validator.validate_increment(
+                [sessions_df[sessions_df['Day'] == day]], state
+            )
+            state.save()
+
+        assert state.rows == len(sessions_df)
+        assert results['primary_keys'] == expected['primary_keys']
+        assert results['nulls'] == expected['nulls']
+        assert validator.violations == full.violations
+
+    def test_contract_change_is_rejected(self, sessions_df, tmp_path):
+        """Test a state built under another contract is not reused."""
+        validator = SchemaValidator(str(CONTRACT_PATH))
+        state = IncrementalState(tmp_path, validator.contract)
+        validator.validate_increment([sessions_df], state)
+        state.save()
+
+        changed = {**validator.contract, 'version': 'changed'}
+        with pytest.raises(ValueError):
+            IncrementalState(tmp_path, changed)
@@ -0,0 +1,197 @@
+"""
+PyTest suite for key uniqueness checks.
+Run with: pytest src/tests/test_keys.py -v
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+
+from src import keys
+from src.keys import (
+    HyperLogLog, KeyCodec, KeySketch, PersistentKeyIndex, SpilledKeyIndex, count_duplicates,
+)
+
+
+@pytest.fixture(scope="module")
+def keys_df():
+    """Sessions with global, within-day and null-key duplicates."""
+    rng = np.random.default_rng(0)
+    n = 5000
+    ids = np.array([f"S{i:07d}" for i in rng.integers(0, 4000, n)], dtype=object)
+    ids[rng.random(n) < 0.02] = None
+    return pd.DataFrame({'Session_ID': ids, 'Day': rng.integers(1, 101, n)})
+
+
+def expected_counts(df):
+    """Reference counts computed the pandas way."""
+    day_dupes = df.groupby('Day')['Session_ID'].apply(
+        lambda x: x.duplicated().sum()
+    )
+    return df['Session_ID'].duplicated().sum(), day_dupes[day_dupes > 0].to_dict()
+
+
+class TestSpilledKeyIndex:
+    """Test the disk-spilled key index against in-memory pandas."""
+    
+    @pytest.mark.parametrize("use_bloom", [True, False])
+    def test_counts_match_pandas(self, keys_df, use_bloom):
+        """Test global and per-day duplicate counts match pandas."""
+        with SpilledKeyIndex(use_bloom=use_bloom) as index:
+            for start in range(0, len(keys_df), 700):
+                index.add(keys_df.iloc[start:start + 700])
+            result = index.result()
+        
+        global_dupes, problematic_days = expected_counts(keys_df)
+        assert result['global_duplicates'] == global_dupes
+        assert result['group_duplicates'] == problematic_days
+    
+    def test_oversized_buckets_are_resplit(self, keys_df, monkeypatch):
+        """Test buckets over the memory ceiling are re-split and still exact."""
+        monkeypatch.setattr(keys, 'MIN_BUCKET_BYTES', 0)
+        with SpilledKeyIndex(memory_limit=4096, n_buckets=4) as index:
+            index.add(keys_df)
+            result = index.result()
+        
+        global_dupes, problematic_days = expected_counts(keys_df)
+        assert result['global_duplicates'] == global_dupes
+        assert result['group_duplicates'] == problematic_days
+    
+    def test_unique_keys_skip_all_buckets(self):
+        """Test the Bloom filter leaves no bucket to read for unique keys."""
+        df = pd.DataFrame({'Session_ID': [f"S{i}" for i in range(1000)],
+                           'Day': 1})
+        with SpilledKeyIndex() as index:
+            index.add(df)
+            assert not index.flagged.any()
+            assert index.result() == {'global_duplicates': 0,
+                                      'group_duplicates': {}}
+
+
+class TestCountDuplicates:
+    """Test the composite-key duplicate counter."""
+    
+    def test_matches_groupby_apply(self, keys_df):
+        """Test counts match duplicated() and the per-day groupby-apply."""
+        result = count_duplicates(keys_df, 'Session_ID', 'Day')
+        global_dupes, problematic_days = expected_counts(keys_df)
+        assert result['global_duplicates'] == global_dupes
+        assert result['group_duplicates'] == problematic_days
+    
+    def test_null_groups_excluded(self):
+        """Test rows with a null group only count towards global duplicates."""
+        df = pd.DataFrame({'Session_ID': ['a', 'a', 'b', 'b', 'c', 'c'],
+                           'Day': [1.0, 1.0, np.nan, np.nan, 2.0, 3.0]})
+        result = count_duplicates(df, 'Session_ID', 'Day')
+        assert result == {'global_duplicates': 3, 'group_duplicates': {1.0: 1}}
+    
+    def test_without_group(self):
+        """Test global-only counting for the 'id' column."""
+        df = pd.DataFrame({'id': [1, 2, 2, 3, 3, 3]})
+        assert count_duplicates(df, 'id', None)['global_duplicates'] == 3
+
+
+class TestKeyCodec:
+    """Test integer encoding of Session_IDs."""
+
+    @pytest.mark.parametrize("dtype", [object, 'string', 'category'])
+    def test_round_trip_with_dirty_keys(self, dtype):
+        """Test conforming keys become their number and the rest fall back."""
+        raw = pd.Series(['S0000003', 's0000004', None, 'S12', 'S0000003', 'S00000x5'])
+        codec = KeyCodec('S', 7)
+        codes, nulls = codec.encode(raw.astype(dtype))
+
+        assert nulls.tolist() == [False, False, True, False, False, False]
+        assert codes[[0, 4]].tolist() == [3, 3]
+        assert (codes[[1, 3, 5]] >= codec.base).all()
+        assert codec.decode(codes[~nulls]) == raw.dropna().tolist()
+
+    def test_column_is_nullable_uint32(self):
+        """Test the column transform keeps nulls and fits in 32 bits."""
+        out = KeyCodec().column(pd.Series(['S0000001', None, 'S9999999'], dtype='string'))
+        assert str(out.dtype) == 'UInt32'
+        assert out.isna().tolist() == [False, True, False]
+        assert out.dropna().tolist() == [1, 9999999]
+
+    @pytest.mark.parametrize("dtype", [object, 'string', 'category'])
+    def test_counts_match_factorized(self, keys_df, dtype):
+        """Test counting on integer codes equals counting on the strings."""
+        ids = keys_df['Session_ID'].copy()
+        ids[:10] = 'legacy-id'
+        df = keys_df.assign(Session_ID=ids.astype(dtype))
+        expected = count_duplicates(df, 'Session_ID', 'Day')
+        assert count_duplicates(df, 'Session_ID', 'Day', codec=KeyCodec()) == expected
+
+    def test_wide_codec_does_not_overflow(self):
+        """Test 18-digit codes over many days count like the factorized strings."""
+        rng = np.random.default_rng(5)
+        ids = [f"S{n:018d}" for n in rng.integers(10**17, 10**18, 500)]
+        df = pd.DataFrame({'Session_ID': ids * 2, 'Day': rng.integers(1, 101, 1000)})
+        expected = count_duplicates(df, 'Session_ID', 'Day')
+        assert expected['global_duplicates'] >= 500
+        codec = KeyCodec(digits=18)
+        assert count_duplicates(df, 'Session_ID', 'Day', codec=codec) == expected
+
+
+class TestPersistentKeyIndex:
+    """Test the on-disk key index across batches and reopening."""
+    
+    def test_batches_match_pandas(self, keys_df, tmp_path):
+        """Test counts over reopened batches match the whole frame."""
+        state = None
+        for start in range(0, len(keys_df), 1200):
+            index = PersistentKeyIndex(tmp_path, state=state)
+            index.add(keys_df.iloc[start:start + 1200])
+            state = index.state()
+        
+        global_dupes, problematic_days = expected_counts(keys_df)
+        result = PersistentKeyIndex(tmp_path, state=state).result()
+        assert result['global_duplicates'] == global_dupes
+        assert result['group_duplicates'] == problematic_days
+    
+    def test_numeric_dtype_changes_between_batches(self, tmp_path):
+        """Test a float-loaded batch matches keys and days of an int-loaded history."""
+        index = PersistentKeyIndex(tmp_path / "sessions")
+        index.add(pd.DataFrame({'Session_ID': ['S1', 'S2'], 'Day': pd.array([25, 26], dtype='Int8')}))
+        index.add(pd.DataFrame({'Session_ID': ['S1', 'S2'], 'Day': [25.0, np.nan]}))
+        assert index.result() == {'global_duplicates': 2, 'group_duplicates': {25: 1}}
+        
+        ids = PersistentKeyIndex(tmp_path / "ids", 'id', None)
+        ids.add(pd.DataFrame({'id': [1, 2]}))
+        ids.add(pd.DataFrame({'id': [2.0, 3.5]}))
+        assert ids.result()['global_duplicates'] == 1
+    
+    def test_segments_store_utf8_keys(self, keys_df, tmp_path):
+        """Test stored keys take a byte per ASCII character."""
+        index = PersistentKeyIndex(tmp_path)
+        index.add(keys_df)
+        stored = np.load(tmp_path / f"{index.segments[0]}_key.npy")
+        assert stored.dtype.itemsize == keys_df['Session_ID'].astype(str).str.len().max()
+
+
+class TestKeySketch:
+    """Test approximate duplicate counts from HyperLogLog sketches."""
+
+    def test_bounds_contain_exact_counts(self, keys_df):
+        """Test the estimated duplicates bracket count_duplicates."""
+        sketch = KeySketch('Session_ID', 'Day', codec=KeyCodec())
+        for start in range(0, len(keys_df), 1000):
+            sketch.add(keys_df.iloc[start:start + 1000])
+        estimated = sketch.result()
+
+        exact = count_duplicates(keys_df, 'Session_ID', 'Day')
+        _, low, high = estimated['global_duplicates']
+        assert low <= exact['global_duplicates'] <= high
+        _, low, high = estimated['group_duplicates']
+        assert low <= sum(exact['group_duplicates'].values()) <= high
+
+    def test_merged_sketches_match_one_pass(self, keys_df):
+        """Test merging per-half sketches equals sketching everything."""
+        whole, first, second = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        hashes = keys._mix64(np.arange(len(keys_df), dtype=np.uint64))
+        whole.add(hashes)
+        first.add(hashes[:2000])
+        second.add(hashes[2000:])
+        first.merge(second)
+        assert first.estimate() == whole.estimate()
+        assert abs(whole.estimate() - len(keys_df)) < 3 * whole.relative_error * len(keys_df)
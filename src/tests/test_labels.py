@@ -0,0 +1,83 @@
+"""
+PyTest suite for dictionary-encoded label canonicalization.
+Run with: pytest src/tests/test_labels.py -v
+"""
+
+import pytest
+import pandas as pd
+
+from src.labels import LabelMap, LabelStore, pattern_rule
+
+
+@pytest.fixture
+def payment_rule():
+    """The Payment_Method rule of configs/preprocess.yaml."""
+    return pattern_rule(
+        {'PayPal': 'pay.*pal', 'Credit': 'cre.*it|^cred', 'Cash': 'cas.*h|^cash', 'Bank': 'bank'},
+        replace=[['[^a-z0-9]+', '']],
+    )
+
+
+class TestLabelMap:
+    """Test canonicalization through the memoized map."""
+
+    def test_matches_rowwise_rule(self, payment_rule):
+        """Test broadcasting through codes equals applying the rule per row."""
+        values = pd.Series(['pay pal', 'Cash', None, 'creDit', 'pay pal', 'bitcoin', 'BanK'])
+        out = LabelMap(payment_rule, 'Payment_Method').apply(values)
+
+        expected = [None if pd.isna(v) else payment_rule(v)[0] for v in values]
+        assert out.isna().tolist() == [v is None for v in expected]
+        assert out.dropna().tolist() == [v for v in expected if v is not None]
+
+    def test_each_label_resolved_once(self, payment_rule):
+        """Test the rule only runs for labels not seen in earlier chunks."""
+        calls = []
+
+        def counting_rule(raw):
+            calls.append(raw)
+            return payment_rule(raw)
+        labels = LabelMap(counting_rule)
+        labels.apply(pd.Series(['Cash', 'cash ', 'Cash']))
+        labels.apply(pd.Series(['Cash', 'BanK'], dtype='category'))
+
+        assert sorted(calls) == ['BanK', 'Cash', 'cash ']
+
+    def test_unmapped_labels_are_recorded(self, payment_rule):
+        """Test labels no pattern matches get the default and are recorded."""
+        labels = LabelMap(payment_rule, 'Payment_Method')
+        out = labels.apply(pd.Series(['bitcoin', 'Cash', 'bitcoin']))
+
+        assert out.tolist() == ['Unknown', 'Cash', 'Unknown']
+        assert labels.unmapped == ['bitcoin']
+
+
+class TestLabelStore:
+    """Test the file-backed label store."""
+
+    def test_round_trip_turns_misses_into_hits(self, payment_rule, tmp_path):
+        """Test labels learned in one run are store hits in the next."""
+        contract = {'version': '1.0.0'}
+        values = pd.Series(['pay pal', 'Cash', 'pay pal', None, 'bitcoin'])
+
+        store = LabelStore(tmp_path / "label_maps.yaml", contract)
+        first = LabelMap(payment_rule, 'Payment_Method', store.mapping('Payment_Method'))
+        expected = first.apply(values)
+        assert (first.hits, first.misses) == (0, 4)
+        assert store.learn('Payment_Method', first.learned) == 2
+        store.save()
+
+        reloaded = LabelStore(tmp_path / "label_maps.yaml", contract)
+        second = LabelMap(payment_rule, 'Payment_Method', reloaded.mapping('Payment_Method'))
+        pd.testing.assert_series_equal(second.apply(values), expected)
+        assert reloaded.version == 1
+        # Unmapped labels are not stored, so they keep showing up as misses
+        assert (second.hits, second.misses) == (3, 1)
+
+    def test_other_contract_version_is_ignored(self, tmp_path):
+        """Test a store built for another contract version is not trusted."""
+        store = LabelStore(tmp_path / "label_maps.yaml", {'version': '1.0.0'})
+        store.learn('Payment_Method', {'pay pal': 'PayPal'})
+        store.save()
+
+        assert LabelStore(tmp_path / "label_maps.yaml", {'version': '2.0.0'}).columns == {}
@@ -0,0 +1,153 @@
+"""
+PyTest suite for the contract-typed CSV loader.
+Run with: pytest src/tests/test_loader.py -v
+"""
+
+import os
+
+import pytest
+import pandas as pd
+
+from src.colstore import store_path, write_store
+from src.loader import (columnar_path, dataset_source, int_dtype, iter_csv, iter_dataset,
+                        load_csv, load_dataset, write_columnar)
+from src.validation_plan import compile_plan
+
+
+CONTRACT = {
+    'columns': {
+        'Day': {'dtype': 'int', 'range': [1, 100]},
+        'Reviews_Read': {'dtype': 'int', 'ge': 0, 'allow_null': True},
+        'Time_of_Day': {'dtype': 'category',
+                        'allowed': ['morning', 'afternoon', 'evening']},
+        'Campaign_Period': {'dtype': 'bool'},
+        'Session_ID': {'dtype': 'string'},
+    }
+}
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    """Small CSV with a null int, a bool and a non-contract column."""
+    path = tmp_path / "sessions.csv"
+    path.write_text(
+        "id,Session_ID,Day,Reviews_Read,Time_of_Day,Campaign_Period\n"
+        "1,S1,1,3,morning,TRUE\n"
+        "2,S2,30,NA,evening,FALSE\n"
+        "3,,99,7.0,,TRUE\n"
+    )
+    return path
+
+
+class TestLoader:
+    """Test dtypes pinned from the contract."""
+
+    def test_contract_dtypes(self, csv_path):
+        """Test ints are narrowed and categories use the allowed list."""
+        df = load_csv(csv_path, CONTRACT)
+        assert str(df['Day'].dtype) == 'Int8'
+        assert str(df['Reviews_Read'].dtype) == 'Int64'
+        assert df['Reviews_Read'].isna().sum() == 1
+        assert str(df['Campaign_Period'].dtype) == 'boolean'
+        assert str(df['Session_ID'].dtype) == 'string'
+        assert list(df['Time_of_Day'].cat.categories) == ['morning', 'afternoon', 'evening']
+        assert str(df['id'].dtype) == 'int64'
+
+    def test_unexpected_values_are_kept(self, tmp_path):
+        """Test out-of-bounds ints and unknown labels survive loading."""
+        path = tmp_path / "dirty.csv"
+        path.write_text("Day,Time_of_Day\n1,morning\n300,m0rning\n")
+        df = load_csv(path, CONTRACT)
+        assert str(df['Day'].dtype) == 'Int64'
+        assert df['Day'].max() == 300
+        assert 'm0rning' in set(df['Time_of_Day'].cat.categories)
+
+    def test_values_breaking_the_contract_keep_inferred_dtype(self, tmp_path):
+        """Test a column whose cast fails keeps its parsed dtype instead of failing the load."""
+        path = tmp_path / "broken.csv"
+        path.write_text("Day,Reviews_Read,Campaign_Period,Session_ID\n"
+                        "1,34.5,TRUE,S1\nx,2,maybe,S2\n")
+        for df in (load_csv(path, CONTRACT), next(iter_csv(path, CONTRACT, chunksize=10))):
+            assert df['Day'].tolist() == ['1', 'x']
+            assert str(df['Reviews_Read'].dtype) == 'float64'
+            assert df['Campaign_Period'].tolist() == ['TRUE', 'maybe']
+            assert str(df['Session_ID'].dtype) == 'string'
+
+    def test_contract_na_values(self, tmp_path):
+        """Test per-column na_values load as nulls and the contract still compiles."""
+        contract = {'columns': {'Day': {'dtype': 'int', 'range': [1, 100]},
+                                'Age': {'dtype': 'int', 'ge': 0, 'na_values': ['?']}}}
+        path = tmp_path / "markers.csv"
+        path.write_text("Day,Age\n1,?\n2,30\n")
+        df = load_csv(path, contract)
+        assert df['Age'].isna().tolist() == [True, False]
+        assert str(df['Age'].dtype).startswith('Int')
+        assert compile_plan(contract).run(df)['Age']['nulls'] == 1
+
+    def test_chunks_match_whole_file(self, csv_path):
+        """Test streamed chunks concatenate to the whole-file frame."""
+        chunks = list(iter_csv(csv_path, CONTRACT, chunksize=2))
+        assert len(chunks) == 2
+        whole = load_csv(csv_path, CONTRACT)
+        assert pd.concat(chunks, ignore_index=True)['Day'].tolist() == whole['Day'].tolist()
+
+    @pytest.mark.parametrize("spec, expected", [
+        ({'dtype': 'int', 'allowed': [0, 1]}, 'Int8'),
+        ({'dtype': 'int', 'range': [0, 1000]}, 'Int16'),
+        ({'dtype': 'int', 'ge': 0}, 'Int64'),
+    ])
+    def test_int_dtype(self, spec, expected):
+        """Test the narrowest dtype holding the contract bounds is picked."""
+        assert int_dtype(spec) == expected
+
+
+class TestColumnarArtifact:
+    """Test Parquet artifacts written next to CSVs."""
+
+    @pytest.fixture(autouse=True)
+    def _needs_pyarrow(self):
+        pytest.importorskip("pyarrow")
+
+    def test_round_trip_keeps_dtypes(self, csv_path):
+        """Test the artifact is preferred and loads the same typed frame."""
+        expected = load_csv(csv_path, CONTRACT)
+        write_columnar(expected, csv_path, CONTRACT)
+        assert columnar_path(csv_path).exists()
+        pd.testing.assert_frame_equal(load_dataset(csv_path, CONTRACT), expected)
+
+    def test_chunks_and_projection(self, csv_path):
+        """Test streaming and column projection read from the artifact."""
+        write_columnar(load_csv(csv_path, CONTRACT), csv_path, CONTRACT)
+        chunks = list(iter_dataset(csv_path, CONTRACT, chunksize=2, columns=['Day']))
+        assert [list(c.columns) for c in chunks] == [['Day'], ['Day']]
+        assert str(chunks[0]['Day'].dtype) == 'Int8'
+
+    def test_stale_artifact_is_ignored(self, csv_path):
+        """Test a CSV newer than its artifact is parsed instead."""
+        write_columnar(load_csv(csv_path, CONTRACT), csv_path, CONTRACT)
+        csv_path.write_text("Day\n5\n")
+        os.utime(csv_path, (columnar_path(csv_path).stat().st_mtime + 10,) * 2)
+        assert load_dataset(csv_path, CONTRACT)['Day'].tolist() == [5]
+
+
+class TestColumnStore:
+    """Test memory-mapped column stores written next to CSVs."""
+
+    def test_store_is_preferred(self, csv_path):
+        """Test the store is read, streamed and projected like the CSV."""
+        expected = load_csv(csv_path, CONTRACT)
+        write_store(expected, csv_path)
+        pd.testing.assert_frame_equal(load_dataset(csv_path, CONTRACT), expected)
+        assert dataset_source(csv_path).parent == store_path(csv_path)
+
+        chunks = list(iter_dataset(csv_path, CONTRACT, chunksize=2, columns=['Session_ID', 'Day']))
+        assert [len(c) for c in chunks] == [2, 1]
+        pd.testing.assert_frame_equal(pd.concat(chunks), expected[['Session_ID', 'Day']])
+
+    def test_stale_store_is_ignored(self, csv_path):
+        """Test a CSV newer than its store is parsed instead."""
+        write_store(load_csv(csv_path, CONTRACT), csv_path)
+        csv_path.write_text("Day\n5\n")
+        manifest = store_path(csv_path) / "manifest.yaml"
+        os.utime(csv_path, (manifest.stat().st_mtime + 10,) * 2)
+        assert load_dataset(csv_path, CONTRACT)['Day'].tolist() == [5]
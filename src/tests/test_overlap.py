@@ -0,0 +1,101 @@
+"""
+PyTest suite for the overlapped chunk reader and writer.
+Run with: pytest src/tests/test_overlap.py -v
+"""
+
+import threading
+import time
+
+import pytest
+import pandas as pd
+
+from src.loader import ChunkWriter
+from src.overlap import BackgroundWriter, prefetch
+from src.preprocess import Pipeline, preprocess
+
+
+class TestPrefetch:
+    """Test reading chunks ahead on a background thread."""
+
+    @pytest.mark.parametrize("depth", [0, 1, 3])
+    def test_keeps_order(self, depth):
+        """Test every chunk arrives once and in order."""
+        assert list(prefetch(range(20), depth)) == list(range(20))
+
+    def test_reader_stays_bounded(self):
+        """Test the reader blocks once it is `depth` chunks ahead."""
+        produced = []
+
+        def source():
+            for i in range(10):
+                produced.append(i)
+                yield i
+        chunks = prefetch(source(), depth=2)
+        assert next(chunks) == 0
+        time.sleep(0.5)
+        # One chunk consumed, two queued, one read and waiting for a slot
+        assert len(produced) <= 4
+        chunks.close()
+
+    def test_errors_reach_the_caller(self):
+        """Test a read error is raised where the chunks are consumed."""
+        def source():
+            yield 1
+            raise ValueError("bad chunk")
+        with pytest.raises(ValueError, match="bad chunk"):
+            list(prefetch(source()))
+
+    def test_early_close_closes_source(self):
+        """Test abandoning the iterator stops the reader and closes the source."""
+        closed = threading.Event()
+
+        def source():
+            try:
+                yield from range(100)
+            finally:
+                closed.set()
+        chunks = prefetch(source(), depth=1)
+        next(chunks)
+        chunks.close()
+        assert closed.is_set()
+
+
+class TestBackgroundWriter:
+    """Test writing chunks on a background thread."""
+
+    def test_writes_in_order(self):
+        """Test chunks are written in submission order before close returns."""
+        written = []
+        with BackgroundWriter(written.append, depth=2) as writer:
+            for i in range(50):
+                writer.submit(i)
+        assert written == list(range(50))
+
+    def test_write_error_is_raised(self):
+        """Test a failed write surfaces on close and stops later writes."""
+        written = []
+
+        def write(chunk):
+            if chunk == 3:
+                raise OSError("disk full")
+            written.append(chunk)
+        with pytest.raises(OSError, match="disk full"):
+            with BackgroundWriter(write, depth=1) as writer:
+                for i in range(10):
+                    writer.submit(i)
+        assert written == [0, 1, 2]
+
+    def test_overlapped_preprocess_matches_sequential(self, tmp_path):
+        """Test the threaded preprocess writes the same output as the serial one."""
+        contract = {'columns': {}}
+        config = {'stages': [{'name': 'drop_columns', 'columns': ['b']}]}
+        df = pd.DataFrame({'a': range(1000), 'b': 0})
+        chunks = [df.iloc[i:i + 64] for i in range(0, len(df), 64)]
+
+        paths = []
+        for depth in (0, 2):
+            path = tmp_path / f"out_{depth}.csv"
+            writer = ChunkWriter(path, contract, columnar=False)
+            preprocess(chunks, Pipeline.from_config(config, contract), writer, depth=depth)
+            paths.append(path)
+        assert paths[0].read_text() == paths[1].read_text()
@@ -0,0 +1,168 @@
+"""
+PyTest suite for the streaming preprocessing pipeline.
+Run with: pytest src/tests/test_preprocess.py -v
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+import yaml
+from pathlib import Path
+
+from src.loader import ChunkWriter, cast_to_contract
+from src.preprocess import Pipeline, preprocess
+
+
+ROOT = Path(__file__).parent.parent.parent
+CONTRACT_PATH = ROOT / "configs" / "data_contract.yaml"
+CONFIG_PATH = ROOT / "configs" / "preprocess.yaml"
+
+
+@pytest.fixture
+def contract():
+    """Load the data contract."""
+    with open(CONTRACT_PATH, 'r') as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture
+def config():
+    """Load the preprocessing config."""
+    with open(CONFIG_PATH, 'r') as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture
+def raw_df(contract):
+    """Small raw-export-like frame with the dirt the stages clean up."""
+    df = pd.DataFrame({
+        'id': [1, 2, 3, 4, 5, 6],
+        'Session_ID': [' S1', 'S2', None, 'S4', 'S5', 'S6'],
+        'Day': [1, 30, 40, 80, 95, 50],
+        'Campaign_Period': [True, False, True, False, True, False],
+        'Time_of_Day': ['Morning', 'afterno0n', 'evening', 'night', None, 'EVENING '],
+        'Device_Type': ['Mobile', 'Desktop', 'Tablet', 'Mobile', 'Desktop', 'Mobile'],
+        'Payment_Method': ['pay pal', None, 'Cash', 'creDit', None, 'bitcoin'],
+        'Referral_Source': ['S0cial-media', 'direct ', None, None, 'ads', 'EMail'],
+        'PM_RS_Combo': ['PayPal:Social_media', 'Bank:Direct', 'Cash:Ads',
+                        'Credit:Email', None, 'Cash:Email'],
+        'Age': [20.0, np.nan, 30.0, 40.0, 50.0, 60.0],
+    })
+    return cast_to_contract(df, contract)
+
+
+class TestPipeline:
+    """Test the configured stages on a small frame."""
+
+    def test_configured_stages(self, raw_df, config, contract):
+        """Test each stage's effect on the output."""
+        out = Pipeline.from_config(config, contract).transform(raw_df.copy())
+
+        assert out['Session_ID'].tolist() == ['S1', 'S2', 'S4', 'S5', 'S6']
+        assert out['Campaign_Period'].tolist() == [False, True, True, False, True]
+        assert out['Time_of_Day'].isna().tolist() == [False, False, True, True, False]
+        assert out['Time_of_Day'].dropna().tolist() == ['morning', 'afternoon', 'evening']
+        assert out['Time_of_Day'].dtype == 'category'
+        assert out['Payment_Method'].isna().tolist() == [False, False, False, True, False]
+        assert out['Payment_Method'].dropna().tolist() == ['PayPal', 'Bank', 'Credit', 'Unknown']
+        assert out['Referral_Source'].tolist() == ['Social_media', 'Direct', 'Email', 'Ads', 'Email']
+        assert 'PM_RS_Combo' not in out.columns
+
+    def test_chunked_matches_whole(self, raw_df, config, contract, tmp_path):
+        """Test streaming in small chunks writes what one chunk writes."""
+        whole = ChunkWriter(tmp_path / "whole.csv", contract, columnar=False)
+        preprocess([raw_df.copy()], Pipeline.from_config(config, contract), whole)
+
+        chunks = (raw_df.iloc[i:i + 2].copy() for i in range(0, len(raw_df), 2))
+        pipeline = Pipeline.from_config(config, contract)
+        streamed = ChunkWriter(tmp_path / "streamed.csv", contract, columnar=False)
+        report = preprocess(chunks, pipeline, streamed)
+
+        pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "whole.csv"),
+                                      pd.read_csv(tmp_path / "streamed.csv"))
+        assert report['drop_null_keys'] == {'dropped': 1}
+        assert pipeline.rows_in == 6 and pipeline.rows_out == 5
+
+    def test_duplicate_keys_fail_at_end(self, raw_df, config, contract, tmp_path):
+        """Test a Session_ID repeated across chunks is caught."""
+        chunks = [raw_df.copy(), raw_df.iloc[:1].copy()]
+        writer = ChunkWriter(tmp_path / "out.csv", contract, columnar=False)
+        with pytest.raises(ValueError, match="globally unique"):
+            preprocess(chunks, Pipeline.from_config(config, contract), writer)
+
+    def test_unknown_stage_is_rejected(self, contract):
+        """Test a misspelled stage name fails when the pipeline is built."""
+        with pytest.raises(ValueError, match="Unknown preprocessing stage"):
+            Pipeline.from_config({'stages': [{'name': 'recompute_campain'}]}, contract)
+
+
+class TestFittedState:
+    """Test fitting on train and reusing the state for scoring."""
+
+    def test_saved_state_reproduces_scoring(self, raw_df, config, contract, tmp_path):
+        """Test a reloaded state transforms new data like the fitted pipeline."""
+        fitted = Pipeline.from_config(config, contract).fit([raw_df.copy()])
+        fitted.save_state(tmp_path / "state.pkl", contract)
+
+        batch = raw_df.assign(Device_Type=['Mobile', 'Smartwatch', None, 'Tablet', 'Desktop', 'Mobile'])
+        expected = fitted.transform(batch.copy(), train=False)
+        restored = Pipeline.from_config(config, contract).load_state(tmp_path / "state.pkl", contract)
+        out = restored.transform(batch.copy(), train=False)
+
+        pd.testing.assert_frame_equal(out, expected)
+        assert len(out) == len(batch)
+        # Scoring keeps the null-Session_ID row; devices unseen in training become null
+        assert out['Device_Type'].cat.categories.tolist() == ['Desktop', 'Mobile']
+        assert out['Device_Type'].isna().tolist() == [False, True, True, True, False, False]
+
+    def test_median_imputation_streams(self, contract):
+        """Test medians fitted over chunks equal the whole-column median."""
+        ages = pd.Series([30, None, 18, 40, 65, 30, None, 25], dtype='Int8')
+        train = pd.DataFrame({'Age': ages, 'Price': ages.astype(float) * 2.5})
+        stage = {'name': 'impute', 'columns': {'Age': 'median', 'Price': 'median'},
+                 'flags': ['Age']}
+        pipeline = Pipeline.from_config({'stages': [stage]}, contract)
+        pipeline.fit(train.iloc[i:i + 3].copy() for i in range(0, len(train), 3))
+
+        out = pipeline.transform(train.copy())
+        assert out['Price'].isna().sum() == 0
+        assert out.loc[1, 'Price'] == train['Price'].median()
+        assert out.loc[1, 'Age'] == round(train['Age'].median())
+        assert out['Age_missing'].tolist() == [0, 1, 0, 0, 0, 0, 1, 0]
+
+    def test_state_from_other_stages_is_rejected(self, raw_df, config, contract, tmp_path):
+        """Test a state fitted with another stage list is not applied."""
+        Pipeline.from_config(config, contract).fit([raw_df.copy()]).save_state(
+            tmp_path / "state.pkl", contract
+        )
+        shorter = {'stages': config['stages'][:-1]}
+        with pytest.raises(ValueError, match="refit"):
+            Pipeline.from_config(shorter, contract).load_state(tmp_path / "state.pkl", contract)
+
+
+class TestCompact:
+    """Test the memory-compaction stage."""
+
+    def test_compacts_without_losing_values(self, contract):
+        """Test label, int and key columns shrink but keep their values."""
+        df = pd.DataFrame({
+            'Session_ID': pd.Series(['S0000007', 'S0000042', 'S0000007', None], dtype='string'),
+            'Payment_Method': ['Cash', 'PayPal', None, 'Unknown'],
+            'Discount': pd.Series([0, 50, None, 100], dtype='Int64'),
+        })
+        df = pd.concat([df] * 100, ignore_index=True)
+        pipeline = Pipeline.from_config({'stages': [{'name': 'compact'}]}, contract)
+        out = pipeline.transform(df.copy())
+
+        assert out['Payment_Method'].cat.categories.tolist() == \
+            contract['columns']['Payment_Method']['allowed'] + ['Unknown']
+        assert out['Payment_Method'].astype(object).tolist()[:2] == ['Cash', 'PayPal']
+        assert str(out['Discount'].dtype) == 'Int8'
+        # The key is the ID's number, so train and test keys agree
+        assert out['Session_Key'].tolist()[:3] == [7, 42, 7]
+        assert out['Session_Key'].isna().tolist()[:4] == [False, False, False, True]
+        assert str(out['Session_Key'].dtype) == 'UInt32'
+
+        footprint = pipeline.stages[0].footprint().set_index('column')
+        assert footprint.loc['Payment_Method', 'bytes_after'] \
+            < footprint.loc['Payment_Method', 'bytes_before']
@@ -0,0 +1,123 @@
+"""
+PyTest suite for column profiles.
+Run with: pytest src/tests/test_profiling.py -v
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+import yaml
+from pathlib import Path
+
+from src.profiling import (
+    FrequencySketch, Profile, QuantileSketch, diff_profiles, load_profiles,
+    merge_profiles, profile_file, save_group_profiles,
+)
+
+
+CONTRACT_PATH = Path(__file__).parent.parent.parent / "configs" / "data_contract.yaml"
+
+
+@pytest.fixture(scope="module")
+def contract():
+    with open(CONTRACT_PATH, 'r') as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture(scope="module")
+def sessions():
+    """Sessions with skewed payment methods, nulls and a drifting price."""
+    rng = np.random.default_rng(0)
+    n = 20_000
+    day = rng.integers(1, 11, n)
+    price = rng.lognormal(5, 1, n) * np.where(day > 5, 1.5, 1.0)
+    price[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({
+        'Session_ID': [f"S{i:07d}" for i in rng.integers(0, 15_000, n)],
+        'Day': day,
+        'Price': price,
+        'Payment_Method': rng.choice(['Credit', 'Cash', 'Bank', 'PayPal', 'pay_pal'], n,
+                                     p=[0.4, 0.3, 0.2, 0.09, 0.01]),
+    })
+
+
+class TestSketches:
+    """Test the mergeable sketches behind a profile."""
+
+    def test_quantiles_within_rank_error(self):
+        """Test sketched quantiles are within 1% in rank of the exact ones."""
+        values = np.random.default_rng(1).lognormal(0, 2, 200_000)
+        sketch = QuantileSketch()
+        for start in range(0, len(values), 30_000):
+            sketch.add(values[start:start + 30_000])
+        qs = np.array([0.01, 0.5, 0.99])
+        ranks = np.searchsorted(np.sort(values), sketch.quantiles(qs)) / len(values)
+        assert np.abs(ranks - qs).max() < 0.01
+        assert sum(len(level) for level in sketch.levels) < 2000
+
+    def test_merged_quantiles_match_one_pass(self):
+        """Test merging sketches of two halves keeps the rank error."""
+        values = np.random.default_rng(2).normal(size=100_000)
+        first, second = QuantileSketch(), QuantileSketch()
+        first.add(values[:50_000])
+        second.add(values[50_000:])
+        merged = first.merge(second)
+        assert merged.n == len(values)
+        assert merged.cdf(np.array([0.0]))[0] == pytest.approx(0.5, abs=0.01)
+
+    def test_heavy_hitters(self):
+        """Test the most frequent values are found with counts never underestimated."""
+        values = pd.Series(['a'] * 500 + ['b'] * 300 + [f"x{i}" for i in range(5000)] + [None] * 10)
+        sketch = FrequencySketch(top=3)
+        sketch.add(values.iloc[:2000])
+        sketch.add(values.iloc[2000:])
+        top = sketch.heavy_hitters(2)
+        assert list(top) == ['a', 'b']
+        assert top['a'] >= 500 and top['b'] >= 300
+        assert sketch.n == len(values) - 10
+
+
+class TestProfile:
+    """Test dataset profiles."""
+
+    def test_summary_matches_pandas(self, contract, sessions):
+        """Test exact parts of the summary equal pandas and estimates are close."""
+        profile = Profile(contract)
+        profile.add(sessions)
+        summary = profile.summary().set_index('column')
+        price = sessions['Price']
+        assert summary.loc['Price', 'nulls'] == price.isna().sum()
+        assert summary.loc['Price', 'mean'] == pytest.approx(price.mean())
+        assert summary.loc['Price', 'std'] == pytest.approx(price.std())
+        assert summary.loc['Price', 'skew'] == pytest.approx(price.skew(), rel=1e-3)
+        assert summary.loc['Session_ID', 'kind'] == 'key'
+        assert summary.loc['Session_ID', 'distinct'] == pytest.approx(
+            sessions['Session_ID'].nunique(), rel=0.05)
+        assert summary.loc['Payment_Method', 'top_values'].startswith('Credit: ')
+
+    def test_chunks_and_days_merge_to_whole(self, contract, sessions, tmp_path):
+        """Test per-day profiles saved and merged equal the one-pass moments."""
+        path = tmp_path / "sessions.csv"
+        sessions.to_csv(path, index=False)
+        whole = profile_file(path, contract, chunksize=3000)
+        days = profile_file(path, contract, by='Day', chunksize=3000)
+        assert sorted(days) == list(range(1, 11))
+
+        save_group_profiles(days, tmp_path / "days", 'Day')
+        merged = merge_profiles(load_profiles([tmp_path / "days"]))
+        assert merged.rows == whole.rows == len(sessions)
+        a, b = merged.summary().set_index('column'), whole.summary().set_index('column')
+        for metric in ('nulls', 'mean', 'std', 'kurtosis', 'min', 'max', 'distinct'):
+            assert a.loc['Price', metric] == pytest.approx(b.loc['Price', metric])
+
+    def test_diff_finds_drift(self, contract, sessions, tmp_path):
+        """Test the diff ranks the drifting column first and round-trips through files."""
+        early, late = Profile(contract), Profile(contract)
+        early.add(sessions[sessions['Day'] <= 5].drop(columns='Day'))
+        late.add(sessions[sessions['Day'] > 5].drop(columns='Day'))
+        late = Profile.load(late.save(tmp_path / "late.profile"))
+
+        diff = diff_profiles(early, late).set_index('column')
+        assert diff.index[0] == 'Price'
+        assert diff.loc['Price', 'ks'] > 0.1
+        assert diff.loc['Payment_Method', 'top_shift'] < 2
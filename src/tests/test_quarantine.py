@@ -0,0 +1,131 @@
+"""
+PyTest suite for row-level quarantine.
+Run with: pytest src/tests/test_quarantine.py -v
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+import yaml
+from pathlib import Path
+
+from src.quarantine import MASK_COLUMN, Quarantine, RowChecks
+from src.validate_schema import SchemaValidator
+
+
+CONTRACT_PATH = Path(__file__).parent.parent.parent / "configs" / "data_contract.yaml"
+
+
+@pytest.fixture(scope="module")
+def contract():
+    with open(CONTRACT_PATH, 'r') as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture
+def dirty_df():
+    """Rows failing nulls, bounds, allowed values, infs and key uniqueness."""
+    return pd.DataFrame({
+        'id': [1, 2, 2, 3, 4],
+        'Session_ID': ['S0000001', 'S0000002', 'S0000001', None, 'S0000002'],
+        'Day': [1, 1, 2, 3, 1],
+        'Purchase': [0, 1, 2, None, 1],
+        'Age': [30, 20, 70, None, 10],
+        'Price': [1.0, 5.0, np.inf, np.nan, -3.0],
+        'Time_of_Day': ['morning', 'm0rning', None, 'evening', 'evening'],
+        'Campaign_Period': [False, False, False, True, False],
+    })
+
+
+def rule_rows(checks, masks):
+    """Rows failing each rule, keyed by (rule, column)."""
+    return {
+        rule: int(np.count_nonzero(masks & (np.uint64(1) << np.uint64(i))))
+        for i, rule in enumerate(checks.rules)
+    }
+
+
+class TestRowChecks:
+    """Test per-row failure bitmasks."""
+
+    def test_rows_add_up_to_validator_counts(self, contract, dirty_df):
+        """Test each rule flags as many rows as the validator counts."""
+        validator = SchemaValidator(str(CONTRACT_PATH))
+        validator.validate_all(dirty_df)
+        found = {(v['check'], v['column']): v['violations'] for v in validator.violations}
+
+        checks = RowChecks(contract)
+        rows = rule_rows(checks, checks.masks(dirty_df))
+        assert rows[('nulls', 'Session_ID')] == found[('null_constraint', 'Session_ID')]
+        assert rows[('range', 'Age')] == found[('range', 'Age')]
+        assert rows[('gt', 'Price')] == found[('gt', 'Price')]
+        assert rows[('inf', 'Price')] == found[('finite_numbers', 'Price')]
+        assert rows[('allowed', 'Time_of_Day')] == found[('categorical_allowed', 'Time_of_Day')]
+        assert rows[('duplicate', 'Session_ID')] == found[('primary_key_global', 'Session_ID')]
+        assert rows[('duplicate_in_day', 'Session_ID')] == found[('primary_key_within_day', 'Session_ID')]
+        assert rows[('duplicate', 'id')] == found[('id_uniqueness', 'id')]
+
+    def test_first_occurrence_stays_clean(self, contract, dirty_df):
+        """Test only later repeats of a key fail, across chunk boundaries too."""
+        checks = RowChecks(contract, checks=['keys'])
+        masks = np.concatenate([checks.masks(dirty_df.iloc[i:i + 2]) for i in range(0, 5, 2)])
+        assert (masks != 0).tolist() == [False, False, True, False, True]
+        np.testing.assert_array_equal(masks, RowChecks(contract, checks=['keys']).masks(dirty_df))
+
+    def test_group_values_are_matched_exactly(self, contract):
+        """Test float and int days match, while fractional or negative days never merge."""
+        checks = RowChecks(contract, checks=['keys'])
+        first = pd.DataFrame({'Session_ID': ['S0000001', 'S0000002', 'S0000003'],
+                              'Day': pd.array([1, 2, 3], dtype='Int8')})
+        later = pd.DataFrame({'Session_ID': ['S0000001', 'S0000002', 'S0000003'],
+                              'Day': [1.0, 2.5, -3.0]})
+        checks.masks(first)
+        rows = rule_rows(checks, checks.masks(later))
+        assert rows[('duplicate', 'Session_ID')] == 3
+        assert rows[('duplicate_in_day', 'Session_ID')] == 1
+
+    def test_dirty_ids_count_as_nulls(self, contract):
+        """Test non-integer ids are not keys, and numeric ids match across dtypes."""
+        checks = RowChecks(contract, checks=['keys'])
+        checks.masks(pd.DataFrame({'id': [1, 2]}))
+        masks = checks.masks(pd.DataFrame({'id': ['1', 'x', 'x', '2.5']}))
+        assert (masks != 0).tolist() == [True, False, False, False]
+
+    def test_wide_keys_are_rejected(self, contract):
+        """Test key codes beyond the packing's bits raise instead of merging keys."""
+        wide = {'columns': {**contract['columns'], 'Session_ID': {
+            **contract['columns']['Session_ID'], 'codec': {'prefix': 'S', 'digits': 12}}}}
+        checks = RowChecks(wide, checks=['keys'])
+        df = pd.DataFrame({'Session_ID': ['S999999999999'], 'Day': [1]})
+        with pytest.raises(ValueError, match="do not fit"):
+            checks.masks(df)
+
+
+class TestQuarantine:
+    """Test splitting rows into clean and quarantine outputs."""
+
+    def test_split_streams_chunks(self, contract, dirty_df, tmp_path):
+        """Test clean and quarantined rows partition the input, masks attached."""
+        checks = RowChecks(contract)
+        with Quarantine(checks, tmp_path / "clean.csv", tmp_path / "quarantine.csv",
+                        contract) as quarantine:
+            passed = list(quarantine.tap(dirty_df.iloc[i:i + 2] for i in range(0, 5, 2)))
+
+        assert len(pd.concat(passed)) == len(dirty_df)
+        clean = pd.read_csv(tmp_path / "clean.csv")
+        quarantined = pd.read_csv(tmp_path / "quarantine.csv")
+        assert clean['id'].tolist() == [1]
+        assert sorted(quarantined['id'].tolist()) == [2, 2, 3, 4]
+        assert (quarantined[MASK_COLUMN] > 0).all()
+        report = quarantine.report().set_index(['rule', 'column'])
+        assert report.loc[('duplicate', 'Session_ID'), 'rows'] == 2
+
+    def test_empty_output_keeps_header(self, contract, dirty_df, tmp_path):
+        """Test an output no row went to is still written, header only."""
+        with Quarantine(RowChecks(contract, checks=['dtypes']), tmp_path / "clean.csv",
+                        tmp_path / "quarantine.csv", contract) as quarantine:
+            quarantine.split(dirty_df)
+
+        assert len(pd.read_csv(tmp_path / "clean.csv")) == len(dirty_df)
+        quarantined = pd.read_csv(tmp_path / "quarantine.csv")
+        assert quarantined.empty and MASK_COLUMN in quarantined.columns
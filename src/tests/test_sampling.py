@@ -0,0 +1,181 @@
+"""
+PyTest suite for sampled validation.
+Run with: pytest src/tests/test_sampling.py -v
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from pathlib import Path
+
+from src.sampling import Reservoir, weighted_rate, wilson_interval
+from src.validate_schema import SchemaValidator
+
+
+CONTRACT_PATH = Path(__file__).parent.parent.parent / "configs" / "data_contract.yaml"
+
+
+@pytest.fixture
+def stream():
+    """Chunks of rows with a skewed Day distribution."""
+    rng = np.random.default_rng(1)
+    n = 20_000
+    day = np.where(rng.random(n) < 0.9, 1, rng.integers(2, 11, n))
+    df = pd.DataFrame({'row': np.arange(n), 'Day': day})
+    return [df.iloc[i:i + 3000] for i in range(0, n, 3000)]
+
+
+@pytest.fixture
+def sessions_file(tmp_path):
+    """A dataset with a few bad values and duplicate keys."""
+    rng = np.random.default_rng(2)
+    n = 4000
+    df = pd.DataFrame({
+        'id': np.arange(n),
+        'Session_ID': [f"S{i:07d}" for i in rng.integers(0, 3500, n)],
+        'Day': rng.integers(1, 101, n),
+        'Age': rng.integers(18, 60, n),
+        'Time_of_Day': rng.choice(['morning', 'afternoon', 'evening'], n),
+    })
+    df.loc[rng.choice(n, 400, replace=False), 'Time_of_Day'] = 'm0rning'
+    df.loc[7, 'Age'] = 150
+    path = tmp_path / "sessions.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+class TestReservoir:
+    """Test streaming uniform and stratified samples."""
+
+    def test_uniform_size_and_order(self, stream):
+        """Test the sample has the requested size and keeps read order."""
+        reservoir = Reservoir(500, seed=3)
+        for chunk in stream:
+            reservoir.add(chunk)
+        sample = reservoir.sample()
+        assert len(sample) == 500
+        assert sample['row'].is_monotonic_increasing
+        assert reservoir.weights().sum() == pytest.approx(reservoir.rows)
+
+    def test_same_seed_same_sample(self, stream):
+        """Test a seed reproduces the sample whatever the chunking."""
+        whole = Reservoir(300, seed=7)
+        whole.add(pd.concat(stream, ignore_index=True))
+        chunked = Reservoir(300, seed=7)
+        for chunk in stream:
+            chunked.add(chunk)
+        assert whole.sample()['row'].tolist() == chunked.sample()['row'].tolist()
+
+    def test_stratified_covers_every_day(self, stream):
+        """Test each stratum gets its share and weights restore the population."""
+        reservoir = Reservoir(100, stratify='Day', strata=10, seed=0)
+        for chunk in stream:
+            reservoir.add(chunk)
+        counts = reservoir.sample()['Day'].value_counts()
+        assert set(counts.index) == set(range(1, 11))
+        assert (counts == 10).all()
+        weights = pd.Series(reservoir.weights()).groupby(reservoir.sample()['Day']).sum()
+        population = pd.concat(stream)['Day'].value_counts()
+        assert weights.to_dict() == pytest.approx(population.to_dict())
+
+
+class TestIntervals:
+    """Test confidence intervals of sampled rates."""
+
+    def test_wilson_zero_failures(self):
+        """Test no failures gives a zero lower bound and a small upper one."""
+        low, high = wilson_interval(0, 1000)
+        assert low == 0
+        assert 0 < high < 0.01
+
+    def test_wilson_covers_rate(self):
+        """Test the interval contains the observed rate and narrows with rows."""
+        low, high = wilson_interval(50, 1000)
+        assert low < 0.05 < high
+        low_big, high_big = wilson_interval(500, 10_000)
+        assert high_big - low_big < high - low
+
+    def test_weighted_rate(self):
+        """Test weights scale the rate and shrink the effective sample."""
+        failed = np.array([True, False, False, False])
+        rate, low, high = weighted_rate(failed, np.array([3.0, 1.0, 1.0, 1.0]))
+        assert rate == pytest.approx(0.5)
+        assert low < rate < high
+        equal = weighted_rate(failed, np.ones(4))
+        assert equal[0] == pytest.approx(0.25)
+
+
+class TestValidateSample:
+    """Test validating a sample of a file."""
+
+    def test_estimates_bracket_exact_counts(self, sessions_file):
+        """Test sampled estimates agree with the exact run within their intervals."""
+        exact = SchemaValidator(str(CONTRACT_PATH))
+        exact.validate_file(sessions_file)
+        found = {(v['check'], v['column']): v['violations'] for v in exact.violations}
+
+        sampled = SchemaValidator(str(CONTRACT_PATH), checks=['allowed', 'ranges'])
+        _, estimates = sampled.validate_sample(sessions_file, size=1000, escalate=False)
+        row = estimates.set_index(['rule', 'column']).loc[('allowed', 'Time_of_Day')]
+        rows = 4000
+        assert row['ci_low'] * rows <= found[('categorical_allowed', 'Time_of_Day')] <= row['ci_high'] * rows
+        assert not estimates['escalated'].any()
+
+    def test_undecided_rules_are_rerun_exactly(self, sessions_file):
+        """Test a rare violation missed by the sample is found by escalation."""
+        validator = SchemaValidator(str(CONTRACT_PATH), checks=['ranges'])
+        results, estimates = validator.validate_sample(sessions_file, size=200, seed=0)
+        age = estimates.set_index(['rule', 'column']).loc[('range', 'Age')]
+        assert age['escalated']
+        found = {(v['check'], v['column']): v['violations'] for v in validator.violations}
+        assert found[('range', 'Age')] == 1
+        assert not results['columns']['Age']['passed']
+
+    def test_key_sketch_bounds_exact_duplicates(self, sessions_file):
+        """Test the sketched duplicate bounds contain the exact count."""
+        exact = SchemaValidator(str(CONTRACT_PATH), checks=['keys'])
+        exact.validate_file(sessions_file)
+        global_dupes = next(v['violations'] for v in exact.violations
+                            if v['check'] == 'primary_key_global')
+
+        sampled = SchemaValidator(str(CONTRACT_PATH), checks=['keys'])
+        _, estimates = sampled.validate_sample(sessions_file, size=500, escalate=False)
+        row = estimates.set_index(['rule', 'column']).loc[('duplicate', 'Session_ID')]
+        assert row['ci_low'] * 4000 <= global_dupes <= row['ci_high'] * 4000 + 1
+
+    def test_key_rules_keep_sketch_unless_opted_in(self, sessions_file):
+        """Test undecided key rules are only rerun exactly with escalate_keys."""
+        default = SchemaValidator(str(CONTRACT_PATH), checks=['keys'])
+        _, estimates = default.validate_sample(sessions_file, size=500, tolerance=0)
+        assert not estimates['escalated'].any()
+
+        opted = SchemaValidator(str(CONTRACT_PATH), checks=['keys'])
+        _, estimates = opted.validate_sample(sessions_file, size=500, tolerance=0,
+                                             escalate_keys=True)
+        keys = estimates.set_index(['rule', 'column'])['escalated']
+        assert keys[('duplicate', 'id')]
+        assert not keys[('duplicate', 'Session_ID')]
+
+    def test_clean_rules_within_tolerance_are_not_rerun(self, sessions_file):
+        """Test a rule with no sampled violation and a tight interval stays estimated."""
+        validator = SchemaValidator(str(CONTRACT_PATH), checks=['ranges'])
+        _, estimates = validator.validate_sample(sessions_file, size=2000, tolerance=0.01)
+        day = estimates.set_index(['rule', 'column']).loc[('range', 'Day')]
+        assert day['ci_high'] < 0.01
+        assert not day['escalated']
+
+    def test_null_counts_are_scaled_estimates(self, tmp_path):
+        """Test sampled null counts are reported as weighted estimates for the file."""
+        rng = np.random.default_rng(4)
+        n = 4000
+        age = rng.integers(18, 60, n).astype(float)
+        age[rng.random(n) < 0.25] = np.nan
+        path = tmp_path / "nulls.csv"
+        pd.DataFrame({'Day': rng.integers(1, 101, n), 'Age': age}).to_csv(path, index=False)
+
+        validator = SchemaValidator(str(CONTRACT_PATH), checks=['nulls'])
+        results, _ = validator.validate_sample(path, size=400)
+        stats = results['nulls']['null_stats']['Age']
+        assert 'count' not in stats
+        assert stats['sampled_count'] < stats['estimated_count']
+        assert abs(stats['estimated_count'] - np.isnan(age).sum()) < 0.1 * n
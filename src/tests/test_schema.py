@@ -10,6 +10,9 @@ import yaml
 from pathlib import Path
 import numpy as np
 
+from src.keys import count_duplicates
+from src.loader import load_dataset
+
 
 @pytest.fixture(scope="module")
 def data_contract():
@@ -20,30 +23,30 @@ def data_contract():
 
 
 @pytest.fixture(scope="module")
-def train_df():
+def train_df(data_contract):
     """Load training data."""
     train_path = Path(__file__).parent.parent.parent / "data" / "raw" / \
                   "dsba-m-1-challenge-purchase-prediction" / "train_dataset_M1_with_id.csv"
-    return pd.read_csv(train_path)
+    return load_dataset(train_path, data_contract)
 
 
 @pytest.fixture(scope="module")
-def interim_df():
+def interim_df(data_contract):
     """Load interim (processed) training data."""
     interim_path = Path(__file__).parent.parent.parent / "data" / "interim" / \
                    "train_dataset_M1_interim.csv"
     if interim_path.exists():
-        return pd.read_csv(interim_path)
+        return load_dataset(interim_path, data_contract)
     return None
 
 
 @pytest.fixture(scope="module")
-def test_df():
+def test_df(data_contract):
     """Load test data if available."""
     test_path = Path(__file__).parent.parent.parent / "data" / "raw" / \
                 "dsba-m-1-challenge-purchase-prediction" / "test_dataset_M1_with_id.csv"
     if test_path.exists():
-        return pd.read_csv(test_path)
+        return load_dataset(test_path, data_contract)
     return None
 
 
@@ -63,10 +66,8 @@ class TestPrimaryKeys:
     
     def test_session_id_unique_within_day_raw(self, train_df):
         """Test that Session_ID is unique within each day in raw data."""
-        day_dupes = train_df.groupby('Day')['Session_ID'].apply(
-            lambda x: x.duplicated().sum()
-        )
-        total_dupes = day_dupes.sum()
+        day_dupes = count_duplicates(train_df, 'Session_ID', 'Day')['group_duplicates']
+        total_dupes = sum(day_dupes.values())
         assert total_dupes == 0, \
             f"Found {total_dupes} duplicate Session_IDs within days"
 
@@ -93,10 +94,8 @@ class TestPrimaryKeysInterim:
         """Test that Session_ID is unique within each day in interim data."""
         if interim_df is None:
             pytest.skip("Interim data not available")
-        day_dupes = interim_df.groupby('Day')['Session_ID'].apply(
-            lambda x: x.duplicated().sum()
-        )
-        total_dupes = day_dupes.sum()
+        day_dupes = count_duplicates(interim_df, 'Session_ID', 'Day')['group_duplicates']
+        total_dupes = sum(day_dupes.values())
         assert total_dupes == 0, \
             f"Found {total_dupes} duplicate Session_IDs within days"
 
@@ -0,0 +1,231 @@
+"""
+PyTest suite for the compiled validation plan.
+Run with: pytest src/tests/test_validation_plan.py -v
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+import yaml
+from pathlib import Path
+
+from src.validate_schema import SchemaValidator
+from src.validation_plan import ColumnKernel, PlanPool, _count_outside, merge_column_stats
+
+
+CONTRACT_PATH = Path(__file__).parent.parent.parent / "configs" / "data_contract.yaml"
+
+
+@pytest.fixture
+def dirty_df():
+    """Small frame with one violation of each kind."""
+    return pd.DataFrame({
+        'Session_ID': ['S1', 'S2', 'S3', None],
+        'Day': [1, 2, 3, 101],
+        'Age': [10.0, np.nan, 30.0, 40.0],
+        'Price': [-1.0, 5.0, np.inf, np.nan],
+        'Gender': [0.0, 1.0, 2.0, np.nan],
+        'Time_of_Day': ['morning', 'm0rning', None, 'm0rning'],
+    })
+
+
+class TestColumnKernel:
+    """Test per-column kernel statistics."""
+    
+    def test_numeric_stats(self, dirty_df):
+        """Test nulls, bounds, min/max and infs from one kernel."""
+        kernel = ColumnKernel('Price', {'dtype': 'float', 'gt': 0, 'ge': 0})
+        stats = kernel.compute(dirty_df['Price'], numeric=True)
+        assert stats['nulls'] == 1
+        assert stats['bounds'] == {'ge': 1, 'gt': 1}
+        assert stats['min'] == -1.0
+        assert stats['max'] == np.inf
+        assert stats['inf'] == 1
+    
+    def test_allowed_stats(self, dirty_df):
+        """Test allowed-value breakdown keeps first-appearance order."""
+        kernel = ColumnKernel('Time_of_Day', {'dtype': 'category',
+                                              'allowed': ['morning', 'evening']})
+        stats = kernel.compute(dirty_df['Time_of_Day'])
+        assert stats['nulls'] == 1
+        assert stats['uniques'] == ['morning', 'm0rning']
+        assert stats['unexpected_counts'] == {'m0rning': 2}
+
+
+class TestConstraintCompiler:
+    """Test compiling contract constraint keys into kernels."""
+    
+    @pytest.mark.parametrize("spec, match", [
+        ({'dtype': 'float', 'lte': 1}, "unknown contract keys"),
+        ({'dtype': 'decimal'}, "unknown dtype"),
+        ({'dtype': 'string', 'ge': 0}, "only apply to numeric"),
+        ({'dtype': 'int', 'regex': 'x'}, "only apply to text"),
+        ({'dtype': 'int', 'range': [0]}, "range must be"),
+        ({'dtype': 'string', 'regex': '('}, "invalid regex"),
+        ({'dtype': 'string', 'max_length': -1}, "max_length"),
+        ({'dtype': 'int', 'allow_null': True, 'not_null': True}, "contradict"),
+    ])
+    def test_bad_specs_are_rejected(self, spec, match):
+        """Test unknown or misplaced keys fail when compiled, not silently."""
+        with pytest.raises(ValueError, match=match):
+            ColumnKernel('x', spec)
+    
+    def test_loader_settings_are_accepted(self):
+        """Test keys read by the loader (na_values) compile without constraints."""
+        kernel = ColumnKernel('Age', {'dtype': 'int', 'na_values': ['?'], 'ge': 0})
+        assert kernel.compute(pd.Series([1, None, 3], dtype='Int64'))['nulls'] == 1
+    
+    def test_contract_is_rejected_at_load(self, tmp_path):
+        """Test a contract with an unknown key fails when the validator loads it."""
+        with open(CONTRACT_PATH, 'r') as f:
+            contract = yaml.safe_load(f)
+        contract['columns']['Age']['maximum'] = 100
+        path = tmp_path / "contract.yaml"
+        path.write_text(yaml.safe_dump(contract))
+        with pytest.raises(ValueError, match="Age: unknown contract keys"):
+            SchemaValidator(str(path))
+    
+    def test_fused_bounds_match_each_bound(self):
+        """Test one sweep counts every bound as separate comparisons do."""
+        spec = {'dtype': 'float', 'range': [-5, 5], 'ge': -1, 'gt': -2, 'le': 1, 'lt': 1}
+        kernel = ColumnKernel('x', spec)
+        assert kernel.lower == (-1, False) and kernel.upper == (1, True)
+        values = np.array([-6, -1.5, -1, 0, 1, 3, np.nan, np.inf])
+        stats = kernel.compute(pd.Series(values))
+        assert stats['bounds'] == {
+            key: _count_outside(values, key, spec[key]) for key in ('range', 'ge', 'gt', 'le', 'lt')
+        }
+        failures = kernel.row_failures(pd.Series(values))
+        assert {key: int(failures[key].sum()) for key in stats['bounds']} == stats['bounds']
+    
+    def test_le_is_enforced(self):
+        """Test Price_Sine's contract `le: 1` reports values above 1."""
+        validator = SchemaValidator(str(CONTRACT_PATH), checks=['ranges'])
+        validator.validate_all(pd.DataFrame({'Price_Sine': [0.5, 1.0, 1.5, -2.0]}))
+        assert {(v['check'], v['violations']) for v in validator.violations} == {('ge', 1), ('le', 1)}
+    
+    def test_pattern_stats(self):
+        """Test regex and max_length count rows, merge, and mark the same rows."""
+        kernel = ColumnKernel('Session_ID', {'dtype': 'string', 'regex': r'S\d{3}',
+                                             'max_length': 4, 'not_null': False})
+        values = pd.Series(['S001', 'S01', 'S0001', None, 'S01'], dtype='string')
+        stats = kernel.compute(values)
+        assert stats['patterns'] == {'regex': 3, 'max_length': 1}
+        merged = merge_column_stats(kernel.compute(values[:2]), kernel.compute(values[2:]))
+        assert merged['patterns'] == stats['patterns']
+        failures = kernel.row_failures(values)
+        assert failures['regex'].tolist() == [False, True, True, False, True]
+        assert 'nulls' not in failures
+
+
+class TestValidateAll:
+    """Test validate_all violation records built from the plan."""
+    
+    def test_violation_records(self, dirty_df):
+        """Test every check reports the same counts as a direct pandas scan."""
+        validator = SchemaValidator(str(CONTRACT_PATH))
+        validator.validate_all(dirty_df)
+        found = {(v['check'], v['column']): v['violations']
+                 for v in validator.violations}
+        assert found[('null_constraint', 'Session_ID')] == 1
+        assert found[('finite_numbers', 'Price')] == 1
+        assert found[('range', 'Day')] == 1
+        assert found[('range', 'Age')] == 1
+        assert found[('gt', 'Price')] == 1
+        assert found[('categorical_allowed', 'Gender')] == 1
+        assert found[('categorical_allowed', 'Time_of_Day')] == 2
+    
+    def test_legacy_entry_points_agree(self, dirty_df):
+        """Test the single-check methods match the compiled plan."""
+        spec = {'dtype': 'int', 'range': [18, 65]}
+        validator = SchemaValidator(str(CONTRACT_PATH))
+        result = validator.validate_numeric_range(dirty_df, 'Age', spec)
+        assert not result['passed']
+        assert validator.violations[0]['actual_range'] == "[10.0, 40.0]"
+
+
+class TestValidateChunks:
+    """Test streaming validation matches in-memory validation."""
+    
+    @pytest.mark.parametrize("chunksize", [1, 3])
+    def test_chunks_match_full_frame(self, dirty_df, chunksize):
+        """Test merged chunk stats give identical results and violations."""
+        full = SchemaValidator(str(CONTRACT_PATH))
+        expected = full.validate_all(dirty_df)
+        
+        streamed = SchemaValidator(str(CONTRACT_PATH))
+        chunks = (dirty_df.iloc[i:i + chunksize]
+                  for i in range(0, len(dirty_df), chunksize))
+        results = streamed.validate_chunks(chunks)
+        
+        assert results == expected
+        assert streamed.violations == full.violations
+
+
+class TestParallelPlan:
+    """Test the process-pool plan matches the serial one."""
+    
+    def test_workers_match_serial(self, dirty_df):
+        """Test pooled column stats and violations equal the serial run."""
+        serial = SchemaValidator(str(CONTRACT_PATH))
+        expected = serial.validate_all(dirty_df)
+        
+        pooled = SchemaValidator(str(CONTRACT_PATH), workers=3)
+        results = pooled.validate_all(dirty_df)
+        
+        assert results == expected
+        assert pooled.violations == serial.violations
+        assert list(pooled.plan.run(dirty_df, workers=3)) == list(dirty_df.columns)
+    
+    def test_pool_reused_across_chunks(self, dirty_df):
+        """Test one pool serves chunks of any size with the serial stats."""
+        plan = SchemaValidator(str(CONTRACT_PATH)).plan
+        chunks = [dirty_df.iloc[:2], dirty_df, dirty_df.iloc[3:]]
+        with PlanPool(2) as pool:
+            for chunk in chunks:
+                assert plan.run(chunk, pool=pool) == plan.run(chunk)
+            executor = pool._executor
+            plan.run(dirty_df, pool=pool)
+            assert pool._executor is executor
+        assert pool._executor is None and not pool._buffers
+    
+    def test_streamed_workers_match_serial(self, dirty_df):
+        """Test validate_chunks on a pool matches the serial stream."""
+        chunks = [dirty_df.iloc[:2], dirty_df.iloc[2:]]
+        serial = SchemaValidator(str(CONTRACT_PATH))
+        pooled = SchemaValidator(str(CONTRACT_PATH), workers=2)
+        assert pooled.validate_chunks(iter(chunks)) == serial.validate_chunks(iter(chunks))
+        assert pooled.violations == serial.violations
+
+
+class TestCheckSelection:
+    """Test running a subset of checks on the columns they need."""
+    
+    def test_columns_per_check(self, dirty_df):
+        """Test each check plans only the columns it reads."""
+        validator = SchemaValidator(str(CONTRACT_PATH), checks=['keys'])
+        assert validator.required_columns(dirty_df.columns) == ['Session_ID', 'Day']
+        allowed = validator.required_columns(dirty_df.columns, ['allowed'])
+        assert allowed == ['Gender', 'Time_of_Day']
+    
+    def test_subset_matches_full_run(self, dirty_df, tmp_path):
+        """Test selected checks report what the full run reports for them."""
+        full = SchemaValidator(str(CONTRACT_PATH))
+        expected = full.validate_all(dirty_df)
+        
+        path = tmp_path / "dirty.csv"
+        dirty_df.to_csv(path, index=False)
+        subset = SchemaValidator(str(CONTRACT_PATH), checks=['ranges', 'keys'])
+        results = subset.validate_file(path)
+        
+        assert subset.checks == ('keys', 'ranges')
+        assert list(results) == ['primary_keys', 'columns']
+        assert results['primary_keys'] == expected['primary_keys']
+        assert results['columns']['Day'] == expected['columns']['Day']
+        assert 'Time_of_Day' not in results['columns']
+        assert {v['check'] for v in subset.violations} == {'range', 'gt'}
+    
+    def test_unknown_check_is_rejected(self):
+        """Test a misspelled check name fails instead of running nothing."""
+        with pytest.raises(ValueError, match="Unknown checks"):
+            SchemaValidator(str(CONTRACT_PATH), checks=['key'])
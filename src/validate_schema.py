@@ -10,10 +10,24 @@ import sys
 import pandas as pd
 import numpy as np
 import yaml
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Any
 import logging
 
+from src.cache import DEFAULT_CACHE_BYTES, ResultCache, column_digest, digest, file_digest
+from src.incremental import IncrementalState
+from src.keys import DEFAULT_MEMORY_LIMIT, KeyCodec, KeySketch, SpilledKeyIndex, count_duplicates
+from src.loader import dataset_columns, dataset_source, int_bounds, iter_dataset, load_dataset
+from src.overlap import DEFAULT_DEPTH, prefetch
+from src.quarantine import RULE_CHECKS, Quarantine, RowChecks
+from src.sampling import (
+    DEFAULT_CONFIDENCE, DEFAULT_SAMPLE_SIZE, DEFAULT_TOLERANCE, Reservoir, weighted_rate,
+)
+from src.validation_plan import (
+    NUMERIC_DTYPES, PATTERN_KEYS, ColumnKernel, PlanPool, compile_plan, merge_stats,
+)
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,21 +35,109 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Checks a validator can run (--checks selects a subset), in reporting order
+CHECKS = ('keys', 'dtypes', 'nulls', 'ranges', 'allowed', 'patterns', 'derived', 'finite')
+
+# Columns the primary key check reads
+KEY_COLUMNS = ('Session_ID', 'Day', 'id')
+
+# Rows per chunk while sampling
+SAMPLE_CHUNKSIZE = 100_000
+
+# Row rule (see quarantine.RowChecks) of violation records whose check name
+# differs from it
+RECORD_RULES = {
+    'null_constraint': 'nulls',
+    'categorical_allowed': 'allowed',
+    'finite_numbers': 'inf',
+    'primary_key_global': 'duplicate',
+    'primary_key_within_day': 'duplicate_in_day',
+    'id_uniqueness': 'duplicate',
+}
+
+# Single-sided bound keys: (failing comparison, passing comparison, violation
+# record key, reported extreme)
+BOUND_TEXT = {
+    'ge': ('<', '>=', 'min_found', 'min'),
+    'gt': ('<=', '>', 'min_found', 'min'),
+    'le': ('>', '<=', 'max_found', 'max'),
+    'lt': ('>=', '<', 'max_found', 'max'),
+}
+
 
 class SchemaValidator:
     """Validates dataset against schema defined in data_contract.yaml"""
     
-    def __init__(self, contract_path: str):
+    def __init__(self, contract_path: str, workers: int = 1,
+                 cache: Optional[ResultCache] = None,
+                 checks: Optional[Iterable[str]] = None):
         """
         Initialize validator with data contract.
         
         Args:
             contract_path: Path to data_contract.yaml
+            workers: Processes to run the per-column checks on (1 = serial)
+            cache: Result cache to reuse unchanged files and columns from
+            checks: Checks to run (see CHECKS; None runs all). Files are
+                loaded with only the columns these checks read.
         """
         with open(contract_path, 'r') as f:
             self.contract = yaml.safe_load(f)
         
+        self.plan = compile_plan(self.contract)
+        self.workers = workers
+        self.cache = cache
+        self.checks = CHECKS if checks is None else tuple(c for c in CHECKS if c in set(checks))
+        unknown = set(checks or ()) - set(CHECKS)
+        if unknown:
+            raise ValueError(f"Unknown checks {sorted(unknown)}; choose from {', '.join(CHECKS)}")
+        # Columns the checks are restricted to (None: every column they read)
+        self.columns: Optional[Set[str]] = None
         self.violations = []
+    
+    def required_columns(self, available: Iterable[str],
+                         checks: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Columns the selected checks read, in the dataset's column order.
+        
+        Args:
+            available: Columns of the dataset
+            checks: Checks to plan for (None: the validator's checks)
+            
+        Returns:
+            The available columns any of the checks needs
+        """
+        available = list(available)
+        specs = self.contract['columns']
+        needed = set()
+        for check in self.checks if checks is None else checks:
+            if check == 'keys':
+                needed.update(KEY_COLUMNS)
+            elif check in ('dtypes', 'nulls'):
+                needed.update(specs)
+            elif check == 'ranges':
+                needed.update(c for c, spec in specs.items()
+                              if (spec or {}).get('dtype') in NUMERIC_DTYPES)
+            elif check == 'allowed':
+                needed.update(c for c, spec in specs.items() if 'allowed' in (spec or {}))
+            elif check == 'patterns':
+                needed.update(c for c, spec in specs.items()
+                              if any(k in (spec or {}) for k in PATTERN_KEYS))
+            elif check == 'derived':
+                for col, rule in self.plan.derivations.items():
+                    needed.update((col, rule.source))
+            elif check == 'finite':
+                # Numeric contract columns, and other columns whose dtype is
+                # only known once they are loaded
+                needed.update(c for c in available if c not in specs
+                              or (specs[c] or {}).get('dtype') in NUMERIC_DTYPES)
+        if self.columns is not None:
+            needed &= self.columns
+        return [c for c in available if c in needed]
+    
+    def _stat_columns(self, df: pd.DataFrame) -> List[str]:
+        """Columns the per-column checks (everything but keys) need stats for."""
+        return self.required_columns(df.columns, [c for c in self.checks if c != 'keys'])
         
     def validate_primary_keys(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -47,14 +149,39 @@ class SchemaValidator:
         Returns:
             Dict with validation results
         """
+        return self._primary_key_results(*self._primary_key_counts(df))
+    
+    def _primary_key_counts(self, df: pd.DataFrame) -> Tuple[int, Dict[Any, int], int | None]:
+        """Count global, within-day and 'id' duplicates (see _primary_key_results)."""
         logger.info("Validating primary keys...")
+        codec = KeyCodec.from_spec(self.contract.get('columns', {}).get('Session_ID'))
+        session_keys = count_duplicates(df, 'Session_ID', 'Day', codec=codec)
+        id_dupes = (
+            count_duplicates(df, 'id', None)['global_duplicates']
+            if 'id' in df.columns else None
+        )
+        return session_keys['global_duplicates'], session_keys['group_duplicates'], id_dupes
+    
+    def _primary_key_results(self, session_dupes: int,
+                             problematic_days: Dict[Any, int],
+                             id_dupes: int | None) -> Dict[str, Any]:
+        """
+        Build primary key results and violations from duplicate counts.
+        
+        Args:
+            session_dupes: Duplicate Session_IDs across the whole dataset
+            problematic_days: Day -> duplicate Session_IDs, for days with any
+            id_dupes: Duplicate 'id' values (None if there is no 'id' column)
+            
+        Returns:
+            Dict with validation results
+        """
         results = {
             'passed': True,
             'issues': []
         }
         
         # Check Session_ID uniqueness globally
-        session_dupes = df['Session_ID'].duplicated().sum()
         if session_dupes > 0:
             results['passed'] = False
             results['issues'].append(
@@ -69,27 +196,22 @@ class SchemaValidator:
             results['issues'].append("✅ Session_ID is globally unique")
         
         # Check Session_ID uniqueness within each day
-        day_dupes = df.groupby('Day')['Session_ID'].apply(
-            lambda x: x.duplicated().sum()
-        )
-        if day_dupes.sum() > 0:
+        if problematic_days:
             results['passed'] = False
-            problematic_days = day_dupes[day_dupes > 0]
             results['issues'].append(
-                f"FAIL: Session_ID duplicates within days: {problematic_days.to_dict()}"
+                f"FAIL: Session_ID duplicates within days: {problematic_days}"
             )
             self.violations.append({
                 'check': 'primary_key_within_day',
                 'column': 'Session_ID',
-                'violations': day_dupes.sum(),
-                'problematic_days': problematic_days.to_dict()
+                'violations': sum(problematic_days.values()),
+                'problematic_days': problematic_days
             })
         else:
             results['issues'].append("✅ Session_ID is unique within each day")
         
         # Check if 'id' column exists and is unique
-        if 'id' in df.columns:
-            id_dupes = df['id'].duplicated().sum()
+        if id_dupes is not None:
             if id_dupes > 0:
                 results['passed'] = False
                 results['issues'].append(
@@ -124,79 +246,75 @@ class SchemaValidator:
                 'issues': [f"FAIL: Column '{column}' not found in dataset"]
             }
         
+        # Bounds are checked whatever the contract dtype, as callers asked for them
+        stats = ColumnKernel(column, {**spec, 'dtype': 'float'}).compute(df[column])
+        return self._range_results(column, spec, stats)
+    
+    def _range_results(self, column: str, spec: Dict,
+                       stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Build range/bounds results and violations from column stats."""
         results = {
             'passed': True,
             'issues': []
         }
         
-        # Get non-null values
-        values = df[column].dropna()
-        
-        if len(values) == 0:
+        if stats['rows'] == stats['nulls']:
             results['issues'].append(f"⚠️  {column}: all values are null")
             return results
         
+        if not stats['bounds']:
+            # The kernel only compares values that loaded as numbers
+            results['issues'].append(
+                f"⚠️  {column}: bounds not checked (values are {stats['dtype']}, not numbers)"
+            )
+            return results
+        
+        min_found, max_found = stats['min'], stats['max']
+        
         # Check range constraint
         if 'range' in spec:
             min_val, max_val = spec['range']
-            out_of_range = ((values < min_val) | (values > max_val)).sum()
+            out_of_range = stats['bounds'].get('range', 0)
             if out_of_range > 0:
                 results['passed'] = False
                 results['issues'].append(
                     f"FAIL: {column} has {out_of_range} values outside range [{min_val}, {max_val}]"
                 )
                 results['issues'].append(
-                    f"  Range found: [{values.min()}, {values.max()}]"
+                    f"  Range found: [{min_found}, {max_found}]"
                 )
                 self.violations.append({
                     'check': 'range',
                     'column': column,
                     'expected': f"[{min_val}, {max_val}]",
                     'violations': out_of_range,
-                    'actual_range': f"[{values.min()}, {values.max()}]"
+                    'actual_range': f"[{min_found}, {max_found}]"
                 })
             else:
                 results['issues'].append(
                     f"✅ {column} is within range [{min_val}, {max_val}]"
                 )
         
-        # Check >= constraint
-        if 'ge' in spec:
-            min_val = spec['ge']
-            violations = (values < min_val).sum()
-            if violations > 0:
-                results['passed'] = False
-                results['issues'].append(
-                    f"FAIL: {column} has {violations} values < {min_val}"
-                )
-                self.violations.append({
-                    'check': 'ge',
-                    'column': column,
-                    'expected': f">= {min_val}",
-                    'violations': violations,
-                    'min_found': values.min()
-                })
-            else:
-                results['issues'].append(f"✅ {column} >= {min_val}")
-        
-        # Check > constraint
-        if 'gt' in spec:
-            min_val = spec['gt']
-            violations = (values <= min_val).sum()
+        # Check single-sided bounds
+        for key, (fails, holds, found_key, found) in BOUND_TEXT.items():
+            if key not in spec:
+                continue
+            bound = spec[key]
+            violations = stats['bounds'].get(key, 0)
             if violations > 0:
                 results['passed'] = False
                 results['issues'].append(
-                    f"FAIL: {column} has {violations} values <= {min_val}"
+                    f"FAIL: {column} has {violations} values {fails} {bound}"
                 )
                 self.violations.append({
-                    'check': 'gt',
+                    'check': key,
                     'column': column,
-                    'expected': f"> {min_val}",
+                    'expected': f"{holds} {bound}",
                     'violations': violations,
-                    'min_found': values.min()
+                    found_key: min_found if found == 'min' else max_found
                 })
             else:
-                results['issues'].append(f"✅ {column} > {min_val}")
+                results['issues'].append(f"✅ {column} {holds} {bound}")
         
         return results
     
@@ -219,23 +337,31 @@ class SchemaValidator:
                 'issues': [f"FAIL: Column '{column}' not found in dataset"]
             }
         
+        if 'allowed' not in spec:
+            return {
+                'passed': True,
+                'issues': []
+            }
+        
+        stats = ColumnKernel(column, spec).compute(df[column])
+        return self._categorical_results(column, spec, stats)
+    
+    def _categorical_results(self, column: str, spec: Dict,
+                             stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Build allowed-value results and violations from column stats."""
         results = {
             'passed': True,
             'issues': []
         }
         
-        if 'allowed' not in spec:
-            return results
-        
         allowed = set(spec['allowed'])
-        values = df[column].dropna()
-        unique_values = set(values.unique())
+        unique_values = set(stats['uniques'])
         
         # Check for unexpected values
         unexpected = unique_values - allowed
         if unexpected:
             results['passed'] = False
-            count = df[column].isin(unexpected).sum()
+            count = sum(stats['unexpected_counts'].values())
             results['issues'].append(
                 f"FAIL: {column} has {len(unexpected)} unexpected values: {unexpected}"
             )
@@ -261,6 +387,119 @@ class SchemaValidator:
         
         return results
     
+    def validate_patterns(self, df: pd.DataFrame, column: str,
+                          spec: Dict) -> Dict[str, Any]:
+        """
+        Validate a text column against its regex/max_length constraints.
+        
+        Args:
+            df: DataFrame to validate
+            column: Column name
+            spec: Column specification from contract
+            
+        Returns:
+            Dict with validation results
+        """
+        if column not in df.columns:
+            return {
+                'passed': False,
+                'issues': [f"FAIL: Column '{column}' not found in dataset"]
+            }
+        
+        stats = ColumnKernel(column, spec).compute(df[column])
+        return self._pattern_results(column, spec, stats)
+    
+    def _pattern_results(self, column: str, spec: Dict,
+                         stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Build regex/max_length results and violations from column stats."""
+        results = {
+            'passed': True,
+            'issues': []
+        }
+        
+        if 'regex' in spec:
+            violations = stats['patterns']['regex']
+            if violations > 0:
+                results['passed'] = False
+                results['issues'].append(
+                    f"FAIL: {column} has {violations} values not matching {spec['regex']!r}"
+                )
+                self.violations.append({
+                    'check': 'regex',
+                    'column': column,
+                    'expected': spec['regex'],
+                    'violations': violations
+                })
+            else:
+                results['issues'].append(f"✅ {column} matches {spec['regex']!r}")
+        
+        if 'max_length' in spec:
+            violations = stats['patterns']['max_length']
+            if violations > 0:
+                results['passed'] = False
+                results['issues'].append(
+                    f"FAIL: {column} has {violations} values longer than {spec['max_length']} characters"
+                )
+                self.violations.append({
+                    'check': 'max_length',
+                    'column': column,
+                    'expected': f"<= {spec['max_length']} characters",
+                    'violations': violations
+                })
+            else:
+                results['issues'].append(f"✅ {column} is at most {spec['max_length']} characters")
+        
+        return results
+    
+    def validate_derived(self, df: pd.DataFrame, column: str) -> Dict[str, Any]:
+        """
+        Validate a derived column against its contract derivation_rule.
+        
+        Args:
+            df: DataFrame to validate
+            column: Derived column name
+            
+        Returns:
+            Dict with validation results
+        """
+        rule = self.plan.derivations[column]
+        missing = [c for c in (column, rule.source) if c not in df.columns]
+        if missing:
+            return {
+                'passed': False,
+                'issues': [f"FAIL: Column '{missing[0]}' not found in dataset"]
+            }
+        return self._derived_results(column, {'derived': rule.count_mismatches(df)})
+    
+    def _derived_results(self, column: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Build derivation results and violations from column stats."""
+        rule = self.plan.derivations[column]
+        results = {
+            'passed': True,
+            'issues': []
+        }
+        
+        mismatches = stats.get('derived')
+        if mismatches is None:
+            results['issues'].append(
+                f"⚠️  {column}: derivation not checked ({rule.source} missing)"
+            )
+        elif mismatches > 0:
+            results['passed'] = False
+            results['issues'].append(
+                f"FAIL: {column} disagrees with '{rule.describe()}' in {mismatches} rows"
+            )
+            self.violations.append({
+                'check': 'derived',
+                'column': column,
+                'expected': rule.describe(),
+                'violations': mismatches
+            })
+        else:
+            results['issues'].append(f"✅ {column} matches '{rule.describe()}'")
+        
+        return results
+    
     def validate_dtype(self, df: pd.DataFrame, column: str, 
                       expected_dtype: str) -> Dict[str, Any]:
         """
@@ -280,16 +519,19 @@ class SchemaValidator:
                 'issues': [f"FAIL: Column '{column}' not found in dataset"]
             }
         
+        return self._dtype_results(column, str(df[column].dtype), expected_dtype)
+    
+    def _dtype_results(self, column: str, actual_dtype: str,
+                       expected_dtype: str) -> Dict[str, Any]:
+        """Compare an actual pandas dtype name against the contract dtype."""
         results = {
             'passed': True,
             'issues': []
         }
         
-        actual_dtype = df[column].dtype
-        
         # Map contract dtypes to pandas dtypes
         dtype_mapping = {
-            'int': ['int64', 'int32', 'int16', 'int8', 'Int64', 'Int32'],
+            'int': ['int64', 'int32', 'int16', 'int8', 'Int64', 'Int32', 'Int16', 'Int8'],
             'float': ['float64', 'float32', 'Float64'],
             'string': ['object', 'string'],
             'category': ['object', 'string', 'category'],
@@ -298,7 +540,7 @@ class SchemaValidator:
         
         if expected_dtype in dtype_mapping:
             allowed_dtypes = dtype_mapping[expected_dtype]
-            if str(actual_dtype) not in allowed_dtypes:
+            if actual_dtype not in allowed_dtypes:
                 results['passed'] = False
                 results['issues'].append(
                     f"⚠️  {column}: expected {expected_dtype}, got {actual_dtype}"
@@ -316,6 +558,15 @@ class SchemaValidator:
         Returns:
             Dict with validation results and null statistics
         """
+        stats = {
+            col: ColumnKernel(col, {}).compute(df[col])
+            for col in self.contract['columns'] if col in df.columns
+        }
+        return self._null_results(stats, len(df))
+    
+    def _null_results(self, stats: Dict[str, Dict],
+                      n_rows: int) -> Dict[str, Any]:
+        """Build null constraint results and violations from column stats."""
         logger.info("Validating null constraints...")
         results = {
             'passed': True,
@@ -324,20 +575,20 @@ class SchemaValidator:
         }
         
         for col_name, col_spec in self.contract['columns'].items():
-            if col_name not in df.columns:
+            if col_name not in stats:
                 continue
             
-            null_count = df[col_name].isna().sum()
-            null_pct = (null_count / len(df)) * 100
+            null_count = stats[col_name]['nulls']
+            null_pct = (null_count / n_rows) * 100
             
             results['null_stats'][col_name] = {
                 'count': null_count,
                 'percentage': null_pct,
-                'allow_null': col_spec.get('allow_null', False)
+                'allow_null': self.plan.kernel(col_name).allow_null
             }
             
             # Check if nulls are allowed
-            if not col_spec.get('allow_null', False) and null_count > 0:
+            if not self.plan.kernel(col_name).allow_null and null_count > 0:
                 results['passed'] = False
                 results['issues'].append(
                     f"FAIL: {col_name} has {null_count} nulls ({null_pct:.2f}%) but nulls not allowed"
@@ -361,16 +612,24 @@ class SchemaValidator:
         Returns:
             Dict with validation results
         """
+        stats = {
+            col: ColumnKernel(col, {}).compute(df[col], numeric=True)
+            for col in df.select_dtypes(include=[np.number]).columns
+        }
+        return self._finite_results(stats)
+    
+    def _finite_results(self, stats: Dict[str, Dict]) -> Dict[str, Any]:
+        """Build finite-number results and violations from column stats."""
         logger.info("Validating finite numbers constraint...")
         results = {
             'passed': True,
             'issues': []
         }
         
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        
-        for col in numeric_cols:
-            inf_count = np.isinf(df[col]).sum()
+        for col, col_stats in stats.items():
+            inf_count = col_stats['inf']
+            if inf_count is None:
+                continue
             if inf_count > 0:
                 results['passed'] = False
                 results['issues'].append(
@@ -391,6 +650,11 @@ class SchemaValidator:
         """
         Run all validation checks.
         
+        Column checks run through the compiled plan, so each column's
+        buffer is scanned once for nulls, bounds, allowed values and infs.
+        With several workers the columns are checked in parallel; stats come
+        back in column order, so violations are recorded in the same order.
+        
         Args:
             df: DataFrame to validate
             
@@ -399,47 +663,495 @@ class SchemaValidator:
         """
         logger.info(f"Starting schema validation for {len(df)} rows...")
         
-        all_results = {
-            'primary_keys': self.validate_primary_keys(df),
-            'columns': {},
-            'nulls': self.validate_nulls(df),
-            'finite_numbers': self.validate_finite_numbers(df)
+        primary_keys = None
+        frame = df[self._stat_columns(df)]
+        if self.cache is None:
+            if 'keys' in self.checks:
+                primary_keys = self.validate_primary_keys(df)
+            stats = self.plan.run(frame, workers=self.workers) if len(frame.columns) else {}
+        else:
+            if 'keys' in self.checks:
+                primary_keys = self._primary_key_results(*self._cached_key_counts(df))
+            stats = self._cached_column_stats(frame)
+        return self.results_from_stats(primary_keys, stats)
+    
+    def _cached_key_counts(self, df: pd.DataFrame) -> Tuple[int, Dict[Any, int], int | None]:
+        """Primary key counts, reused while the key columns are unchanged."""
+        key = digest(*(
+            column_digest(df[col], col) for col in ('Session_ID', 'Day', 'id')
+            if col in df.columns
+        ))
+        return self.cache.fetch('keys', key, lambda: self._primary_key_counts(df))
+    
+    def _cached_column_stats(self, df: pd.DataFrame) -> Dict[str, Dict]:
+        """Per-column stats, recomputing only columns whose values or spec changed."""
+        specs = self.contract['columns']
+        keys = {
+            col: column_digest(df[col], col, specs.get(col))
+            for col in self.plan.columns(df)
         }
+        for col, rule in self.plan.derivations.items():
+            # A derived column's stats also depend on its source
+            if col in keys and rule.source in df.columns:
+                keys[col] = digest(keys[col], column_digest(df[rule.source], rule.source))
+        stats = {col: self.cache.get('columns', key) for col, key in keys.items()}
+        stale = [col for col, col_stats in stats.items() if col_stats is None]
+        if stale:
+            logger.info(f"Validating {len(stale)} of {len(stats)} columns (rest cached)")
+            sources = [c for c in self.plan.sources(stale) if c in df.columns and c not in stale]
+            fresh = self.plan.run(df[stale + sources], workers=self.workers)
+            for col in stale:
+                self.cache.put('columns', keys[col], fresh[col])
+                stats[col] = fresh[col]
+        return stats
+    
+    def validate_file(self, path, chunksize: Optional[int] = None,
+                      key_memory_limit: int = DEFAULT_MEMORY_LIMIT,
+                      engine: Optional[str] = None,
+                      depth: int = DEFAULT_DEPTH,
+                      quarantine: Optional[Quarantine] = None) -> Dict[str, Any]:
+        """
+        Validate a CSV (or its columnar artifact), using the cache if set.
+        
+        A file whose bytes and contract are unchanged since a cached run
+        returns that run's results and violations without being read.
+        
+        Args:
+            path: Dataset path
+            chunksize: Stream the file in chunks of this many rows (None loads it whole)
+            key_memory_limit: Memory ceiling in bytes for the streaming key indexes
+            engine: read_csv engine for whole-file loads
+            depth: When streaming, chunks to read ahead on a background
+                thread while the current one is validated (0: in sequence)
+            quarantine: Also split the rows into its clean and quarantine
+                outputs, in the same pass (reads every column, skips the
+                whole-file cache)
+            
+        Returns:
+            Dict with complete validation results
+        """
+        source = dataset_source(path)
+        available = dataset_columns(path)
+        columns = self.required_columns(available)
+        if columns == available or quarantine is not None:
+            columns = None
+        else:
+            logger.info(f"Checks {', '.join(self.checks)} read {len(columns)} of {len(available)} columns")
+        key = None
+        if self.cache is not None and quarantine is None:
+            key = file_digest(source, self.contract)
+            if self.checks != CHECKS:
+                key = digest(key, *self.checks)
+            if self.columns is not None:
+                key = digest(key, 'columns', *sorted(self.columns))
+            cached = self.cache.get('results', key)
+            if cached is not None:
+                logger.info(f"Using cached validation results for {source}")
+                results, violations = cached
+                self.violations.extend(violations)
+                return results
+        
+        first_violation = len(self.violations)
+        if chunksize:
+            # Stream: only per-column aggregates and key columns stay in memory
+            logger.info(f"Streaming data from {path} in chunks of {chunksize} rows")
+            chunks = prefetch(iter_dataset(path, self.contract, chunksize, columns), depth)
+            results = self.validate_chunks(
+                quarantine.tap(chunks) if quarantine is not None else chunks,
+                key_memory_limit=key_memory_limit,
+            )
+        else:
+            logger.info(f"Loading data from {path}")
+            df = load_dataset(path, self.contract, columns, engine=engine)
+            logger.info(f"Loaded {len(df)} rows, {len(df.columns)} columns")
+            if quarantine is not None:
+                quarantine.split(df)
+            results = self.validate_all(df)
+        
+        if key is not None:
+            self.cache.put('results', key, (results, self.violations[first_violation:]))
+        return results
+    
+    def validate_sample(self, path, size: int = DEFAULT_SAMPLE_SIZE,
+                        stratify: Optional[str] = None, seed: int = 0,
+                        confidence: float = DEFAULT_CONFIDENCE, escalate: bool = True,
+                        tolerance: float = DEFAULT_TOLERANCE, escalate_keys: bool = False,
+                        chunksize: Optional[int] = None,
+                        key_memory_limit: int = DEFAULT_MEMORY_LIMIT,
+                        depth: int = DEFAULT_DEPTH) -> Tuple[Dict[str, Any], pd.DataFrame]:
+        """
+        Validate a random sample of a file, rerunning undecided checks exactly.
+        
+        One streaming pass fills a reservoir (one per `stratify` value) and
+        HyperLogLog key sketches. validate_all runs on the sampled rows, and
+        each row rule's violation rate is estimated from them with a
+        confidence interval; key duplicates are estimated from the sketches.
+        An interval that includes zero cannot tell a clean column from a
+        rarely dirty one. With `escalate`, a row rule whose interval
+        includes zero and reaches above `tolerance` is rerun exactly over
+        the whole file for its column (reading only those columns); the rest
+        of its check's results come from the sample. Key rules keep their
+        sketched estimate unless `escalate_keys` is set. Null counts of
+        columns that allow nulls are scaled up from the sample by the row
+        weights ('estimated_count').
+        
+        Args:
+            path: Dataset path
+            size: Rows to sample
+            stratify: Column to sample per value of (e.g. 'Day'; it needs a
+                range or allowed values in the contract)
+            seed: Sampling seed
+            confidence: Confidence level of the intervals
+            escalate: Rerun undecided checks exactly (False: estimates only)
+            tolerance: Violation rate below which an undecided rule is
+                left to its estimate
+            escalate_keys: Also rerun undecided key rules exactly (exact
+                hashing of every key instead of the sketch)
+            chunksize: Rows per chunk of the sampling pass and, if set, of
+                the exact rerun (None streams SAMPLE_CHUNKSIZE-row chunks
+                and reloads whole)
+            key_memory_limit: Memory ceiling for exact streaming key checks
+            depth: Chunks to read ahead on a background thread
+            
+        Returns:
+            (results, estimates): results of the sampled and exact checks
+            together, and one row per rule with its sampled failures,
+            estimated rate and interval, estimated rows and whether it
+            was rerun exactly
+        """
+        available = dataset_columns(path)
+        needed = set(self.required_columns(available)) | ({stratify} if stratify else set())
+        columns = [c for c in available if c in needed]
+        reservoir = Reservoir(size, stratify, self._strata(stratify) if stratify else None, seed)
+        sketches = {}
+        if 'keys' in self.checks:
+            codec = KeyCodec.from_spec(self.contract['columns'].get('Session_ID'))
+            sketches['Session_ID'] = KeySketch('Session_ID', 'Day', codec=codec)
+            if 'id' in columns:
+                sketches['id'] = KeySketch('id', None)
+        
+        logger.info(f"Sampling {size:,} rows of {path}" + (f" by {stratify}" if stratify else ""))
+        chunks = iter_dataset(path, self.contract, chunksize or SAMPLE_CHUNKSIZE, columns)
+        for chunk in prefetch(chunks, depth):
+            reservoir.add(chunk)
+            for sketch in sketches.values():
+                sketch.add(chunk)
+        sample, weights = reservoir.sample(), reservoir.weights()
+        logger.info(f"Sampled {len(sample):,} of {reservoir.rows:,} rows")
+        
+        estimates = self._sample_estimates(sample, weights, reservoir.rows, sketches, confidence)
+        estimates['escalated'] = (
+            escalate & (estimates['ci_low'] <= 0) & (estimates['ci_high'] > tolerance)
+            & (escalate_keys | (estimates['check'] != 'keys'))
+        )
+        undecided = set(zip(estimates.loc[estimates['escalated'], 'check'],
+                            estimates.loc[estimates['escalated'], 'column']))
+        
+        # Each check runs on the sample for its decided columns and exactly
+        # for the others (a column with any undecided rule is rerun whole)
+        results = {}
+        for check in self.checks:
+            if check == 'keys':
+                continue
+            columns = [c for c in self.required_columns(sample.columns, [check])
+                       if (check, c) not in undecided]
+            if columns or check == 'dtypes':
+                first_violation = len(self.violations)
+                sampled = self._with_checks([check], lambda: self.validate_all(sample), columns)
+                self._annotate_estimates(self.violations[first_violation:], estimates, reservoir.rows)
+                if 'nulls' in sampled:
+                    self._estimate_null_stats(sampled['nulls']['null_stats'], sample, weights,
+                                              reservoir.rows, confidence)
+                results = _merge_results(results, sampled)
+        if sketches and ('keys', 'Session_ID') not in undecided \
+                and ('keys', 'id') not in undecided:
+            first_violation = len(self.violations)
+            results['primary_keys'] = self._estimated_key_results(estimates)
+            self._annotate_estimates(self.violations[first_violation:], estimates, reservoir.rows)
+        
+        for check in self.checks:
+            columns = sorted(c for k, c in undecided if k == check)
+            if check == 'keys' and columns:
+                columns = list(KEY_COLUMNS)
+            if columns:
+                logger.info(f"Rerunning {check} exactly for {', '.join(columns)} (undecided by the sample)")
+                exact = self._with_checks([check], lambda: self.validate_file(
+                    path, chunksize=chunksize, key_memory_limit=key_memory_limit, depth=depth,
+                ), columns)
+                results = _merge_results(results, exact)
+        return results, estimates
+    
+    def _strata(self, column: str) -> int:
+        """Number of values a stratification column can take (nulls count as one)."""
+        spec = self.contract['columns'].get(column) or {}
+        if 'allowed' in spec:
+            return len(spec['allowed']) + 1
+        bounds = int_bounds(spec) if spec.get('dtype') == 'int' else None
+        if bounds is None:
+            raise ValueError(f"Cannot stratify by {column}: the contract gives it no range or allowed values")
+        return bounds[1] - bounds[0] + 2
+    
+    def _sample_estimates(self, sample: pd.DataFrame, weights: np.ndarray, rows: int,
+                          sketches: Dict[str, KeySketch], confidence: float) -> pd.DataFrame:
+        """Per-rule violation rates and intervals from the sample and key sketches."""
+        row_checks = RowChecks(self.contract, [c for c in self.checks if c != 'keys'])
+        masks = row_checks.masks(sample)
+        records = []
+        for i, (rule, column) in enumerate(row_checks.rules):
+            if column not in sample.columns:
+                continue
+            failed = (masks & (np.uint64(1) << np.uint64(i))) != 0
+            rate, low, high = weighted_rate(failed, weights, confidence)
+            records.append({
+                'check': RULE_CHECKS[rule], 'rule': rule, 'column': column,
+                'sampled': int(np.count_nonzero(failed)), 'rate': rate,
+                'ci_low': low, 'ci_high': high, 'estimated_rows': round(rate * rows),
+            })
+        for column, sketch in sketches.items():
+            estimated = sketch.result(confidence)
+            for rule, key in (('duplicate', 'global_duplicates'), ('duplicate_in_day', 'group_duplicates')):
+                if estimated[key] is None:
+                    continue
+                n = sketch.rows if key == 'global_duplicates' else sketch.group_rows
+                duplicates, low, high = estimated[key]
+                records.append({
+                    'check': 'keys', 'rule': rule, 'column': column, 'sampled': None,
+                    'rate': duplicates / n if n else 0.0,
+                    'ci_low': low / n if n else 0.0, 'ci_high': high / n if n else 0.0,
+                    'estimated_rows': duplicates,
+                })
+        return pd.DataFrame(records, columns=['check', 'rule', 'column', 'sampled', 'rate',
+                                              'ci_low', 'ci_high', 'estimated_rows'])
+    
+    def _estimated_key_results(self, estimates: pd.DataFrame) -> Dict[str, Any]:
+        """Primary key results from the sketched duplicate estimates."""
+        keys = estimates[estimates['check'] == 'keys'].set_index(['rule', 'column'])['estimated_rows']
+        within_day = int(keys.get(('duplicate_in_day', 'Session_ID'), 0))
+        id_dupes = keys.get(('duplicate', 'id'))
+        return self._primary_key_results(
+            int(keys.get(('duplicate', 'Session_ID'), 0)),
+            {'all (estimated)': within_day} if within_day else {},
+            None if id_dupes is None else int(id_dupes),
+        )
+    
+    def _annotate_estimates(self, violations: List[Dict[str, Any]],
+                            estimates: pd.DataFrame, rows: int):
+        """Turn violation records counted on the sample into estimates for the file."""
+        by_rule = estimates.set_index(['rule', 'column'])
+        for record in violations:
+            rule = (RECORD_RULES.get(record['check'], record['check']), record['column'])
+            if rule not in by_rule.index:
+                continue
+            estimate = by_rule.loc[rule]
+            if estimate['check'] != 'keys':
+                record['sampled_violations'] = record['violations']
+            record.update({
+                'violations': int(estimate['estimated_rows']),
+                'rate': float(estimate['rate']),
+                'ci_low': float(estimate['ci_low']),
+                'ci_high': float(estimate['ci_high']),
+                'estimated_from': f"sample of {rows:,} rows" if estimate['check'] != 'keys' else 'sketch',
+            })
+    
+    def _estimate_null_stats(self, null_stats: Dict[str, Dict], sample: pd.DataFrame,
+                             weights: np.ndarray, rows: int, confidence: float):
+        """Replace null counts taken on the sample by weighted estimates for the file."""
+        for col, stats in null_stats.items():
+            rate, _, _ = weighted_rate(sample[col].isna().to_numpy(), weights, confidence)
+            null_stats[col] = {
+                'estimated_count': round(rate * rows),
+                'sampled_count': stats['count'],
+                'percentage': rate * 100,
+                'allow_null': stats['allow_null'],
+                'estimated_from': f"sample of {rows:,} rows",
+            }
+    
+    def _with_checks(self, checks: Iterable[str], run,
+                     columns: Optional[Iterable[str]] = None):
+        """Call run() with the validator restricted to some checks (and columns)."""
+        saved = self.checks, self.columns
+        self.checks = tuple(c for c in CHECKS if c in set(checks))
+        self.columns = None if columns is None else set(columns)
+        try:
+            return run()
+        finally:
+            self.checks, self.columns = saved
+    
+    def validate_chunks(self, chunks: Iterable[pd.DataFrame],
+                        key_memory_limit: int = DEFAULT_MEMORY_LIMIT) -> Dict[str, Any]:
+        """
+        Run all validation checks over a stream of row chunks.
+        
+        Column stats are computed per chunk and merged; keys go to
+        disk-spilled indexes, so memory stays bounded whatever the file
+        size. With several workers, one process pool serves every chunk.
+        Results match validate_all on the concatenated frame.
+        
+        Args:
+            chunks: DataFrames with the same columns, in file order
+            key_memory_limit: Memory ceiling in bytes for the key indexes
+            
+        Returns:
+            Dict with complete validation results
+        """
+        stats = None
+        rows = 0
+        with SpilledKeyIndex('Session_ID', 'Day', key_memory_limit // 2) as sessions, \
+                SpilledKeyIndex('id', None, key_memory_limit // 2) as ids, \
+                self._plan_pool() as pool:
+            has_id = False
+            check_keys = 'keys' in self.checks
+            for i, chunk in enumerate(chunks):
+                logger.info(f"Validating chunk {i + 1} ({len(chunk)} rows)...")
+                frame = chunk[self._stat_columns(chunk)]
+                chunk_stats = self.plan.run(frame, workers=self.workers, pool=pool)
+                stats = chunk_stats if stats is None else merge_stats(stats, chunk_stats)
+                if check_keys:
+                    sessions.add(chunk)
+                    if 'id' in chunk.columns:
+                        has_id = True
+                        ids.add(chunk)
+                rows += len(chunk)
+            
+            if stats is None:
+                raise ValueError("No rows to validate")
+            
+            logger.info(f"Starting schema validation for {rows} rows...")
+            primary_keys = None
+            if check_keys:
+                logger.info("Validating primary keys...")
+                session_keys = sessions.result()
+                id_dupes = ids.result()['global_duplicates'] if has_id else None
+                primary_keys = self._primary_key_results(
+                    session_keys['global_duplicates'], session_keys['group_duplicates'], id_dupes
+                )
+        
+        return self.results_from_stats(primary_keys, stats)
+    
+    def _plan_pool(self):
+        """Process pool for the plan runs of one validation (None when serial)."""
+        return PlanPool(self.workers) if self.workers > 1 else nullcontext()
+    
+    def validate_increment(self, chunks: Iterable[pd.DataFrame],
+                           state: IncrementalState) -> Dict[str, Any]:
+        """
+        Validate newly appended rows and report on all rows seen so far.
+        
+        Only the new rows are scanned: their column stats are merged into
+        the state's per-day stats and their keys checked against the
+        state's persisted key indexes. Results match validate_all over
+        history and new rows together. The caller saves the state.
+        
+        Args:
+            chunks: DataFrames of new rows
+            state: Incremental state of the rows validated before
+            
+        Returns:
+            Dict with complete validation results
+        """
+        with self._plan_pool() as pool:
+            for i, chunk in enumerate(chunks):
+                logger.info(f"Validating new rows, batch {i + 1} ({len(chunk)} rows)...")
+                state.add(chunk, self.plan, workers=self.workers, pool=pool)
+        
+        logger.info(f"Starting schema validation for {state.rows} rows...")
+        logger.info("Validating primary keys...")
+        session_keys = state.sessions.result()
+        id_dupes = state.ids.result()['global_duplicates'] if state.has_id else None
+        primary_keys = self._primary_key_results(
+            session_keys['global_duplicates'], session_keys['group_duplicates'], id_dupes
+        )
+        return self.results_from_stats(primary_keys, state.stats())
+    
+    def results_from_stats(self, primary_keys: Optional[Dict[str, Any]],
+                           stats: Dict[str, Dict]) -> Dict[str, Any]:
+        """
+        Assemble the validation results from per-column stats.
+        
+        Only the validator's checks report: results have a section
+        ('primary_keys', 'columns', 'nulls', 'finite_numbers') per check run,
+        and column entries only for the columns a selected column check reads.
+        
+        Args:
+            primary_keys: Results of the primary key check (None if not run)
+            stats: Per-column statistics from ValidationPlan.run
+            
+        Returns:
+            Dict with validation results
+        """
+        n_rows = next(iter(stats.values()))['rows'] if stats else 0
+        all_results = {}
+        if primary_keys is not None:
+            all_results['primary_keys'] = primary_keys
+        column_checks = [c for c in self.checks
+                         if c in ('dtypes', 'ranges', 'allowed', 'patterns', 'derived')]
+        if column_checks:
+            all_results['columns'] = {}
+        if 'nulls' in self.checks:
+            all_results['nulls'] = self._null_results(stats, n_rows)
+        if 'finite' in self.checks:
+            all_results['finite_numbers'] = self._finite_results(stats)
         
         # Validate each column according to spec
+        checked = set(self.required_columns(
+            self.contract['columns'], [c for c in column_checks if c != 'derived']
+        ))
+        if 'derived' in self.checks:
+            # Only the derived columns themselves, not the sources they read
+            checked.update(self.plan.derivations)
         for col_name, col_spec in self.contract['columns'].items():
-            if col_name not in df.columns:
+            if col_name not in checked:
+                continue
+            if col_name not in stats:
                 all_results['columns'][col_name] = {
                     'passed': False,
                     'issues': [f"Column '{col_name}' missing from dataset"]
                 }
                 continue
             
+            col_stats = stats[col_name]
             col_results = {
                 'passed': True,
                 'issues': []
             }
             
             # Validate dtype
-            dtype_result = self.validate_dtype(df, col_name, col_spec['dtype'])
-            col_results['issues'].extend(dtype_result['issues'])
-            if not dtype_result['passed']:
-                col_results['passed'] = False
+            if 'dtypes' in self.checks:
+                dtype_result = self._dtype_results(
+                    col_name, col_stats['dtype'], col_spec['dtype']
+                )
+                col_results['issues'].extend(dtype_result['issues'])
+                if not dtype_result['passed']:
+                    col_results['passed'] = False
             
             # Validate numeric constraints
-            if col_spec['dtype'] in ['int', 'float']:
-                range_result = self.validate_numeric_range(df, col_name, col_spec)
+            if 'ranges' in self.checks and col_spec['dtype'] in ['int', 'float']:
+                range_result = self._range_results(col_name, col_spec, col_stats)
                 col_results['issues'].extend(range_result['issues'])
                 if not range_result['passed']:
                     col_results['passed'] = False
             
             # Validate categorical constraints
-            if 'allowed' in col_spec:
-                cat_result = self.validate_categorical(df, col_name, col_spec)
+            if 'allowed' in self.checks and 'allowed' in col_spec:
+                cat_result = self._categorical_results(col_name, col_spec, col_stats)
                 col_results['issues'].extend(cat_result['issues'])
                 if not cat_result['passed']:
                     col_results['passed'] = False
             
+            # Validate string patterns
+            if 'patterns' in self.checks and any(k in col_spec for k in PATTERN_KEYS):
+                pattern_result = self._pattern_results(col_name, col_spec, col_stats)
+                col_results['issues'].extend(pattern_result['issues'])
+                if not pattern_result['passed']:
+                    col_results['passed'] = False
+            
+            # Validate derivation rule
+            if 'derived' in self.checks and col_name in self.plan.derivations:
+                derived_result = self._derived_results(col_name, col_stats)
+                col_results['issues'].extend(derived_result['issues'])
+                if not derived_result['passed']:
+                    col_results['passed'] = False
+            
             all_results['columns'][col_name] = col_results
         
         return all_results
@@ -450,24 +1162,30 @@ class SchemaValidator:
         print("SCHEMA VALIDATION SUMMARY")
         print("="*80)
         
+        if len(self.checks) < len(CHECKS):
+            print(f"\nChecks run: {', '.join(self.checks)}")
+        
         # Primary keys
-        print("\n🔑 PRIMARY KEYS:")
-        for issue in results['primary_keys']['issues']:
-            print(f"  {issue}")
+        if 'primary_keys' in results:
+            print("\n🔑 PRIMARY KEYS:")
+            for issue in results['primary_keys']['issues']:
+                print(f"  {issue}")
         
         # Columns
-        print("\n📋 COLUMN VALIDATION:")
-        for col_name, col_result in results['columns'].items():
-            if col_result['passed']:
-                print(f"  ✅ {col_name}")
-            else:
-                print(f"  ❌ {col_name}")
-                for issue in col_result['issues']:
-                    print(f"    {issue}")
+        if 'columns' in results:
+            print("\n📋 COLUMN VALIDATION:")
+            for col_name, col_result in results['columns'].items():
+                if col_result['passed']:
+                    print(f"  ✅ {col_name}")
+                else:
+                    print(f"  ❌ {col_name}")
+                    for issue in col_result['issues']:
+                        print(f"    {issue}")
         
         # Nulls summary
-        print("\n🔍 NULL VALUES SUMMARY:")
-        null_stats = results['nulls']['null_stats']
+        if 'nulls' in results:
+            print("\n🔍 NULL VALUES SUMMARY:")
+        null_stats = results.get('nulls', {}).get('null_stats', {})
         high_null_cols = {
             k: v for k, v in null_stats.items() 
             if v['percentage'] > 1.0
@@ -479,14 +1197,16 @@ class SchemaValidator:
                 reverse=True
             ):
                 allowed = "✅" if stats['allow_null'] else "❌"
+                count = stats['count'] if 'count' in stats else f"~{stats['estimated_count']} (estimated)"
                 print(
-                    f"  {col}: {stats['count']} ({stats['percentage']:.2f}%) {allowed}"
+                    f"  {col}: {count} ({stats['percentage']:.2f}%) {allowed}"
                 )
         
         # Finite numbers
-        print("\n🔢 FINITE NUMBERS:")
-        for issue in results['finite_numbers']['issues']:
-            print(f"  {issue}")
+        if 'finite_numbers' in results:
+            print("\n🔢 FINITE NUMBERS:")
+            for issue in results['finite_numbers']['issues']:
+                print(f"  {issue}")
         
         # Overall status
         print("\n" + "="*80)
@@ -507,6 +1227,50 @@ class SchemaValidator:
             logger.info("No violations to report")
 
 
+def print_estimates(estimates: pd.DataFrame, confidence: float):
+    """Print the estimated violation rates of a sampled run."""
+    print(f"\n📊 ESTIMATED VIOLATION RATES ({confidence:.0%} intervals):")
+    for row in estimates.itertuples(index=False):
+        if row.escalated:
+            mark, note = "🔁", " (rerun exactly)"
+        elif row.ci_low > 0:
+            mark, note = "❌", ""
+        else:
+            # Zero or undecided: the interval includes zero
+            mark, note = ("✅" if row.estimated_rows == 0 else "❔"), ""
+        print(f"  {mark} {row.column} {row.rule}: {row.rate:.3%} "
+              f"[{row.ci_low:.3%}, {row.ci_high:.3%}], ~{row.estimated_rows:,} rows{note}")
+
+
+def _merge_results(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine results of two runs over disjoint (check, column) pairs."""
+    merged = dict(a)
+    for section, value in b.items():
+        if section not in merged:
+            merged[section] = value
+        elif section == 'columns':
+            columns = dict(merged['columns'])
+            for col, col_results in value.items():
+                columns[col] = _merge_section(columns[col], col_results) if col in columns else col_results
+            merged['columns'] = columns
+        else:
+            merged[section] = _merge_section(merged[section], value)
+    return merged
+
+
+def _merge_section(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge two results sections: passed if both passed, issues (and stats) of both."""
+    issues = list(dict.fromkeys(a['issues'] + b['issues']))
+    merged = {**a, **b, 'passed': a['passed'] and b['passed'], 'issues': issues}
+    if not merged['passed']:
+        # A run's all-clear line no longer holds for the merged section
+        merged['issues'] = [i for i in merged['issues'] if not i.startswith("✅ All")]
+    for key in set(a) & set(b):
+        if isinstance(a[key], dict) and isinstance(b[key], dict):
+            merged[key] = {**a[key], **b[key]}
+    return merged
+
+
 def _resolve_contract_path(project_root: Path, explicit: str | None) -> Path:
      """Find a contract path (explicit, configs/data_contract.yaml, or data_contract.yaml)."""
      if explicit:
@@ -543,11 +1307,40 @@ def main():
     # results = validator.validate_all(df)
 
     parser = argparse.ArgumentParser(description="Schema & Keys Validation for ElectroShop")
-    parser.add_argument("-d", "--data", required=True, help="Path to CSV to validate")
+    parser.add_argument("-d", "--data", required=True, help="Path to CSV (or Parquet artifact) to validate; a current .parquet next to the CSV is read instead")
     parser.add_argument("-c", "--contract", default=None, help="Path to data_contract.yaml (optional)")
     parser.add_argument("-r", "--reports-dir", default=None, help="Directory to save reports (defaults to ./reports)")
     parser.add_argument("-t", "--tag", default=None, help="Optional tag used in report filenames (defaults to CSV stem)")
+    parser.add_argument("--chunksize", type=int, default=None, help="Stream the CSV in chunks of this many rows instead of loading it whole")
+    parser.add_argument("--key-memory-mb", type=int, default=DEFAULT_MEMORY_LIMIT // 2**20, help="Memory ceiling for the streaming key uniqueness check (MB)")
+    parser.add_argument("--engine", default=None, choices=["c", "python", "pyarrow"], help="read_csv engine for whole-file loads (pyarrow needs the pyarrow package)")
+    parser.add_argument("--prefetch", type=int, default=DEFAULT_DEPTH, help="With --chunksize, chunks to read ahead on a background thread (0: read and validate in sequence)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes to run the per-column checks on (default: serial)")
+    parser.add_argument("--state-dir", default=None, help="Incremental mode: --data holds newly appended rows, validated against the history saved in this directory")
+    parser.add_argument("--cache-dir", default=None, help="Directory of cached validation results (defaults to ./.cache/validation)")
+    parser.add_argument("--no-cache", action="store_true", help="Always revalidate from scratch")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_CACHE_BYTES / 2**20, help="Size cap of the cache directory; least recently used entries are evicted beyond it")
+    parser.add_argument("--quarantine", default=None, help="Directory to split the rows into <tag>__clean.csv and <tag>__quarantine.csv (with a failed_checks bitmask, see quarantine_checks__<tag>.csv)")
+    parser.add_argument("--checks", default=None, help=f"Comma-separated checks to run, reading only the columns they need (default: all of {','.join(CHECKS)})")
+    parser.add_argument("--sample", type=int, default=None, metavar="ROWS", help="Fast mode: validate a random sample of this many rows and report violation rates with confidence intervals. A rule with no sampled violations is rerun exactly over the file only if its interval reaches above --tolerance; key uniqueness keeps its sketched estimate unless --escalate-keys. Null counts are estimates scaled up from the sample")
+    parser.add_argument("--stratify", default=None, metavar="COLUMN", help="With --sample, sample every value of this column (e.g. Day) equally")
+    parser.add_argument("--seed", type=int, default=0, help="With --sample, sampling seed")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE, help="With --sample, confidence level of the intervals")
+    parser.add_argument("--no-escalate", action="store_true", help="With --sample, report estimates only (never rerun checks exactly)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="With --sample, violation rate an undecided rule's interval may reach before it is rerun exactly")
+    parser.add_argument("--escalate-keys", action="store_true", help="With --sample, rerun undecided key uniqueness checks exactly (hashing every key) instead of keeping the sketched estimate")
     args = parser.parse_args()
+    checks = [c.strip() for c in args.checks.split(',') if c.strip()] if args.checks else None
+    if checks is not None and set(checks) - set(CHECKS):
+        parser.error(f"unknown checks {sorted(set(checks) - set(CHECKS))}; choose from {','.join(CHECKS)}")
+    if checks is not None and args.state_dir:
+        parser.error("--checks cannot be combined with --state-dir (the saved history needs every column)")
+    if args.quarantine and args.state_dir:
+        parser.error("--quarantine cannot be combined with --state-dir (earlier keys are not in the saved history)")
+    if args.sample is not None and (args.state_dir or args.quarantine):
+        parser.error("--sample cannot be combined with --state-dir or --quarantine (they need every row)")
+    if args.sample is None and (args.stratify or args.no_escalate or args.escalate_keys):
+        parser.error("--stratify, --no-escalate and --escalate-keys need --sample")
 
     project_root = Path(__file__).parent.parent
     data_path = Path(args.data)
@@ -560,17 +1353,68 @@ def main():
 
     tag = args.tag or data_path.stem
 
-    # Load data
-    logger.info(f"Loading data from {data_path}")
-    df = pd.read_csv(data_path)
-    logger.info(f"Loaded {len(df)} rows, {len(df.columns)} columns")
+    cache = None if args.no_cache else ResultCache(
+        Path(args.cache_dir) if args.cache_dir else (project_root / ".cache" / "validation"),
+        max_bytes=int(args.cache_max_mb * 2**20),
+    )
+    validator = SchemaValidator(str(contract_path), workers=args.workers, cache=cache, checks=checks)
 
-    # Validate
-    validator = SchemaValidator(str(contract_path))
-    results = validator.validate_all(df)    
+    if args.state_dir:
+        # Incremental: --data holds only the new rows
+        state = IncrementalState(args.state_dir, validator.contract)
+        logger.info(f"Appending {data_path} to {state.rows} validated rows in {args.state_dir}")
+        chunks = (
+            prefetch(iter_dataset(data_path, validator.contract, args.chunksize), args.prefetch)
+            if args.chunksize else [load_dataset(data_path, validator.contract, engine=args.engine)]
+        )
+        results = validator.validate_increment(chunks, state)
+        state.save()
+    elif args.sample is not None:
+        results, estimates = validator.validate_sample(
+            data_path,
+            size=args.sample,
+            stratify=args.stratify,
+            seed=args.seed,
+            confidence=args.confidence,
+            escalate=not args.no_escalate,
+            tolerance=args.tolerance,
+            escalate_keys=args.escalate_keys,
+            chunksize=args.chunksize,
+            key_memory_limit=args.key_memory_mb * 2**20,
+            depth=args.prefetch,
+        )
+    else:
+        quarantine = None
+        if args.quarantine:
+            out_dir = Path(args.quarantine)
+            quarantine = Quarantine(
+                RowChecks(validator.contract, validator.checks),
+                out_dir / f"{tag}__clean.csv", out_dir / f"{tag}__quarantine.csv",
+                validator.contract,
+            )
+        results = validator.validate_file(
+            data_path,
+            chunksize=args.chunksize,
+            key_memory_limit=args.key_memory_mb * 2**20,
+            engine=args.engine,
+            depth=args.prefetch,
+            quarantine=quarantine,
+        )
+        if quarantine is not None:
+            quarantine.close()
+            rule_path = reports_dir / f"quarantine_checks__{tag}.csv"
+            quarantine.report().to_csv(rule_path, index=False)
+            logger.info(f"Quarantine: {quarantine.rows['clean']:,} clean rows -> {quarantine.clean.path}, "
+                        f"{quarantine.rows['quarantined']:,} quarantined -> {quarantine.quarantine.path}; "
+                        f"rules in {rule_path}")
     
     # Print summary
     validator.print_summary(results)
+    if args.sample is not None:
+        print_estimates(estimates, args.confidence)
+        estimates_path = reports_dir / f"sample_estimates__{tag}.csv"
+        estimates.to_csv(estimates_path, index=False)
+        logger.info(f"Sampled estimates saved to {estimates_path}")
     
     # Save reports
     # violations_path = reports_dir / "schema_key_violations.csv"
@@ -578,21 +1422,30 @@ def main():
     validator.save_violations_report(str(violations_path))
     
     # Save null overview
-    null_stats = results['nulls']['null_stats']
-    null_df = pd.DataFrame([
-        {
-            'column': col,
-            'null_count': stats['count'],
-            'null_percentage': stats['percentage'],
-            'allow_null': stats['allow_null']
-        }
-        for col, stats in null_stats.items()
-    ]).sort_values('null_percentage', ascending=False)
-    
-    # null_overview_path = reports_dir / "nulls_overview.csv"
-    null_overview_path = reports_dir / f"nulls_overview__{tag}.csv"
-    null_df.to_csv(null_overview_path, index=False)
-    logger.info(f"Null overview saved to {null_overview_path}")
+    if 'nulls' in results:
+        null_stats = results['nulls']['null_stats']
+        null_df = pd.DataFrame([
+            {
+                'column': col,
+                'null_count': stats['count'],
+                'null_percentage': stats['percentage'],
+                'allow_null': stats['allow_null']
+            } if 'count' in stats else {
+                # Sampled: counts scaled up from the sample, marked as estimates
+                'column': col,
+                'estimated_null_count': stats['estimated_count'],
+                'sampled_null_count': stats['sampled_count'],
+                'null_percentage': stats['percentage'],
+                'allow_null': stats['allow_null'],
+                'estimated_from': stats['estimated_from'],
+            }
+            for col, stats in null_stats.items()
+        ]).sort_values('null_percentage', ascending=False)
+        
+        # null_overview_path = reports_dir / "nulls_overview.csv"
+        null_overview_path = reports_dir / f"nulls_overview__{tag}.csv"
+        null_df.to_csv(null_overview_path, index=False)
+        logger.info(f"Null overview saved to {null_overview_path}")
 
     # Non-zero exit on violations (useful for CI)
     exit_code = 0 if len(validator.violations) == 0 else 1
@@ -0,0 +1,644 @@
+"""
+Compiled validation plan for the ElectroShop data contract.
+
+The contract's `columns:` section is turned once into one kernel per column.
+Compiling checks every constraint key (unknown or misplaced keys fail at load
+time instead of being ignored) and fuses a column's bounds into its tightest
+lower and upper bound. Each kernel computes a column's null count, bound
+violations, allowed-value breakdown, pattern violations and inf count
+together from a single NumPy buffer, instead of the separate
+isna/dropna/unique/isin passes the per-check validators used to do.
+Derived columns (derivation_rule) are checked alongside: the plan counts
+rows disagreeing with each compiled rule into the derived column's stats.
+SchemaValidator turns the resulting per-column stats into issues and
+violation records.
+
+Kernels are independent, so a plan can also run them across a process pool;
+numeric buffers are handed to the workers through shared memory rather than
+pickled. A PlanPool keeps the worker processes and shared buffers alive
+across runs, so validating a stream of chunks starts the workers once.
+"""
+
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from src.derivations import compile_derivations
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = 'string[pyarrow]'
+except ImportError:  # Patterns are matched through the python string dtype
+    TEXT_DTYPE = 'string'
+
+
+# Bound keys understood by the numeric range check, in reporting order
+BOUND_KEYS = ('range', 'ge', 'gt', 'le', 'lt')
+
+# String constraint keys, in reporting order
+PATTERN_KEYS = ('regex', 'max_length')
+
+# Keys a contract column spec may use: constraints...
+CONSTRAINT_KEYS = ('dtype', 'allow_null', 'not_null', 'allowed') + BOUND_KEYS + PATTERN_KEYS
+
+# ...and documentation or settings read elsewhere (codec: keys.KeyCodec,
+# derived_*: derivations.DerivedRule, na_values: loader.read_options)
+METADATA_KEYS = ('description', 'examples', 'codec', 'derived_from', 'derivation_rule',
+                 'na_values')
+
+# Contract dtypes (see loader.PARSE_DTYPES)
+CONTRACT_DTYPES = ('int', 'float', 'string', 'category', 'bool')
+
+# Contract dtypes that get numeric bound checks
+NUMERIC_DTYPES = ('int', 'float')
+
+# Contract dtypes that get string pattern checks
+TEXT_DTYPES = ('string', 'category')
+
+# Nullable (masked) numeric dtype names, as produced by the typed loader
+MASKED_DTYPE = re.compile(r'^(U?Int|Float)\d+$')
+
+
+class ColumnKernel:
+    """Vectorized checks for one contract column, compiled from its spec."""
+
+    def __init__(self, name: str, spec: Dict):
+        """
+        Compile a column spec into a kernel.
+
+        Args:
+            name: Column name
+            spec: Column specification from contract (may be empty)
+        """
+        check_spec(name, spec)
+        self.name = name
+        self.spec = spec
+        self.allow_null = not spec['not_null'] if 'not_null' in spec \
+            else spec.get('allow_null', False)
+        self.bounds = [(key, spec[key]) for key in BOUND_KEYS if key in spec]
+        # Tightest (value, strict) lower and upper bound: a value violating
+        # any bound violates these, so one sweep finds every violation
+        self.lower = _tightest([
+            (spec['range'][0], False) if 'range' in spec else None,
+            (spec['ge'], False) if 'ge' in spec else None,
+            (spec['gt'], True) if 'gt' in spec else None,
+        ], max)
+        self.upper = _tightest([
+            (spec['range'][1], False) if 'range' in spec else None,
+            (spec['le'], False) if 'le' in spec else None,
+            (spec['lt'], True) if 'lt' in spec else None,
+        ], min)
+        self.allowed = set(spec['allowed']) if 'allowed' in spec else None
+        self.regex = re.compile(spec['regex']) if 'regex' in spec else None
+        self.max_length = spec.get('max_length')
+        self.patterns = [key for key in PATTERN_KEYS if key in spec]
+
+    def compute(self, series: pd.Series, numeric: bool = False) -> Dict[str, Any]:
+        """
+        Compute all checks for this column in one pass over its buffer.
+
+        Args:
+            series: Column values
+            numeric: Whether the column counts as numeric for the finite check
+
+        Returns:
+            Dict of column statistics (see _empty_stats for the layout)
+        """
+        stats = _empty_stats(len(series), str(series.dtype))
+        arr = series.to_numpy() if isinstance(series.dtype, np.dtype) else None
+        fast = arr is not None and arr.dtype.kind in 'iuf'
+
+        if self.allowed is not None:
+            # factorize gives nulls, distinct labels and their counts at once
+            codes, uniques = pd.factorize(arr if arr is not None else series)
+            present = codes >= 0
+            stats['nulls'] = len(codes) - int(np.count_nonzero(present))
+            counts = np.bincount(codes[present], minlength=len(uniques))
+            stats['uniques'] = list(uniques)
+            stats['unexpected_counts'] = {
+                value: int(count) for value, count in zip(stats['uniques'], counts)
+                if value not in self.allowed
+            }
+            # Patterns are matched once per distinct value
+            stats['patterns'] = {
+                key: int(counts[failed].sum())
+                for key, failed in self._pattern_failures(uniques).items()
+            }
+        elif self.patterns:
+            # Mostly distinct values (keys): match the whole column, vectorized
+            stats['nulls'] = int(series.isna().sum())
+            stats['patterns'] = {
+                key: int(np.count_nonzero(failed))
+                for key, failed in self._pattern_failures(series).items()
+            }
+        elif fast:
+            stats['nulls'] = (
+                int(np.count_nonzero(np.isnan(arr))) if arr.dtype.kind == 'f' else 0
+            )
+        else:
+            stats['nulls'] = int(series.isna().sum())
+
+        # Bounds of a column that did not load as numbers are left to the dtype check
+        comparable = fast or (pd.api.types.is_numeric_dtype(series)
+                              and not pd.api.types.is_bool_dtype(series))
+        if self.bounds and comparable and stats['rows'] > stats['nulls']:
+            if fast:
+                # NaN compares False, so no dropna copy is needed
+                stats['min'] = np.nanmin(arr) if arr.dtype.kind == 'f' else arr.min()
+                stats['max'] = np.nanmax(arr) if arr.dtype.kind == 'f' else arr.max()
+                values = arr
+            else:
+                values = series.dropna()
+                stats['min'] = values.min()
+                stats['max'] = values.max()
+            stats['bounds'] = self._count_bounds(values, stats['min'], stats['max'])
+
+        if numeric:
+            if fast:
+                stats['inf'] = (
+                    int(np.count_nonzero(np.isinf(arr))) if arr.dtype.kind == 'f' else 0
+                )
+            else:
+                stats['inf'] = int(np.isinf(series).sum())
+
+        return stats
+
+    def row_failures(self, series: pd.Series, numeric: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Row-level versions of the checks compute() counts.
+
+        A null only fails the 'nulls' rule (bounds, allowed values, patterns
+        and infs are checked on non-null values, as in compute).
+
+        Args:
+            series: Column values
+            numeric: Whether the column counts as numeric for the finite check
+
+        Returns:
+            Dict of rule -> boolean mask over the rows: 'nulls' (if nulls are
+            not allowed), each bound key, 'allowed', each pattern key and 'inf'
+        """
+        nulls = series.isna().to_numpy()
+        failures = {}
+        if not self.allow_null:
+            failures['nulls'] = nulls
+        if (self.bounds or numeric) and pd.api.types.is_numeric_dtype(series) \
+                and not pd.api.types.is_bool_dtype(series):
+            # NaN compares False, so nulls never fail a bound
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+            if self.bounds:
+                rows = np.flatnonzero(self._outside_bounds(values))
+                for key, bound in self.bounds:
+                    failed = np.zeros(len(values), dtype=bool)
+                    failed[rows] = _outside(values[rows], key, bound)
+                    failures[key] = failed
+            if numeric:
+                failures['inf'] = np.isinf(values)
+        if self.allowed is not None:
+            failures['allowed'] = ~nulls & ~series.isin(self.allowed).to_numpy()
+        failures.update(self._pattern_failures(series))
+        return failures
+
+    def _count_bounds(self, values, low, high) -> Dict[str, int]:
+        """Violations of each bound, from one sweep (none if min and max pass)."""
+        counts = {key: 0 for key, _ in self.bounds}
+        if not self._outside_bounds(np.array([low, high])).any():
+            return counts
+        outside = values[self._outside_bounds(values)]
+        for key, bound in self.bounds:
+            counts[key] = _count_outside(outside, key, bound)
+        return counts
+
+    def _outside_bounds(self, values):
+        """Mask of values violating any bound (NaN never does)."""
+        outside = np.zeros(len(values), dtype=bool)
+        if self.lower is not None:
+            bound, strict = self.lower
+            outside |= np.asarray(values <= bound if strict else values < bound)
+        if self.upper is not None:
+            bound, strict = self.upper
+            outside |= np.asarray(values >= bound if strict else values > bound)
+        return outside
+
+    def _pattern_failures(self, values) -> Dict[str, np.ndarray]:
+        """Mask of values failing each pattern key (nulls never do)."""
+        if not self.patterns:
+            return {}
+        text = values if isinstance(values, pd.Series) else pd.Series(np.asarray(values, dtype=object))
+        if not isinstance(text.dtype, pd.StringDtype):
+            text = text.astype(str).where(text.notna())
+        if text.dtype != TEXT_DTYPE:
+            text = text.astype(TEXT_DTYPE)
+        failures = {}
+        if self.regex is not None:
+            try:
+                matched = text.str.fullmatch(self.regex.pattern)
+            except ValueError:
+                # A pattern pyarrow's RE2 engine rejects (backreferences, lookarounds)
+                matched = text.astype(object).str.fullmatch(self.regex.pattern)
+            failures['regex'] = ~matched.fillna(True).to_numpy(dtype=bool)
+        if self.max_length is not None:
+            failures['max_length'] = text.str.len().fillna(0).to_numpy() > self.max_length
+        return failures
+
+
+class ValidationPlan:
+    """Per-column kernels compiled once from the contract."""
+
+    def __init__(self, columns: Dict[str, Dict]):
+        """
+        Args:
+            columns: The contract's `columns:` section
+        """
+        self.kernels = {
+            name: ColumnKernel(name, spec or {}) for name, spec in columns.items()
+        }
+        self.derivations = compile_derivations(columns)
+
+    def kernel(self, column: str) -> ColumnKernel:
+        """Return the kernel for a column (bare kernel for non-contract columns)."""
+        return self.kernels.get(column) or ColumnKernel(column, {})
+
+    def sources(self, columns: List[str]) -> List[str]:
+        """Source columns the derivation checks of some columns read."""
+        return [self.derivations[c].source for c in columns if c in self.derivations]
+
+    def columns(self, df: pd.DataFrame) -> List[str]:
+        """Columns of a frame that run computes: contract and numeric ones."""
+        numeric_cols = set(df.select_dtypes(include=[np.number]).columns)
+        return [
+            col for col in df.columns
+            if col in self.kernels or col in numeric_cols
+        ]
+
+    def run(self, df: pd.DataFrame, workers: int = 1,
+            pool: Optional['PlanPool'] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Run every kernel over a frame.
+
+        Contract columns and any other numeric column (for the finite check)
+        are computed; stats are keyed in the frame's column order, whatever
+        the number of workers. Derived columns whose source is in the frame
+        also get their rule's mismatch count.
+
+        Args:
+            df: DataFrame to validate
+            workers: Worker processes to spread the columns over (1 = serial)
+            pool: Pool to run on, kept open by the caller across runs
+                (default: a pool of `workers` processes for this run only)
+
+        Returns:
+            Dict mapping column name to its statistics
+        """
+        numeric_cols = set(df.select_dtypes(include=[np.number]).columns)
+        columns = self.columns(df)
+        if pool is not None and len(columns) > 1:
+            stats = self._run_pool(df, columns, numeric_cols, pool)
+        elif workers > 1 and len(columns) > 1:
+            with PlanPool(workers) as pool:
+                stats = self._run_pool(df, columns, numeric_cols, pool)
+        else:
+            stats = {
+                col: self.kernel(col).compute(df[col], numeric=col in numeric_cols)
+                for col in columns
+            }
+        for col, rule in self.derivations.items():
+            if col in stats and rule.source in df.columns:
+                stats[col]['derived'] = rule.count_mismatches(df)
+        return stats
+
+    def _run_pool(self, df: pd.DataFrame, columns: List[str],
+                  numeric_cols: Set[str], pool: 'PlanPool') -> Dict[str, Dict[str, Any]]:
+        """Run the kernels in a process pool, one task per column."""
+        jobs = {}
+        for col in columns:
+            series = df[col]
+            arr = series.to_numpy() if isinstance(series.dtype, np.dtype) else None
+            if arr is not None and arr.dtype.kind in 'iufb':
+                # Workers map the buffer; only its name crosses the pipe
+                jobs[col] = pool.share(col, arr)
+            else:
+                # Object and extension columns have no flat buffer to share
+                jobs[col] = series
+        futures = {
+            col: pool.submit(_compute_column, self.kernel(col), column, col in numeric_cols)
+            for col, column in jobs.items()
+        }
+        return {col: future.result() for col, future in futures.items()}
+
+
+class PlanPool:
+    """
+    Worker processes and shared column buffers reused across plan runs.
+
+    The processes start on the first run; each column's shared buffer is
+    kept and overwritten by later runs, and only replaced when a later
+    chunk needs more bytes. Use as a context manager, or call close().
+    """
+
+    def __init__(self, workers: int):
+        """
+        Args:
+            workers: Worker processes
+        """
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._buffers: Dict[str, SharedMemory] = {}
+
+    def share(self, name: str, arr: np.ndarray) -> Tuple[str, str, int]:
+        """
+        Copy a numeric array into the column's shared buffer.
+
+        Args:
+            name: Column name (one buffer per column)
+            arr: 1-d numeric array
+
+        Returns:
+            (shared memory name, dtype, length), as _compute_column takes it
+        """
+        shm = self._buffers.get(name)
+        if shm is None or shm.size < arr.nbytes:
+            if shm is not None:
+                self._release(shm)
+            shm = SharedMemory(create=True, size=max(arr.nbytes, 1))
+            self._buffers[name] = shm
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+        return shm.name, arr.dtype.str, len(arr)
+
+    def submit(self, fn, *args):
+        """Submit a task, starting the worker processes on first use."""
+        if self._executor is None:
+            # Workers must share this process's resource tracker, or they
+            # would unlink the shared buffers they attach to when they exit
+            resource_tracker.ensure_running()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor.submit(fn, *args)
+
+    def close(self):
+        """Stop the workers and free the shared buffers."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for shm in self._buffers.values():
+            self._release(shm)
+        self._buffers = {}
+
+    @staticmethod
+    def _release(shm: SharedMemory):
+        shm.close()
+        shm.unlink()
+
+    def __enter__(self) -> 'PlanPool':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def compile_plan(contract: Dict) -> ValidationPlan:
+    """Compile a loaded data contract into a ValidationPlan."""
+    return ValidationPlan(contract.get('columns', {}))
+
+
+def check_spec(name: str, spec: Dict):
+    """
+    Reject a column spec the compiler would otherwise partly ignore.
+
+    Args:
+        name: Column name
+        spec: Column specification from contract
+
+    Raises:
+        ValueError: On unknown keys, constraints that do not apply to the
+            column's dtype, or malformed constraint values
+    """
+    unknown = [key for key in spec if key not in CONSTRAINT_KEYS + METADATA_KEYS]
+    if unknown:
+        raise ValueError(
+            f"{name}: unknown contract keys {unknown}; "
+            f"expected {', '.join(CONSTRAINT_KEYS + METADATA_KEYS)}"
+        )
+    dtype = spec.get('dtype')
+    if dtype is not None and dtype not in CONTRACT_DTYPES:
+        raise ValueError(f"{name}: unknown dtype {dtype!r}; expected one of {', '.join(CONTRACT_DTYPES)}")
+    bounds = [key for key in BOUND_KEYS if key in spec]
+    if bounds and dtype not in NUMERIC_DTYPES:
+        raise ValueError(f"{name}: {', '.join(bounds)} only apply to numeric columns, not {dtype}")
+    patterns = [key for key in PATTERN_KEYS if key in spec]
+    if patterns and dtype not in TEXT_DTYPES:
+        raise ValueError(f"{name}: {', '.join(patterns)} only apply to text columns, not {dtype}")
+    if 'range' in spec and not (isinstance(spec['range'], (list, tuple)) and len(spec['range']) == 2):
+        raise ValueError(f"{name}: range must be [min, max], got {spec['range']!r}")
+    for key in ('ge', 'gt', 'le', 'lt'):
+        if key in spec and not isinstance(spec[key], (int, float)):
+            raise ValueError(f"{name}: {key} must be a number, got {spec[key]!r}")
+    if 'max_length' in spec and not (isinstance(spec['max_length'], int) and spec['max_length'] >= 0):
+        raise ValueError(f"{name}: max_length must be a non-negative int, got {spec['max_length']!r}")
+    if 'regex' in spec:
+        try:
+            re.compile(spec['regex'])
+        except re.error as exc:
+            raise ValueError(f"{name}: invalid regex {spec['regex']!r}: {exc}") from None
+    if 'not_null' in spec and 'allow_null' in spec and spec['not_null'] == spec['allow_null']:
+        raise ValueError(f"{name}: not_null and allow_null contradict each other")
+
+
+def _tightest(bounds, pick):
+    """
+    Tightest of several (value, strict) bounds on one side, or None.
+
+    pick is max for lower bounds and min for upper ones; at equal values the
+    strict bound is the tighter.
+    """
+    bounds = [b for b in bounds if b is not None]
+    if not bounds:
+        return None
+    value = pick(b[0] for b in bounds)
+    return value, any(strict for v, strict in bounds if v == value)
+
+
+def _compute_column(kernel: ColumnKernel, column, numeric: bool) -> Dict[str, Any]:
+    """
+    Worker entry point: compute a kernel over a Series or a shared buffer.
+
+    Args:
+        kernel: Kernel of the column
+        column: The column as a Series, or (shared memory name, dtype, length)
+        numeric: Whether the column counts as numeric for the finite check
+
+    Returns:
+        Column statistics
+    """
+    if isinstance(column, pd.Series):
+        return kernel.compute(column, numeric=numeric)
+
+    name, dtype, length = column
+    shm = SharedMemory(name=name)
+    try:
+        arr = np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf)
+        stats = kernel.compute(pd.Series(arr, copy=False), numeric=numeric)
+        # The buffer can only be closed once no array views it
+        del arr
+        return stats
+    finally:
+        shm.close()
+
+
+def _empty_stats(rows: int, dtype: str) -> Dict[str, Any]:
+    """
+    Layout of the per-column statistics produced by a kernel.
+
+    rows/nulls are counts; min/max are set for bound-checked columns with at
+    least one value; bounds maps each bound key to its violation count;
+    uniques lists distinct non-null values in order of first appearance and
+    unexpected_counts the row counts of those outside `allowed`; patterns
+    maps each of regex/max_length to its violation count; inf is None
+    for non-numeric columns; derived is the number of rows disagreeing with
+    the column's derivation_rule (None if it has none or its source was
+    missing).
+    """
+    return {
+        'rows': rows,
+        'dtype': dtype,
+        'nulls': 0,
+        'min': None,
+        'max': None,
+        'bounds': {},
+        'patterns': {},
+        'uniques': None,
+        'unexpected_counts': None,
+        'inf': None,
+        'derived': None,
+    }
+
+
+def _count_outside(values, key: str, bound) -> int:
+    """Count values violating a single bound constraint."""
+    return int(_outside(values, key, bound).sum())
+
+
+def _outside(values, key: str, bound):
+    """Mask of values violating a single bound constraint."""
+    if key == 'range':
+        min_val, max_val = bound
+        return (values < min_val) | (values > max_val)
+    if key == 'ge':
+        return values < bound
+    if key == 'gt':
+        return values <= bound
+    if key == 'le':
+        return values > bound
+    return values >= bound
+
+
+def merge_stats(left: Dict[str, Dict], right: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    Merge per-column statistics of two row ranges of the same dataset.
+
+    Merging is associative, so stats computed chunk by chunk (in order) merge
+    to the same result as stats computed over the full frame.
+
+    Args:
+        left: Stats of the earlier rows
+        right: Stats of the later rows
+
+    Returns:
+        Merged per-column statistics, in left's column order
+    """
+    merged = {}
+    for col in list(left) + [c for c in right if c not in left]:
+        if col not in right:
+            merged[col] = left[col]
+        elif col not in left:
+            merged[col] = right[col]
+        else:
+            merged[col] = merge_column_stats(left[col], right[col])
+    return merged
+
+
+def merge_column_stats(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge the statistics of one column over two row ranges."""
+    merged = _empty_stats(a['rows'] + b['rows'], _merge_dtype(a, b))
+    merged['nulls'] = a['nulls'] + b['nulls']
+    merged['bounds'] = dict(a['bounds'])
+    for key, count in b['bounds'].items():
+        merged['bounds'][key] = merged['bounds'].get(key, 0) + count
+    merged['patterns'] = dict(a.get('patterns', {}))
+    for key, count in b.get('patterns', {}).items():
+        merged['patterns'][key] = merged['patterns'].get(key, 0) + count
+
+    mins = [s['min'] for s in (a, b) if s['min'] is not None]
+    maxs = [s['max'] for s in (a, b) if s['max'] is not None]
+    merged['min'] = min(mins) if mins else None
+    merged['max'] = max(maxs) if maxs else None
+
+    if a['uniques'] is not None or b['uniques'] is not None:
+        # dict keys keep first-appearance order across both ranges
+        merged['uniques'] = list(dict.fromkeys((a['uniques'] or []) + (b['uniques'] or [])))
+        merged['unexpected_counts'] = dict(a['unexpected_counts'] or {})
+        for value, count in (b['unexpected_counts'] or {}).items():
+            merged['unexpected_counts'][value] = (
+                merged['unexpected_counts'].get(value, 0) + count
+            )
+
+    infs = [s['inf'] for s in (a, b) if s['inf'] is not None]
+    merged['inf'] = sum(infs) if infs else None
+    derived = [s.get('derived') for s in (a, b) if s.get('derived') is not None]
+    merged['derived'] = sum(derived) if derived else None
+
+    return _coerce_scalars(merged)
+
+
+def _numpy_kind(dtype: str):
+    """Return the NumPy kind character of a dtype name, or None."""
+    try:
+        return np.dtype(_numpy_name(dtype)).kind
+    except TypeError:
+        return None
+
+
+def _numpy_name(dtype: str) -> str:
+    """NumPy counterpart of a nullable numeric dtype name ('Int8' -> 'int8')."""
+    return dtype.lower() if MASKED_DTYPE.match(dtype) else dtype
+
+
+def _merge_dtype(a: Dict[str, Any], b: Dict[str, Any]) -> str:
+    """
+    Dtype pandas would have inferred for both row ranges read together.
+
+    A range that is entirely null says nothing about the column's type;
+    int and float widen to float; any other mix ends up as object.
+    """
+    if a['rows'] == a['nulls'] and b['rows'] > b['nulls']:
+        return b['dtype']
+    if b['rows'] == b['nulls'] or a['dtype'] == b['dtype']:
+        return a['dtype']
+    kinds = {_numpy_kind(a['dtype']), _numpy_kind(b['dtype'])}
+    if kinds <= set('iuf'):
+        merged = str(np.result_type(_numpy_name(a['dtype']), _numpy_name(b['dtype'])))
+        if MASKED_DTYPE.match(a['dtype']) or MASKED_DTYPE.match(b['dtype']):
+            # Nullable columns stay nullable when widened
+            merged = 'U' + merged[1:].capitalize() if merged[0] == 'u' else merged.capitalize()
+        return merged
+    return 'object'
+
+
+def _coerce_scalars(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Cast min/max and distinct values to the column's (merged) dtype."""
+    if _numpy_kind(stats['dtype']) not in ('i', 'u', 'f'):
+        return stats
+    cast = np.dtype(_numpy_name(stats['dtype'])).type
+    for key in ('min', 'max'):
+        if stats[key] is not None:
+            stats[key] = cast(stats[key])
+    if stats['uniques'] is not None:
+        stats['uniques'] = [cast(v) for v in stats['uniques']]
+        stats['unexpected_counts'] = {
+            cast(v): n for v, n in stats['unexpected_counts'].items()
+        }
+    return stats